@@ -0,0 +1,233 @@
+"""Admission control for the face-recognition endpoints.
+
+Two layers protect the CPU-heavy inference calls (register and verify-face):
+
+  rate limits    token buckets keyed by client IP and by voter, refilled
+                 continuously; an empty bucket answers 429 with Retry-After
+  inference gate at most INFERENCE_CONCURRENCY inferences run at once, on a
+                 dedicated thread pool; up to INFERENCE_QUEUE_SIZE requests
+                 wait at most INFERENCE_QUEUE_TIMEOUT seconds for a slot and
+                 everything beyond that is shed with 503
+
+Inference never runs on the event loop or the default thread pool, so
+cast-vote and other authenticated traffic is not queued behind it; those
+endpoints are not rate limited. Buckets live in process memory unless
+RATE_LIMIT_REDIS_URL points at a Redis shared by all workers.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+
+from fastapi import HTTPException
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_IP_PER_MINUTE = float(os.getenv("RATE_LIMIT_IP_PER_MINUTE", "30"))
+RATE_LIMIT_IP_BURST = int(os.getenv("RATE_LIMIT_IP_BURST", "10"))
+RATE_LIMIT_VOTER_PER_MINUTE = float(os.getenv("RATE_LIMIT_VOTER_PER_MINUTE", "6"))
+RATE_LIMIT_VOTER_BURST = int(os.getenv("RATE_LIMIT_VOTER_BURST", "3"))
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")
+
+# Leave a core for the event loop and database work by default
+INFERENCE_CONCURRENCY = int(os.getenv("INFERENCE_CONCURRENCY", str(max(1, (os.cpu_count() or 2) - 1))))
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "16"))
+INFERENCE_QUEUE_TIMEOUT = float(os.getenv("INFERENCE_QUEUE_TIMEOUT", "2.0"))
+
+# Idle buckets are dropped once the in-memory store grows past this
+MAX_MEMORY_BUCKETS = 10000
+
+# KEYS[1] bucket; ARGV rate (tokens/s), burst. Returns {allowed, retry_after}
+_REDIS_TOKEN_BUCKET = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + (now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+return {allowed, tostring(retry_after)}
+"""
+
+
+class AdmissionMetrics:
+    """Counters of admitted and shed requests, exposed at /api/admin/metrics/admission"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {}
+        self.wait_seconds_total = 0.0
+
+    def incr(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe_wait(self, seconds: float):
+        with self._lock:
+            self.wait_seconds_total += seconds
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"counters": dict(self.counters),
+                    "queue_wait_seconds_total": round(self.wait_seconds_total, 3)}
+
+
+class MemoryBucketStore:
+    def __init__(self):
+        self._buckets: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: int) -> float:
+        """Consume one token; returns 0 if allowed, else seconds until one is available"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            retry_after = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                retry_after = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+
+            if len(self._buckets) > MAX_MEMORY_BUCKETS:
+                # A bucket idle long enough to refill completely carries no state
+                for k in [k for k, (_, t) in self._buckets.items() if (now - t) * rate >= burst]:
+                    del self._buckets[k]
+        return retry_after
+
+
+class RedisBucketStore:
+    def __init__(self, url: str):
+        self.client = redis.Redis.from_url(url, socket_timeout=0.2)
+        self.script = self.client.register_script(_REDIS_TOKEN_BUCKET)
+
+    def take(self, key: str, rate: float, burst: int) -> float:
+        allowed, retry_after = self.script(keys=[f"ratelimit:{key}"], args=[rate, burst])
+        return 0.0 if int(allowed) else float(retry_after)
+
+
+class RateLimiter:
+    def __init__(self, store, metrics: AdmissionMetrics):
+        self.store = store
+        self.fallback = MemoryBucketStore()
+        self.metrics = metrics
+
+    def _take(self, key: str, rate: float, burst: int) -> float:
+        try:
+            return self.store.take(key, rate, burst)
+        except Exception as e:
+            # Shared store down: keep limiting per process rather than failing open
+            logger.warning(f"Rate limit store unavailable, using local buckets: {str(e)}")
+            self.metrics.incr("rate_limit_store_errors")
+            return self.fallback.take(key, rate, burst)
+
+    def check(self, endpoint: str, ip: str, voter: Optional[str] = None):
+        """Raise 429 if the client IP or the voter has exhausted its bucket"""
+        limits = [("ip", ip, RATE_LIMIT_IP_PER_MINUTE, RATE_LIMIT_IP_BURST)]
+        if voter is not None:
+            limits.append(("voter", voter, RATE_LIMIT_VOTER_PER_MINUTE, RATE_LIMIT_VOTER_BURST))
+
+        for scope, value, per_minute, burst in limits:
+            retry_after = self._take(f"{endpoint}:{scope}:{value}", per_minute / 60.0, burst)
+            if retry_after:
+                self.metrics.incr(f"shed_rate_limited_{scope}:{endpoint}")
+                raise HTTPException(
+                    status_code=429, detail="Too many requests",
+                    headers={"Retry-After": str(math.ceil(retry_after))}
+                )
+
+
+class InferenceGate:
+    """Bounded concurrency with a bounded, time-limited wait queue"""
+
+    def __init__(self, metrics: AdmissionMetrics, concurrency: int = INFERENCE_CONCURRENCY,
+                 queue_size: int = INFERENCE_QUEUE_SIZE, queue_timeout: float = INFERENCE_QUEUE_TIMEOUT):
+        self.metrics = metrics
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="inference")
+        # Created on first use so it binds to the server's event loop
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+        self.waiting = 0
+
+    def _shed(self, endpoint: str, reason: str):
+        self.metrics.incr(f"shed_{reason}:{endpoint}")
+        raise HTTPException(
+            status_code=503, detail="Face verification is busy, please retry",
+            headers={"Retry-After": str(max(1, math.ceil(self.queue_timeout)))}
+        )
+
+    async def run(self, endpoint: str, fn, *args):
+        """Run fn(*args) on the inference pool once a slot is free, or shed"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        if self.in_flight + self.waiting >= self.concurrency + self.queue_size:
+            self._shed(endpoint, "queue_full")
+
+        self.waiting += 1
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._shed(endpoint, "queue_timeout")
+        finally:
+            self.waiting -= 1
+            self.metrics.observe_wait(time.monotonic() - start)
+
+        self.in_flight += 1
+        self.metrics.incr(f"admitted:{endpoint}")
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def snapshot(self) -> dict:
+        return {"concurrency": self.concurrency, "in_flight": self.in_flight,
+                "waiting": self.waiting, "queue_size": self.queue_size,
+                "queue_timeout_seconds": self.queue_timeout}
+
+
+def _bucket_store():
+    if RATE_LIMIT_REDIS_URL:
+        if redis is None:
+            logger.warning("RATE_LIMIT_REDIS_URL is set but redis is not installed; using local buckets")
+        else:
+            return RedisBucketStore(RATE_LIMIT_REDIS_URL)
+    return MemoryBucketStore()
+
+
+admission_metrics = AdmissionMetrics()
+rate_limiter = RateLimiter(_bucket_store(), admission_metrics)
+inference_gate = InferenceGate(admission_metrics)
+
+
+def metrics_snapshot() -> dict:
+    return {
+        "backend": "redis" if isinstance(rate_limiter.store, RedisBucketStore) else "memory",
+        "inference": inference_gate.snapshot(),
+        **admission_metrics.snapshot(),
+    }
@@ -0,0 +1,388 @@
+"""Columnar snapshot of election data for the heavy admin reports.
+
+The party-performance, top-candidate and booth reports of
+complex_queries.sql (queries 5, 7 and 9) are multi-way joins over VOTE and
+VOTER. Here they are computed from NumPy column arrays refreshed every
+ANALYTICS_REFRESH_SECONDS from the read replicas:
+
+    VOTE     per open or recent election (closed within ANALYTICS_RECENT_DAYS),
+             appended incrementally above a voteId watermark
+    VOTER    constituency, gender and birth date in arrays indexed by voterId,
+             appended incrementally above a voterId watermark
+    ELECTION, CANDIDATE, PARTY, CONSTITUENCY, BOOTH, RESULT
+             small dimension tables, reloaded whole (CANDIDATE and RESULT
+             for the same elections as VOTE)
+
+Auto-increment ids can commit out of order, so each incremental read goes
+back ANALYTICS_REREAD_IDS ids below the watermark and keeps only the rows it
+has not seen. Existing VOTER rows are not re-read; a change of constituency
+shows up after a restart. VOTE is partitioned and has no foreign keys, so
+a ballot whose candidateId is not in CANDIDATE is left out of every report
+and counted in status(). Joins are array lookups and group-bys are
+bincount/unique, so a report over millions of ballots takes milliseconds
+and never touches the primary.
+"""
+from datetime import date, datetime
+from typing import Dict, List, Optional
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+import database as db
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_ENABLED = os.getenv("ANALYTICS_ENABLED", "true").lower() == "true"
+ANALYTICS_REFRESH_SECONDS = int(os.getenv("ANALYTICS_REFRESH_SECONDS", "60"))
+ANALYTICS_REREAD_IDS = int(os.getenv("ANALYTICS_REREAD_IDS", "10000"))
+ANALYTICS_RECENT_DAYS = int(os.getenv("ANALYTICS_RECENT_DAYS", "30"))
+
+# Same buckets and labels as UpdateDemographicStats
+AGE_GROUPS = ["<25", "26-35", "36-50", ">50"]
+AGE_BOUNDS = [25, 36, 51]
+GENDERS = ["", "M", "F", "O"]  # FIELD(gender, 'M', 'F', 'O'); 0 is unknown
+
+VOTE_COLUMNS = {"voteId": np.int64, "voterId": np.int64, "candidateId": np.int64}
+VOTER_COLUMNS = {"voterId": np.int64, "constituencyId": np.int64,
+                 "gender": np.int8, "dateOfBirth": "datetime64[D]"}
+
+
+def _columns(query, params, dtypes) -> Dict[str, np.ndarray]:
+    """Stream a query from a replica into one array per column"""
+    chunks = {name: [] for name in dtypes}
+    for description, rows in db.stream_query(query, params):
+        for (name, *_), values in zip(description, zip(*rows)):
+            chunks[name].append(np.asarray(values, dtype=dtypes[name]))
+    return {name: np.concatenate(parts) if parts else np.empty(0, dtype=dtypes[name])
+            for name, parts in chunks.items()}
+
+
+def _append_unseen(old: Dict[str, np.ndarray], new: Dict[str, np.ndarray], key: str, low: int):
+    """Append rows of new whose key is not already in old (only ids above low can repeat)"""
+    fresh = ~np.isin(new[key], old[key][old[key] > low])
+    return {name: np.concatenate([old[name], new[name][fresh]]) for name in old}
+
+
+def _month_day(days: np.ndarray) -> np.ndarray:
+    months = days.astype("datetime64[M]")
+    month_of_year = (months - days.astype("datetime64[Y]").astype("datetime64[M]")).astype(np.int64)
+    return month_of_year * 31 + (days - months.astype("datetime64[D]")).astype(np.int64)
+
+
+def age_groups(birth: np.ndarray, today: Optional[date] = None) -> np.ndarray:
+    """Index into AGE_GROUPS of each birth date, by completed years as of today"""
+    today = np.datetime64(today or date.today(), "D")
+    years = today.astype("datetime64[Y]").astype(np.int64) - birth.astype("datetime64[Y]").astype(np.int64)
+    years -= _month_day(birth) > _month_day(np.asarray(today))
+    return np.digitize(years, AGE_BOUNDS)
+
+
+def _rank_within(groups: np.ndarray, votes: np.ndarray):
+    """Per row: the top and second vote counts and the vote total of its group"""
+    if not len(groups):
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+    order = np.lexsort((-votes, groups))
+    g, v = groups[order], votes[order]
+    is_start = np.r_[True, g[1:] != g[:-1]]
+    starts = np.flatnonzero(is_start)
+    sizes = np.diff(np.r_[starts, len(g)])
+    first = v[starts]
+    # -1 never matches a vote count, like the NULL of LIMIT 1 OFFSET 1 on a one-row group
+    second = np.where(sizes > 1, v[np.minimum(starts + 1, len(v) - 1)], -1)
+    totals = np.add.reduceat(v, starts)
+    group_of = np.empty(len(order), dtype=np.int64)
+    group_of[order] = np.cumsum(is_start) - 1
+    return first[group_of], second[group_of], totals[group_of]
+
+
+def _lookup(values: np.ndarray, ids: np.ndarray, missing=0) -> np.ndarray:
+    """values[ids] for an array indexed by id; ids past the end get missing"""
+    known = ids < len(values)
+    result = np.full(len(ids), missing, dtype=values.dtype)
+    result[known] = values[ids[known]]
+    return result
+
+
+class Snapshot:
+    def __init__(self):
+        self.votes: Dict[int, Dict[str, np.ndarray]] = {}
+        self.vote_watermarks: Dict[int, int] = {}
+        self.voter_constituency = np.zeros(0, dtype=np.int64)  # indexed by voterId, 0 = unknown
+        self.voter_gender = np.zeros(0, dtype=np.int8)
+        self.voter_birth = np.zeros(0, dtype="datetime64[D]")
+        self.voter_watermark = 0
+        self.elections: Dict[int, str] = {}
+        self.candidates: Dict[str, np.ndarray] = {}  # sorted by candidateId
+        self.candidate_names: Dict[int, str] = {}
+        self.party_names: Dict[int, str] = {}
+        self.constituency_names: Dict[int, str] = {}
+        self.booths: List[dict] = []
+        self.results: Dict[str, np.ndarray] = {}
+        self.unmatched: Dict[int, int] = {}  # electionId -> ballots naming no known candidate
+        self.refreshed_at: Optional[datetime] = None
+        self.refresh_seconds = 0.0
+
+    def _load_votes(self, previous: "Snapshot"):
+        for election_id in self.elections:
+            old = previous.votes.get(election_id)
+            watermark = previous.vote_watermarks.get(election_id, 0)
+            low = max(0, watermark - ANALYTICS_REREAD_IDS) if old is not None else 0
+            new = _columns(
+                "SELECT voteId, voterId, candidateId FROM VOTE WHERE electionId = %s AND voteId > %s",
+                (election_id, low), VOTE_COLUMNS
+            )
+            self.votes[election_id] = _append_unseen(old, new, "voteId", low) if old is not None else new
+            ids = self.votes[election_id]["voteId"]
+            self.vote_watermarks[election_id] = int(ids.max()) if len(ids) else 0
+
+    def _load_voters(self, previous: "Snapshot"):
+        low = max(0, previous.voter_watermark - ANALYTICS_REREAD_IDS)
+        new = _columns(
+            "SELECT voterId, constituencyId, FIELD(gender, 'M', 'F', 'O') AS gender, dateOfBirth "
+            "FROM VOTER WHERE voterId > %s", (low,), VOTER_COLUMNS
+        )
+        size = max(len(previous.voter_constituency), int(new["voterId"].max()) + 1 if len(new["voterId"]) else 0)
+        # Copy rather than write in place: reports may be reading the previous arrays
+        for name, column in (("voter_constituency", "constituencyId"), ("voter_gender", "gender"),
+                             ("voter_birth", "dateOfBirth")):
+            old = getattr(previous, name)
+            values = np.zeros(size, dtype=old.dtype)
+            values[:len(old)] = old
+            values[new["voterId"]] = new[column]
+            setattr(self, name, values)
+        self.voter_watermark = max(previous.voter_watermark, size - 1)
+
+    def _load_elections(self):
+        rows = db.execute_query("""
+            SELECT electionId, title FROM ELECTION
+            WHERE completionStatus = 0 OR endTime >= NOW() - INTERVAL %s DAY
+        """, (ANALYTICS_RECENT_DAYS,), fetch=True, read_only=True)
+        self.elections = {r['electionId']: r['title'] for r in rows}
+
+    def _load_dimensions(self):
+        def q(query, params=()):
+            return db.execute_query(query, params, fetch=True, read_only=True)
+
+        # NULL keeps the IN list valid when no election is loaded
+        election_ids = list(self.elections) or [None]
+        in_elections = f"electionId IN ({', '.join(['%s'] * len(election_ids))})"
+        rows = q(f"SELECT candidateId, name, electionId, constituencyId, partyId FROM CANDIDATE "
+                 f"WHERE {in_elections} ORDER BY candidateId", election_ids)
+        self.candidates = {name: np.array([r[name] for r in rows], dtype=np.int64)
+                           for name in ("candidateId", "electionId", "constituencyId", "partyId")}
+        self.candidate_names = {r['candidateId']: r['name'] for r in rows}
+        self.party_names = {r['partyId']: r['partyName'] for r in q("SELECT partyId, partyName FROM PARTY")}
+        self.constituency_names = {r['constituencyId']: r['name']
+                                   for r in q("SELECT constituencyId, name FROM CONSTITUENCY")}
+        self.booths = q("""
+            SELECT b.boothId, b.location, b.constituencyId, bo.name AS officer_name
+            FROM BOOTH b
+            LEFT JOIN BOOTHOFFICER bo ON b.officerId = bo.officerId
+            ORDER BY b.boothId
+        """)
+        rows = q(f"SELECT electionId, candidateId, totalVotes FROM RESULT WHERE {in_elections}", election_ids)
+        self.results = {name: np.array([r[name] for r in rows], dtype=np.int64)
+                        for name in ("electionId", "candidateId", "totalVotes")}
+
+    @classmethod
+    def refresh(cls, previous: "Snapshot") -> "Snapshot":
+        start = time.monotonic()
+        snapshot = cls()
+        snapshot._load_elections()
+        # Facts before dimensions, so every candidate and voter a ballot references is loaded
+        snapshot._load_votes(previous)
+        snapshot._load_voters(previous)
+        snapshot._load_dimensions()
+        for election_id, columns in snapshot.votes.items():
+            _, found = snapshot.candidate_positions(columns["candidateId"])
+            if not found.all():
+                snapshot.unmatched[election_id] = int(np.count_nonzero(~found))
+                logger.warning(f"Analytics: {snapshot.unmatched[election_id]} ballots of election "
+                               f"{election_id} name a candidate missing from CANDIDATE")
+        snapshot.refreshed_at = datetime.now()
+        snapshot.refresh_seconds = time.monotonic() - start
+        return snapshot
+
+    def candidate_positions(self, candidate_ids: np.ndarray):
+        """Positions in self.candidates of each id, and which ids were found there.
+
+        searchsorted alone would map an unknown id onto a neighbouring candidate.
+        """
+        known = self.candidates["candidateId"]
+        at = np.searchsorted(known, candidate_ids)
+        found = at < len(known)
+        found[found] = known[at[found]] == candidate_ids[found]
+        return at, found
+
+    def tallies(self, election_id: int):
+        """Candidate positions of an election and their votes: RESULT once published, else live from VOTE"""
+        positions = np.flatnonzero(self.candidates["electionId"] == election_id)
+        published = self.results["electionId"] == election_id
+        if published.any():
+            votes = np.zeros(len(self.candidates["candidateId"]), dtype=np.int64)
+            at, found = self.candidate_positions(self.results["candidateId"][published])
+            votes[at[found]] = self.results["totalVotes"][published][found]
+            return positions, votes[positions], "result"
+        at, found = self.candidate_positions(self.votes[election_id]["candidateId"])
+        votes = np.bincount(at[found], minlength=len(self.candidates["candidateId"]))
+        return positions, votes[positions], "live"
+
+    def voter_attributes(self, election_id: int):
+        """Constituency, age group and gender of each ballot's voter (constituency 0 if unknown)"""
+        voter_ids = self.votes[election_id]["voterId"]
+        birth = _lookup(self.voter_birth, voter_ids)
+        return (_lookup(self.voter_constituency, voter_ids), age_groups(birth),
+                _lookup(self.voter_gender, voter_ids))
+
+
+class AnalyticsEngine:
+    """Holds the current snapshot; reports read whichever snapshot is current when they start"""
+
+    def __init__(self):
+        self._refresh_lock = threading.Lock()
+        self.snapshot: Optional[Snapshot] = None
+
+    def refresh(self):
+        with self._refresh_lock:
+            self.snapshot = Snapshot.refresh(self.snapshot or Snapshot())
+        logger.info(f"Analytics snapshot refreshed in {self.snapshot.refresh_seconds:.2f}s")
+
+    def _current(self, election_id: int) -> Snapshot:
+        snapshot = self.snapshot
+        if snapshot is None:
+            raise SnapshotNotReady()
+        if election_id not in snapshot.votes:
+            raise LookupError(f"Election {election_id} is not in the analytics snapshot")
+        return snapshot
+
+    def _meta(self, snapshot: Snapshot, election_id: int, source: str) -> dict:
+        return {"election_id": election_id, "election": snapshot.elections[election_id],
+                "source": source, "snapshot_at": snapshot.refreshed_at.isoformat()}
+
+    def party_performance(self, election_id: int) -> dict:
+        """Query 5: constituencies contested, votes, seats won and runner-up finishes per party"""
+        snapshot = self._current(election_id)
+        positions, votes, source = snapshot.tallies(election_id)
+        constituency = snapshot.candidates["constituencyId"][positions]
+        party = snapshot.candidates["partyId"][positions]
+
+        parties, party_index = np.unique(party, return_inverse=True)
+        contested = np.bincount(np.unique(np.stack([party_index, constituency]), axis=1)[0],
+                                minlength=len(parties))
+
+        # Candidates without votes have no RESULT row and take no part below
+        polled = votes > 0
+        first, second, totals = _rank_within(constituency[polled], votes[polled])
+        index = party_index[polled]
+        percentage = np.round(votes[polled] * 100.0 / np.maximum(totals, 1), 2)
+        n = len(parties)
+        total_votes = np.bincount(index, weights=votes[polled], minlength=n)
+        rows_with_votes = np.bincount(index, minlength=n)
+        pct_sum = np.bincount(index, weights=percentage, minlength=n)
+        seats = np.bincount(index, weights=votes[polled] == first, minlength=n)
+        runner_up = np.bincount(index, weights=votes[polled] == second, minlength=n)
+
+        rows = [{
+            "partyName": snapshot.party_names.get(int(parties[i])),
+            "constituencies_contested": int(contested[i]),
+            "total_votes_received": int(total_votes[i]),
+            "avg_vote_percentage": round(float(pct_sum[i] / rows_with_votes[i]), 2) if rows_with_votes[i] else None,
+            "seats_won": int(seats[i]),
+            "runner_up_count": int(runner_up[i]),
+        } for i in range(n)]
+        rows.sort(key=lambda r: (-r["seats_won"], -r["total_votes_received"]))
+        return {**self._meta(snapshot, election_id, source), "parties": rows}
+
+    def top_candidates(self, election_id: int, limit: Optional[int] = None) -> dict:
+        """Query 7: constituency winners with the age and gender profile of their own voters"""
+        snapshot = self._current(election_id)
+        positions, votes, source = snapshot.tallies(election_id)
+        constituency = snapshot.candidates["constituencyId"][positions]
+        first, second, totals = _rank_within(constituency, votes)
+        winners = np.flatnonzero((votes == first) & (votes > 0))
+        winners = winners[np.argsort(-votes[winners], kind="stable")][:limit]
+
+        # Ballot counts by (candidate, age group) and (candidate, gender) in two bincounts
+        n = len(snapshot.candidates["candidateId"])
+        voter_constituency, age_group, gender = snapshot.voter_attributes(election_id)
+        at, found = snapshot.candidate_positions(snapshot.votes[election_id]["candidateId"])
+        known = (voter_constituency > 0) & found
+        ballots = at[known]
+        by_age = np.bincount(ballots * len(AGE_GROUPS) + age_group[known],
+                             minlength=n * len(AGE_GROUPS)).reshape(n, len(AGE_GROUPS))
+        by_gender = np.bincount(ballots * len(GENDERS) + gender[known],
+                                minlength=n * len(GENDERS)).reshape(n, len(GENDERS))
+
+        rows = []
+        for i in winners:
+            position = positions[i]
+            ages, genders = by_age[position], by_gender[position, 1:]
+            rows.append({
+                "candidate_name": snapshot.candidate_names[int(snapshot.candidates["candidateId"][position])],
+                "partyName": snapshot.party_names.get(int(snapshot.candidates["partyId"][position])),
+                "constituency": snapshot.constituency_names.get(int(constituency[i])),
+                "totalVotes": int(votes[i]),
+                "votePercentage": round(float(votes[i] * 100.0 / totals[i]), 2),
+                "victory_margin": int(first[i] - max(second[i], 0)),
+                "strongest_age_group": AGE_GROUPS[int(ages.argmax())] if ages.any() else None,
+                "dominant_gender": GENDERS[1 + int(genders.argmax())] if genders.any() else None,
+                "age_groups": dict(zip(AGE_GROUPS, map(int, ages))),
+                "genders": dict(zip(GENDERS[1:], map(int, genders))),
+            })
+        return {**self._meta(snapshot, election_id, source), "candidates": rows}
+
+    def booth_metrics(self, election_id: int) -> dict:
+        """Query 9: registered voters, ballots and turnout for each booth's constituency"""
+        snapshot = self._current(election_id)
+        registered = dict(zip(*np.unique(snapshot.voter_constituency[snapshot.voter_constituency > 0],
+                                         return_counts=True)))
+        voter_constituency, _, _ = snapshot.voter_attributes(election_id)
+        cast = dict(zip(*np.unique(voter_constituency, return_counts=True)))
+        # CalculateTurnout counts ballots by the candidate's constituency
+        at, found = snapshot.candidate_positions(snapshot.votes[election_id]["candidateId"])
+        by_candidate = dict(zip(*np.unique(snapshot.candidates["constituencyId"][at[found]], return_counts=True)))
+
+        rows = []
+        for booth in snapshot.booths:
+            c = booth['constituencyId']
+            voters, votes = int(registered.get(c, 0)), int(cast.get(c, 0))
+            rows.append({
+                "boothId": booth['boothId'],
+                "location": booth['location'],
+                "constituency": snapshot.constituency_names.get(c),
+                "officer_name": booth['officer_name'],
+                "voters_from_booth": voters,
+                "votes_cast": votes,
+                "booth_turnout": round(votes * 100.0 / voters, 2) if voters else None,
+                "constituency_turnout": round(int(by_candidate.get(c, 0)) * 100.0 / voters, 2) if voters else 0.0,
+            })
+        rows.sort(key=lambda r: -r["votes_cast"])
+        return {**self._meta(snapshot, election_id, "live"), "booths": rows}
+
+    def status(self) -> dict:
+        snapshot = self.snapshot
+        if snapshot is None:
+            return {"enabled": ANALYTICS_ENABLED, "ready": False}
+        return {
+            "enabled": ANALYTICS_ENABLED,
+            "ready": True,
+            "snapshot_at": snapshot.refreshed_at.isoformat(),
+            "refresh_seconds": round(snapshot.refresh_seconds, 3),
+            "voters": int(np.count_nonzero(snapshot.voter_constituency)),
+            "voter_watermark": snapshot.voter_watermark,
+            "elections": {election_id: {"votes": len(columns["voteId"]),
+                                        "watermark": snapshot.vote_watermarks[election_id],
+                                        "unmatched_candidates": snapshot.unmatched.get(election_id, 0)}
+                          for election_id, columns in snapshot.votes.items()},
+        }
+
+
+class SnapshotNotReady(Exception):
+    pass
+
+
+analytics_engine = AnalyticsEngine()
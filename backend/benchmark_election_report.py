@@ -0,0 +1,172 @@
+"""Regression benchmark: GenerateElectionReport must scale linearly in ballots.
+
+Usage:
+    python benchmark_election_report.py [--sizes 1000,2000,4000,8000] [--candidates 10] [--legacy]
+
+For each size a synthetic election is created with its VOTE partitions (DDL,
+so outside the transaction), then candidates, voters, ballots and results are
+seeded inside a transaction, the report procedure is timed, everything is
+rolled back and the election and its partitions are dropped. The run fails if, between consecutive sizes, report time grows
+more than MAX_GROWTH times faster than the ballot count. --legacy also times
+the old fan-out join for comparison.
+"""
+import argparse
+import hashlib
+import os
+import sys
+import time
+import uuid
+
+import database as db
+
+MAX_GROWTH = 3.0
+REPEATS = 5
+
+LEGACY_REPORT = """
+    SELECT
+        e.title, COUNT(DISTINCT v.voterId), COUNT(DISTINCT c.constituencyId),
+        COUNT(DISTINCT cand.candidateId), ROUND(AVG(r.votePercentage), 2), MAX(r.totalVotes)
+    FROM ELECTION e
+    LEFT JOIN VOTE v ON e.electionId = v.electionId
+    LEFT JOIN CANDIDATE cand ON e.electionId = cand.electionId
+    LEFT JOIN CONSTITUENCY c ON cand.constituencyId = c.constituencyId
+    LEFT JOIN RESULT r ON e.electionId = r.electionId
+    WHERE e.electionId = %s
+    GROUP BY e.electionId, e.title
+"""
+
+
+def create_election(conn, cursor, tag):
+    public_pem = f"bench-key-{tag}"
+    cursor.execute("""
+        INSERT INTO ELECTION (title, startTime, endTime, publicKeyPem)
+        VALUES (%s, NOW() - INTERVAL 1 HOUR, NOW() + INTERVAL 1 HOUR, %s)
+    """, (f"bench-{tag}", public_pem))
+    election_id = cursor.lastrowid
+    fingerprint = hashlib.sha256(public_pem.encode('utf-8')).digest()
+    cursor.execute(
+        "INSERT INTO ELECTION_KEY (keyFingerprint, electionId, publicKeyPem) VALUES (%s, %s, %s)",
+        (fingerprint, election_id, public_pem)
+    )
+    conn.commit()
+    cursor.callproc('AddElectionPartitions', (election_id,))
+    return election_id, fingerprint
+
+
+def drop_election(conn, cursor, election_id):
+    for table in ("VOTE", "VOTER_ELECTION_STATUS"):
+        cursor.execute(f"ALTER TABLE {table} DROP PARTITION p{election_id}")
+    cursor.execute("DELETE FROM ELECTION_KEY WHERE electionId = %s", (election_id,))
+    cursor.execute("DELETE FROM ELECTION WHERE electionId = %s", (election_id,))
+    conn.commit()
+
+
+def seed(cursor, election_id, fingerprint, tag, ballots, candidates):
+    cursor.execute(
+        "INSERT INTO CONSTITUENCY (name, district, state) VALUES (%s, 'Bench', 'Bench')",
+        (f"bench-{tag}",)
+    )
+    constituency_id = cursor.lastrowid
+    cursor.execute(
+        "INSERT INTO PARTY (partyName, symbol, leader) VALUES (%s, %s, 'Bench')",
+        (f"bench-{tag}", b"\x00")
+    )
+    party_id = cursor.lastrowid
+
+    cursor.executemany(
+        "INSERT INTO CANDIDATE (name, age, partyId, electionId, constituencyId) VALUES (%s, 40, %s, %s, %s)",
+        [(f"cand-{i}", party_id, election_id, constituency_id) for i in range(candidates)]
+    )
+    cursor.execute("SELECT candidateId FROM CANDIDATE WHERE electionId = %s", (election_id,))
+    candidate_ids = [row[0] for row in cursor.fetchall()]
+
+    cursor.executemany("""
+        INSERT INTO VOTER (name, dateOfBirth, gender, address, constituencyId, voterIdNumber, passwordHash)
+        VALUES ('Bench', '1990-01-01', 'M', 'Bench address', %s, %s, '')
+    """, [(constituency_id, f"b{tag}{i}") for i in range(ballots)])
+    cursor.execute("SELECT voterId FROM VOTER WHERE constituencyId = %s", (constituency_id,))
+    voter_ids = [row[0] for row in cursor.fetchall()]
+
+    rows = []
+    for i, voter_id in enumerate(voter_ids):
+        ciphertext = os.urandom(256)
+        rows.append((voter_id, election_id, candidate_ids[i % candidates], ciphertext,
+                     hashlib.sha256(ciphertext).digest(), fingerprint))
+    for start in range(0, len(rows), 1000):
+        cursor.executemany("""
+            INSERT INTO VOTE (voterId, electionId, candidateId, encryptedVote, voteHash, keyFingerprint)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, rows[start:start + 1000])
+
+    cursor.callproc('CalculateResults', (election_id, constituency_id))
+
+
+def time_call(fn):
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Election report scaling benchmark")
+    parser.add_argument("--sizes", default="1000,2000,4000,8000")
+    parser.add_argument("--candidates", type=int, default=10)
+    parser.add_argument("--legacy", action="store_true", help="also time the old fan-out query")
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    conn = db.connect_standalone()
+    cursor = conn.cursor()
+    measurements = []
+    election_id = None
+    try:
+        for size in sizes:
+            tag = uuid.uuid4().hex[:12]
+            election_id, fingerprint = create_election(conn, cursor, tag)
+            conn.start_transaction()
+            seed(cursor, election_id, fingerprint, tag, size, args.candidates)
+
+            def report():
+                cursor.callproc('GenerateElectionReport', (election_id,))
+                for result in cursor.stored_results():
+                    result.fetchall()
+
+            def legacy():
+                cursor.execute(LEGACY_REPORT, (election_id,))
+                cursor.fetchall()
+
+            elapsed = time_call(report)
+            legacy_elapsed = time_call(legacy) if args.legacy else None
+            conn.rollback()
+            drop_election(conn, cursor, election_id)
+            election_id = None
+
+            measurements.append((size, elapsed))
+            line = f"{size:>8} ballots  report {elapsed * 1000:8.2f} ms  ({elapsed * 1e6 / size:6.2f} us/ballot)"
+            if legacy_elapsed is not None:
+                line += f"  legacy {legacy_elapsed * 1000:10.2f} ms"
+            print(line)
+    finally:
+        if election_id is not None:
+            # Seeding or timing failed part-way: undo the seed and drop the partitions
+            conn.rollback()
+            drop_election(conn, cursor, election_id)
+        cursor.close()
+        conn.close()
+
+    failed = False
+    for (small, t_small), (large, t_large) in zip(measurements, measurements[1:]):
+        growth = (t_large / t_small) / (large / small)
+        if growth > MAX_GROWTH:
+            print(f"FAIL: {small} -> {large} ballots grew {growth:.2f}x faster than linear")
+            failed = True
+    if failed:
+        sys.exit(1)
+    print("OK: report time scales linearly with ballots")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""Benchmark face detection modes on a fixture image set.
+
+Usage:
+    python benchmark_face_detection.py <image_dir> [--repeat N]
+
+Every image in <image_dir> is run through detect_face in "mtcnn" mode and in
+"cascade" mode. Per-mode latency and, for the cascade, how often the fast
+path was taken versus the MTCNN fallback are printed.
+
+The Haar box is framed differently from the MTCNN box that enrolled
+encodings are made from, so the run also compares the two paths on the same
+images:
+
+  - the cosine similarity between the FaceNet embedding of the Haar crop and
+    that of the MTCNN crop, for every image where both find one face;
+  - when <image_dir> holds one subdirectory per person, the accept/reject
+    decision of each path against every person's enrollment (the MTCNN
+    embedding of their first image), with false accepts and false rejects;
+  - for each Haar stage weight seen, how many images would take the fast
+    path at that FACE_FAST_DETECTION_MIN_WEIGHT and how many of those would
+    be decided differently from MTCNN.
+
+The lowest weight with no disagreement is printed as the suggested
+FACE_FAST_DETECTION_MIN_WEIGHT. Enable FACE_DETECTION_MODE=cascade only
+once that holds on images from your booths.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from face_recognition import face_recognition_system, FAST_DETECTION_MIN_WEIGHT, VERIFY_THRESHOLD
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def load_images(image_dir):
+    """(name, person, image) for every image; person is the subdirectory, or None"""
+    images = []
+    for root, dirs, files in os.walk(image_dir):
+        dirs.sort()
+        person = os.path.relpath(root, image_dir)
+        for name in sorted(files):
+            if not name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            image = cv2.imread(os.path.join(root, name))
+            if image is not None:
+                images.append((os.path.join(person, name) if person != "." else name,
+                               person if person != "." else None, image))
+    return images
+
+
+def run_mode(mode, images, repeat):
+    face_recognition_system.detection_mode = mode
+    timings = []
+    paths = {}
+    detected = 0
+
+    # Warm up so model initialisation is not counted
+    face_recognition_system.detect_face(images[0][2])
+
+    for _ in range(repeat):
+        for _, _, image in images:
+            start = time.perf_counter()
+            face = face_recognition_system.detect_face(image)
+            timings.append((time.perf_counter() - start) * 1000)
+
+            path = face_recognition_system.last_detection_path
+            paths[path] = paths.get(path, 0) + 1
+            if face is not None:
+                detected += 1
+
+    timings.sort()
+    return {
+        "mean_ms": statistics.mean(timings),
+        "p50_ms": timings[len(timings) // 2],
+        "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        "detected": detected,
+        "total": len(timings),
+        "paths": paths,
+    }
+
+
+def cosine(a, b):
+    return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+
+def embed_both(images):
+    """Per image found by both detectors: name, person, Haar weight and both embeddings"""
+    frs = face_recognition_system
+    records = []
+    for name, person, image in images:
+        rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        mtcnn_box = frs.detect_face_mtcnn(rgb)
+        haar = frs.detect_face_haar(image)
+        if mtcnn_box is None or haar is None:
+            continue
+        haar_box, weight = haar
+        records.append({
+            "name": name,
+            "person": person,
+            "weight": weight,
+            "mtcnn": frs.get_face_encoding(frs._crop_face(rgb, mtcnn_box)),
+            "haar": frs.get_face_encoding(frs._crop_face(rgb, haar_box)),
+        })
+    return records
+
+
+def disagreements(records):
+    """Names of images the Haar crop decides differently from the MTCNN crop.
+
+    With people, each image is probed against every enrollment; without, the
+    Haar embedding must match the MTCNN embedding of the same image.
+    """
+    enrolled = {}
+    for r in records:
+        if r["person"] is not None:
+            enrolled.setdefault(r["person"], r)
+
+    differ = set()
+    errors = {"mtcnn": {"false_accept": 0, "false_reject": 0},
+              "haar": {"false_accept": 0, "false_reject": 0}}
+    for r in records:
+        if not enrolled:
+            if cosine(r["haar"], r["mtcnn"]) < VERIFY_THRESHOLD:
+                differ.add(r["name"])
+            continue
+        for person, enrollment in enrolled.items():
+            if enrollment is r:
+                continue
+            genuine = person == r["person"]
+            decisions = {}
+            for path in ("mtcnn", "haar"):
+                accept = cosine(r[path], enrollment["mtcnn"]) >= VERIFY_THRESHOLD
+                decisions[path] = accept
+                if accept and not genuine:
+                    errors[path]["false_accept"] += 1
+                elif genuine and not accept:
+                    errors[path]["false_reject"] += 1
+            if decisions["mtcnn"] != decisions["haar"]:
+                differ.add(r["name"])
+    return differ, (errors if enrolled else None)
+
+
+def compare_paths(images):
+    records = embed_both(images)
+    if not records:
+        print("\nNo image had a face found by both MTCNN and the Haar cascade")
+        return
+
+    similarity = sorted(cosine(r["haar"], r["mtcnn"]) for r in records)
+    print(f"\n[haar crop vs mtcnn crop] {len(records)} images found by both")
+    print(f"  embedding similarity: min {similarity[0]:.3f} | p5 "
+          f"{similarity[int(len(similarity) * 0.05)]:.3f} | median {statistics.median(similarity):.3f}")
+    print(f"  below the verify threshold {VERIFY_THRESHOLD}: "
+          f"{sum(s < VERIFY_THRESHOLD for s in similarity)}")
+
+    differ, errors = disagreements(records)
+    if errors is not None:
+        for path, counts in errors.items():
+            print(f"  {path:<6} probes: {counts['false_accept']} false accepts, "
+                  f"{counts['false_reject']} false rejects")
+
+    print("\n  min weight  fast path  decided differently")
+    suggested = None
+    marked = False
+    for weight in sorted({round(r["weight"], 2) for r in records}):
+        fast = [r for r in records if r["weight"] >= weight]
+        wrong = sum(r["name"] in differ for r in fast)
+        marker = ""
+        if not marked and weight >= FAST_DETECTION_MIN_WEIGHT:
+            marker, marked = " <- current", True
+        print(f"  {weight:>10.2f}  {len(fast):>9}  {wrong:>19}{marker}")
+        if suggested is None and wrong == 0:
+            suggested = weight
+    if suggested is None:
+        print("\nThe Haar path disagrees with MTCNN at every weight; keep FACE_DETECTION_MODE=mtcnn")
+    else:
+        print(f"\nSuggested FACE_FAST_DETECTION_MIN_WEIGHT: {suggested:.2f} "
+              f"(current {FAST_DETECTION_MIN_WEIGHT})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("image_dir")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    images = load_images(args.image_dir)
+    if not images:
+        print(f"No images found in {args.image_dir}")
+        sys.exit(1)
+
+    print(f"Benchmarking {len(images)} images x {args.repeat} runs")
+    results = {mode: run_mode(mode, images, args.repeat) for mode in ("mtcnn", "cascade")}
+
+    for mode, r in results.items():
+        print(f"\n[{mode}]")
+        print(f"  mean {r['mean_ms']:.1f} ms | p50 {r['p50_ms']:.1f} ms | p95 {r['p95_ms']:.1f} ms")
+        print(f"  detected {r['detected']}/{r['total']}")
+        print(f"  paths {r['paths']}")
+
+    speedup = results["mtcnn"]["mean_ms"] / results["cascade"]["mean_ms"]
+    print(f"\nCascade speedup over MTCNN: {speedup:.2f}x")
+
+    compare_paths(images)
+
+
+if __name__ == "__main__":
+    main()
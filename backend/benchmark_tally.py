@@ -0,0 +1,90 @@
+"""Benchmark homomorphic tallying against per-ballot RSA decryption.
+
+Usage:
+    python benchmark_tally.py [--ballots N] [--candidates K] [--key-size BITS] [--workers W]
+
+Synthetic ballots are encrypted under both schemes (not timed), then the
+time to produce a constituency tally is measured:
+
+  rsa       decrypt every ballot with the election private key and count
+  paillier  multiply all one-hot ciphertext vectors, decrypt K aggregates
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from encryption import vote_encryption
+from paillier import (PaillierBallot, PaillierPrivateKey, combine_ciphertexts,
+                         load_public_key, paillier_ballot)
+
+
+def aggregate(chunk, n_squared):
+    acc = chunk[0]
+    for ballot in chunk[1:]:
+        acc = combine_ciphertexts(acc, ballot, n_squared)
+    return acc
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare tally strategies")
+    parser.add_argument("--ballots", type=int, default=500)
+    parser.add_argument("--candidates", type=int, default=4)
+    parser.add_argument("--key-size", type=int, default=2048)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    candidate_ids = list(range(1, args.candidates + 1))
+    choices = [random.choice(candidate_ids) for _ in range(args.ballots)]
+
+    print(f"{args.ballots} ballots, {args.candidates} candidates, {args.key_size}-bit keys")
+    print("Encrypting ballots (setup, not timed)...")
+
+    rsa_public, rsa_private = vote_encryption.generate_keypair()
+    rsa_ballots = [vote_encryption.encrypt_vote(c, rsa_public)[0] for c in choices]
+
+    paillier_public, paillier_private = paillier_ballot.generate_keypair(args.key_size)
+    public_key = load_public_key(paillier_public)
+    paillier_ballots = [
+        PaillierBallot.split_ballot(
+            paillier_ballot.encrypt_ballot(candidate_ids, c, paillier_public)[0], public_key
+        )
+        for c in choices
+    ]
+
+    # RSA: one private-key operation per ballot
+    start = time.perf_counter()
+    rsa_counts = dict.fromkeys(candidate_ids, 0)
+    for ballot in rsa_ballots:
+        rsa_counts[vote_encryption.decrypt_vote(ballot, rsa_private)] += 1
+    rsa_time = time.perf_counter() - start
+
+    # Paillier: ciphertext products, then one decryption per candidate
+    private_key = PaillierPrivateKey.from_pem(paillier_private)
+    start = time.perf_counter()
+    acc = aggregate(paillier_ballots, public_key.n_squared)
+    paillier_counts = dict(zip(candidate_ids, (private_key.decrypt(c) for c in acc)))
+    paillier_time = time.perf_counter() - start
+
+    # Paillier, aggregation split across worker processes
+    start = time.perf_counter()
+    size = -(-len(paillier_ballots) // args.workers)
+    chunks = [paillier_ballots[i:i + size] for i in range(0, len(paillier_ballots), size)]
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        partials = list(pool.map(aggregate, chunks, [public_key.n_squared] * len(chunks)))
+    acc = aggregate(partials, public_key.n_squared)
+    parallel_counts = dict(zip(candidate_ids, (private_key.decrypt(c) for c in acc)))
+    parallel_time = time.perf_counter() - start
+
+    assert rsa_counts == paillier_counts == parallel_counts, "tallies disagree"
+
+    print(f"\n{'strategy':<22}{'tally s':>10}{'ms/ballot':>12}")
+    for name, elapsed in (("rsa per-ballot", rsa_time),
+                          ("paillier", paillier_time),
+                          (f"paillier x{args.workers} procs", parallel_time)):
+        print(f"{name:<22}{elapsed:>10.3f}{elapsed * 1000 / args.ballots:>12.3f}")
+    print(f"\nTally: {paillier_counts}")
+
+
+if __name__ == "__main__":
+    main()
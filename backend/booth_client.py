@@ -0,0 +1,255 @@
+"""Booth terminal client: encrypt ballots offline, upload signed batches later.
+
+Usage:
+    python booth_client.py keygen                       # prints the public key for the admin to register
+    python booth_client.py login <email> <password> <booth_id>
+    python booth_client.py sync                         # cache open elections, keys and candidates
+    python booth_client.py cast <election_id> <voter_id> <candidate_id>
+    python booth_client.py upload [--batch-size 200]
+    python booth_client.py status
+
+All state lives in a local SQLite file (--db, default booth_queue.db), so
+ballots survive restarts and can be cast with no connectivity after sync.
+Each ballot gets an idempotency key when it is cast and each batch a
+batch id when it is formed; a batch that fails to upload is resent with the
+same id and payload, so retries never create duplicate votes. The admin
+registers the booth key with PUT /api/admin/booths/{booth_id}/key.
+
+Only RSA elections are supported.
+"""
+import argparse
+import base64
+import json
+import sqlite3
+import sys
+import urllib.error
+import urllib.request
+import uuid
+from datetime import datetime, timezone
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+
+from encryption import vote_encryption
+
+DEFAULT_SERVER = "http://localhost:8000"
+DEFAULT_DB = "booth_queue.db"
+KEY_FILE = "booth_signing_key.pem"
+BATCH_SIZE = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS elections (election_id INTEGER PRIMARY KEY, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS ballots (
+    idempotency_key TEXT PRIMARY KEY,
+    election_id INTEGER NOT NULL,
+    voter_id INTEGER NOT NULL,
+    candidate_id INTEGER NOT NULL,
+    encrypted_vote TEXT NOT NULL,
+    vote_hash TEXT NOT NULL,
+    key_fingerprint TEXT NOT NULL,
+    cast_at TEXT NOT NULL,
+    batch_id TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    vote_id INTEGER,
+    reason TEXT
+);
+CREATE TABLE IF NOT EXISTS batches (
+    batch_id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def signed_payload(booth_id, batch_id, ballots):
+    """Must match booth_ingest.signed_payload; kept here so the client needs no database"""
+    return json.dumps({"booth_id": booth_id, "batch_id": batch_id, "ballots": ballots},
+                      sort_keys=True, separators=(",", ":")).encode('utf-8')
+
+
+def open_queue(path):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def get_meta(conn, key):
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row["value"] if row else None
+
+
+def set_meta(conn, key, value):
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+    conn.commit()
+
+
+def request_json(method, url, body=None, token=None):
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    req = urllib.request.Request(url, data=data, method=method)
+    req.add_header("Content-Type", "application/json")
+    if token:
+        req.add_header("Authorization", f"Bearer {token}")
+    with urllib.request.urlopen(req, timeout=30) as resp:
+        return json.loads(resp.read())
+
+
+def load_signing_key():
+    with open(KEY_FILE, 'rb') as f:
+        return serialization.load_pem_private_key(f.read(), password=None)
+
+
+def keygen(args, conn):
+    key = Ed25519PrivateKey.generate()
+    with open(KEY_FILE, 'wb') as f:
+        f.write(key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption()
+        ))
+    print(key.public_key().public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode('utf-8'))
+
+
+def login(args, conn):
+    result = request_json("POST", f"{args.server}/api/booth/login",
+                          {"email": args.email, "password": args.password})
+    set_meta(conn, "token", result["access_token"])
+    set_meta(conn, "booth_id", str(args.booth_id))
+    print(f"Logged in; assigned booths: {[b['boothId'] for b in result['booths']]}")
+
+
+def sync(args, conn):
+    booth_id = get_meta(conn, "booth_id")
+    result = request_json("GET", f"{args.server}/api/booth/{booth_id}/elections",
+                          token=get_meta(conn, "token"))
+    conn.execute("DELETE FROM elections")
+    for election in result["elections"]:
+        conn.execute("INSERT INTO elections (election_id, data) VALUES (?, ?)",
+                     (election["electionId"], json.dumps(election, default=str)))
+    conn.commit()
+    print(f"Cached {len(result['elections'])} elections for booth {booth_id}")
+
+
+def cast(args, conn):
+    row = conn.execute("SELECT data FROM elections WHERE election_id = ?", (args.election_id,)).fetchone()
+    if not row:
+        raise SystemExit("Election not cached; run sync while online")
+    election = json.loads(row["data"])
+    if election["ballotScheme"] != "RSA":
+        raise SystemExit("This client only encrypts RSA ballots")
+    if args.candidate_id not in {c["candidateId"] for c in election["candidates"]}:
+        raise SystemExit("Candidate is not standing at this booth")
+
+    ciphertext, vote_hash = vote_encryption.encrypt_vote(args.candidate_id, election["publicKeyPem"])
+    key = uuid.uuid4().hex
+    conn.execute("""
+        INSERT INTO ballots (idempotency_key, election_id, voter_id, candidate_id,
+                             encrypted_vote, vote_hash, key_fingerprint, cast_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, (key, args.election_id, args.voter_id, args.candidate_id,
+          base64.b64encode(ciphertext).decode('ascii'), vote_hash,
+          vote_encryption.key_fingerprint(election["publicKeyPem"]).hex(),
+          datetime.now(timezone.utc).isoformat()))
+    conn.commit()
+    print(f"Queued ballot {key} (receipt hash {vote_hash})")
+
+
+def _ballot_payload(row):
+    return {k: row[k] for k in ("idempotency_key", "election_id", "voter_id", "candidate_id",
+                                "encrypted_vote", "vote_hash", "key_fingerprint", "cast_at")}
+
+
+def upload(args, conn):
+    booth_id = int(get_meta(conn, "booth_id"))
+    token = get_meta(conn, "token")
+    signing_key = load_signing_key()
+
+    while True:
+        # Resend an unfinished batch first, unchanged, before forming a new one
+        batch = conn.execute("SELECT batch_id FROM batches WHERE done = 0 ORDER BY created_at LIMIT 1").fetchone()
+        if batch:
+            batch_id = batch["batch_id"]
+        else:
+            pending = conn.execute(
+                "SELECT idempotency_key FROM ballots WHERE status = 'pending' AND batch_id IS NULL "
+                "ORDER BY cast_at LIMIT ?", (args.batch_size,)
+            ).fetchall()
+            if not pending:
+                break
+            batch_id = uuid.uuid4().hex
+            conn.execute("INSERT INTO batches (batch_id, created_at) VALUES (?, ?)",
+                         (batch_id, datetime.now(timezone.utc).isoformat()))
+            conn.executemany("UPDATE ballots SET batch_id = ? WHERE idempotency_key = ?",
+                             [(batch_id, r["idempotency_key"]) for r in pending])
+            conn.commit()
+
+        rows = conn.execute(
+            "SELECT * FROM ballots WHERE batch_id = ? ORDER BY cast_at, idempotency_key", (batch_id,)
+        ).fetchall()
+        ballots = [_ballot_payload(r) for r in rows]
+        signature = signing_key.sign(signed_payload(booth_id, batch_id, ballots)).hex()
+
+        try:
+            result = request_json("POST", f"{args.server}/api/booth/{booth_id}/batches",
+                                  {"batch_id": batch_id, "ballots": ballots, "signature": signature},
+                                  token=token)
+        except urllib.error.HTTPError as e:
+            print(f"Batch {batch_id} refused: HTTP {e.code} {e.read().decode('utf-8', 'replace')}")
+            sys.exit(1)
+        except (urllib.error.URLError, TimeoutError) as e:
+            print(f"Upload of batch {batch_id} failed ({e}); it will be resent unchanged")
+            sys.exit(1)
+
+        for outcome in result["outcomes"]:
+            conn.execute(
+                "UPDATE ballots SET status = ?, vote_id = ?, reason = ? WHERE idempotency_key = ?",
+                (outcome["status"], outcome.get("vote_id"), outcome.get("reason"), outcome["idempotency_key"])
+            )
+        conn.execute("UPDATE batches SET done = 1 WHERE batch_id = ?", (batch_id,))
+        conn.commit()
+        print(f"Batch {batch_id}: {result['accepted']} accepted, {result['duplicate']} duplicate, "
+              f"{result['rejected']} rejected{' (replayed)' if result['replayed'] else ''}")
+
+
+def status(args, conn):
+    for row in conn.execute("SELECT status, COUNT(*) AS n FROM ballots GROUP BY status"):
+        print(f"{row['status']:<10}{row['n']:>8}")
+    for row in conn.execute("SELECT idempotency_key, reason FROM ballots WHERE status = 'rejected'"):
+        print(f"  rejected {row['idempotency_key']}: {row['reason']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline booth terminal client")
+    parser.add_argument("--server", default=DEFAULT_SERVER)
+    parser.add_argument("--db", default=DEFAULT_DB)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("keygen")
+    p = sub.add_parser("login")
+    p.add_argument("email")
+    p.add_argument("password")
+    p.add_argument("booth_id", type=int)
+    sub.add_parser("sync")
+    p = sub.add_parser("cast")
+    p.add_argument("election_id", type=int)
+    p.add_argument("voter_id", type=int)
+    p.add_argument("candidate_id", type=int)
+    p = sub.add_parser("upload")
+    p.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    sub.add_parser("status")
+    args = parser.parse_args()
+
+    conn = open_queue(args.db)
+    try:
+        {"keygen": keygen, "login": login, "sync": sync, "cast": cast,
+         "upload": upload, "status": status}[args.command](args, conn)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
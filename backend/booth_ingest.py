@@ -0,0 +1,404 @@
+"""Batched ingestion of ballots encrypted offline at booth terminals.
+
+A booth terminal encrypts each ballot with the election public key while
+offline, queues it, and uploads batches signed with its Ed25519 key
+(BOOTH.publicKeyPem). For every batch:
+
+  1. the signature is checked over the canonical JSON of
+     {booth_id, batch_id, ballots};
+  2. a batch id already seen with the same payload returns the stored
+     outcomes, and the same id with a different payload is refused;
+  3. ballots are validated with a handful of set-based queries (duplicate
+     idempotency keys, voters, candidates, keys, voting status);
+  4. the valid ones are written with multi-row INSERTs in one transaction,
+     together with their idempotency keys and the batch record.
+
+Every ballot gets an outcome: accepted (with its voteId), duplicate (an
+idempotency key this booth already uploaded, with the original voteId) or
+rejected (with a reason). If the multi-row insert loses a race, for example
+with the same voter voting online, the batch is retried row by row under
+savepoints so only the conflicting ballots are rejected. A deadlock rolls
+back the whole transaction, savepoints included, so then the batch is
+validated and written again from the start, up to BOOTH_DEADLOCK_RETRIES
+times.
+
+Only RSA ballots are accepted. A malformed Paillier ballot would block the
+homomorphic tally of its whole election, and booth_client.py only encrypts
+RSA ballots.
+"""
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+import base64
+import binascii
+import hashlib
+import json
+import logging
+import os
+
+import mysql.connector
+from mysql.connector import errorcode
+
+import database as db
+import models
+from bulletin_board import bulletin_board
+from voter_roll import voter_roll
+
+logger = logging.getLogger(__name__)
+
+# Ballots may be uploaded this long after the election closes
+BOOTH_UPLOAD_GRACE_HOURS = float(os.getenv("BOOTH_UPLOAD_GRACE_HOURS", "24"))
+BOOTH_DEADLOCK_RETRIES = int(os.getenv("BOOTH_DEADLOCK_RETRIES", "3"))
+
+VOTE_COLUMNS = "(voterId, electionId, candidateId, encryptedVote, voteHash, keyFingerprint, timestamp, ipAddress)"
+
+
+class BatchRejected(Exception):
+    """The whole batch is refused (bad signature, reused batch id, ...)"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def signed_payload(booth_id: int, batch_id: str, ballots: List[dict]) -> bytes:
+    """Bytes the booth signs; shared with booth_client.py"""
+    return json.dumps({"booth_id": booth_id, "batch_id": batch_id, "ballots": ballots},
+                      sort_keys=True, separators=(",", ":")).encode('utf-8')
+
+
+def verify_signature(public_key_pem: str, payload: bytes, signature_hex: str) -> bool:
+    try:
+        public_key = serialization.load_pem_public_key(public_key_pem.encode('utf-8'))
+        if not isinstance(public_key, Ed25519PublicKey):
+            return False
+        public_key.verify(bytes.fromhex(signature_hex), payload)
+        return True
+    except Exception:
+        return False
+
+
+def validate_public_key(public_key_pem: str) -> bool:
+    try:
+        key = serialization.load_pem_public_key(public_key_pem.encode('utf-8'))
+    except Exception:
+        return False
+    return isinstance(key, Ed25519PublicKey)
+
+
+def _placeholders(values) -> str:
+    return ", ".join(["%s"] * len(values))
+
+
+def _parse_ballot(ballot: models.BoothBallot):
+    """Decode one ballot; returns (row fields, None) or (None, reason)"""
+    try:
+        encrypted = base64.b64decode(ballot.encrypted_vote, validate=True)
+        vote_hash = bytes.fromhex(ballot.vote_hash)
+        fingerprint = bytes.fromhex(ballot.key_fingerprint)
+    except (binascii.Error, ValueError):
+        return None, "malformed ciphertext, hash or fingerprint"
+    if hashlib.sha256(encrypted).digest() != vote_hash:
+        return None, "vote_hash does not match ciphertext"
+
+    try:
+        cast_at = datetime.fromisoformat(ballot.cast_at.replace("Z", "+00:00"))
+    except ValueError:
+        return None, "malformed cast_at"
+    if cast_at.tzinfo is None:
+        cast_at = cast_at.replace(tzinfo=timezone.utc)
+    cast_at = cast_at.astimezone(timezone.utc)
+    # A ballot stamped ahead of the server could claim a window that has not opened yet
+    if cast_at > datetime.now(timezone.utc):
+        return None, "cast_at is in the future"
+
+    return {"encrypted": encrypted, "vote_hash": vote_hash,
+            "fingerprint": fingerprint, "cast_at": cast_at}, None
+
+
+def _load_context(cursor, booth_id: int, ballots: List[models.BoothBallot]):
+    """Everything needed to validate the batch, fetched with one query per table"""
+    keys = [b.idempotency_key for b in ballots]
+    cursor.execute(
+        f"SELECT idempotencyKey, voteId FROM BOOTH_BALLOT WHERE boothId = %s "
+        f"AND idempotencyKey IN ({_placeholders(keys)})", (booth_id, *keys)
+    )
+    seen_keys = {r['idempotencyKey']: r['voteId'] for r in cursor.fetchall()}
+
+    election_ids = sorted({b.election_id for b in ballots})
+    cursor.execute(
+        f"SELECT electionId, ballotScheme, completionStatus, UNIX_TIMESTAMP(startTime) AS startsAt, "
+        f"UNIX_TIMESTAMP(endTime) AS endsAt "
+        f"FROM ELECTION WHERE electionId IN ({_placeholders(election_ids)})", election_ids
+    )
+    elections = {r['electionId']: r for r in cursor.fetchall()}
+
+    cursor.execute(
+        f"SELECT keyFingerprint, electionId FROM ELECTION_KEY "
+        f"WHERE electionId IN ({_placeholders(election_ids)})", election_ids
+    )
+    election_keys = {(r['electionId'], bytes(r['keyFingerprint'])) for r in cursor.fetchall()}
+
+    voter_ids = sorted({b.voter_id for b in ballots})
+    cursor.execute(
+        f"SELECT voterId, constituencyId, TIMESTAMPDIFF(YEAR, dateOfBirth, CURDATE()) AS age "
+        f"FROM VOTER WHERE voterId IN ({_placeholders(voter_ids)})", voter_ids
+    )
+    voters = {r['voterId']: r for r in cursor.fetchall()}
+
+    voted = set()
+    for election_id in election_ids:
+        cursor.execute(
+            f"SELECT voterId FROM VOTER_ELECTION_STATUS WHERE electionId = %s AND hasVoted = TRUE "
+            f"AND voterId IN ({_placeholders(voter_ids)})", (election_id, *voter_ids)
+        )
+        voted.update((election_id, r['voterId']) for r in cursor.fetchall())
+
+    candidate_ids = sorted({b.candidate_id for b in ballots})
+    cursor.execute(
+        f"SELECT candidateId, electionId, constituencyId FROM CANDIDATE "
+        f"WHERE candidateId IN ({_placeholders(candidate_ids)})", candidate_ids
+    )
+    candidates = {r['candidateId']: r for r in cursor.fetchall()}
+
+    return seen_keys, elections, election_keys, voters, voted, candidates
+
+
+def _classify(booth, ballots, context):
+    """Split ballots into outcomes (duplicates, rejections) and rows to insert"""
+    seen_keys, elections, election_keys, voters, voted, candidates = context
+    outcomes: List[Optional[dict]] = [None] * len(ballots)
+    rows: List[Tuple[int, models.BoothBallot, dict]] = []
+    in_batch_keys = set()
+    in_batch_voters = set()
+    now = datetime.now(timezone.utc).timestamp()
+
+    def reject(i, reason):
+        outcomes[i] = {"idempotency_key": ballots[i].idempotency_key,
+                       "status": "rejected", "reason": reason}
+
+    for i, ballot in enumerate(ballots):
+        key = ballot.idempotency_key
+        if key in seen_keys:
+            outcomes[i] = {"idempotency_key": key, "status": "duplicate", "vote_id": seen_keys[key]}
+            continue
+        if key in in_batch_keys:
+            reject(i, "idempotency_key repeated within the batch")
+            continue
+        in_batch_keys.add(key)
+
+        parsed, reason = _parse_ballot(ballot)
+        if reason:
+            reject(i, reason)
+            continue
+
+        election = elections.get(ballot.election_id)
+        voter = voters.get(ballot.voter_id)
+        candidate = candidates.get(ballot.candidate_id)
+        cast_at = parsed["cast_at"].timestamp()
+
+        if election is None:
+            reject(i, "unknown election")
+        elif election['ballotScheme'] != models.BallotScheme.RSA.value:
+            reject(i, "booth terminals only accept RSA ballots")
+        elif election['completionStatus']:
+            reject(i, "election results already published")
+        elif not election['startsAt'] <= cast_at <= election['endsAt']:
+            reject(i, "cast outside the election window")
+        elif now > election['endsAt'] + BOOTH_UPLOAD_GRACE_HOURS * 3600:
+            reject(i, "upload window for this election has closed")
+        elif (ballot.election_id, parsed["fingerprint"]) not in election_keys:
+            reject(i, "ballot encrypted with an unknown election key")
+        elif voter is None:
+            reject(i, "unknown voter")
+        elif voter['constituencyId'] != booth['constituencyId']:
+            reject(i, "voter is not registered at this booth's constituency")
+        elif voter['age'] < 18:
+            reject(i, "voter is under 18")
+        elif (ballot.election_id, ballot.voter_id) in voted or \
+                (ballot.election_id, ballot.voter_id) in in_batch_voters:
+            reject(i, "voter has already voted in this election")
+        elif candidate is None or candidate['electionId'] != ballot.election_id \
+                or candidate['constituencyId'] != booth['constituencyId']:
+            reject(i, "candidate is not standing in this constituency")
+        else:
+            in_batch_voters.add((ballot.election_id, ballot.voter_id))
+            rows.append((i, ballot, parsed))
+
+    return outcomes, rows
+
+
+def _vote_row(ballot, parsed, ip_address):
+    # Stored as UTC; the ingest session runs with time_zone = '+00:00'
+    return (ballot.voter_id, ballot.election_id, ballot.candidate_id, parsed["encrypted"],
+            parsed["vote_hash"], parsed["fingerprint"],
+            parsed["cast_at"].replace(tzinfo=None), ip_address)
+
+
+def _insert_bulk(cursor, rows, ip_address) -> Dict[int, int]:
+    """Multi-row inserts; returns {row position: voteId}"""
+    cursor.executemany(
+        f"INSERT INTO VOTE {VOTE_COLUMNS} VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+        [_vote_row(ballot, parsed, ip_address) for _, ballot, parsed in rows]
+    )
+    cursor.executemany(
+        "INSERT INTO VOTER_ELECTION_STATUS (voterId, electionId, hasVoted) VALUES (%s, %s, TRUE) "
+        "ON DUPLICATE KEY UPDATE hasVoted = TRUE",
+        [(ballot.voter_id, ballot.election_id) for _, ballot, _ in rows]
+    )
+
+    # (voterId, electionId) is unique, so read the ids back rather than rely on
+    # auto-increment values of a multi-row insert being consecutive
+    vote_ids = {}
+    for election_id in {ballot.election_id for _, ballot, _ in rows}:
+        voter_ids = [ballot.voter_id for _, ballot, _ in rows if ballot.election_id == election_id]
+        cursor.execute(
+            f"SELECT voteId, voterId FROM VOTE WHERE electionId = %s "
+            f"AND voterId IN ({_placeholders(voter_ids)})", (election_id, *voter_ids)
+        )
+        by_voter = {r['voterId']: r['voteId'] for r in cursor.fetchall()}
+        for i, ballot, _ in rows:
+            if ballot.election_id == election_id:
+                vote_ids[i] = by_voter[ballot.voter_id]
+    return vote_ids
+
+
+def _insert_row_by_row(cursor, rows, ip_address, outcomes) -> Dict[int, int]:
+    """Fallback after a failed bulk insert: isolate the conflicting ballots"""
+    vote_ids = {}
+    for i, ballot, parsed in rows:
+        cursor.execute("SAVEPOINT ballot")
+        try:
+            cursor.execute(
+                f"INSERT INTO VOTE {VOTE_COLUMNS} VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+                _vote_row(ballot, parsed, ip_address)
+            )
+            vote_ids[i] = cursor.lastrowid
+            cursor.execute(
+                "INSERT INTO VOTER_ELECTION_STATUS (voterId, electionId, hasVoted) VALUES (%s, %s, TRUE) "
+                "ON DUPLICATE KEY UPDATE hasVoted = TRUE",
+                (ballot.voter_id, ballot.election_id)
+            )
+            cursor.execute("RELEASE SAVEPOINT ballot")
+        except mysql.connector.Error as e:
+            if e.errno == errorcode.ER_LOCK_DEADLOCK:
+                # The savepoint went with the rolled-back transaction
+                raise
+            cursor.execute("ROLLBACK TO SAVEPOINT ballot")
+            vote_ids.pop(i, None)
+            outcomes[i] = {"idempotency_key": ballot.idempotency_key, "status": "rejected",
+                           "reason": e.msg if e.sqlstate == '45000' else "conflicting ballot"}
+    return vote_ids
+
+
+def _store_batch(cursor, booth, officer_id, batch, payload_hash, ip_address):
+    """Validate and write one batch inside the current transaction (not committed)"""
+    booth_id = booth['boothId']
+    outcomes, rows = _classify(booth, batch.ballots, _load_context(cursor, booth_id, batch.ballots))
+
+    if rows:
+        cursor.execute("SAVEPOINT bulk")
+        try:
+            vote_ids = _insert_bulk(cursor, rows, ip_address)
+        except mysql.connector.Error as e:
+            if e.errno == errorcode.ER_LOCK_DEADLOCK:
+                raise
+            logger.info(f"Booth {booth_id} batch {batch.batch_id}: bulk insert failed "
+                        f"({str(e)}), retrying row by row")
+            cursor.execute("ROLLBACK TO SAVEPOINT bulk")
+            vote_ids = _insert_row_by_row(cursor, rows, ip_address, outcomes)
+    else:
+        vote_ids = {}
+
+    for i, ballot, _ in rows:
+        if i in vote_ids:
+            outcomes[i] = {"idempotency_key": ballot.idempotency_key,
+                           "status": "accepted", "vote_id": vote_ids[i]}
+    if vote_ids:
+        cursor.executemany(
+            "INSERT INTO BOOTH_BALLOT (boothId, idempotencyKey, electionId, voteId, batchId) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            [(booth_id, batch.ballots[i].idempotency_key, batch.ballots[i].election_id,
+              vote_id, batch.batch_id) for i, vote_id in vote_ids.items()]
+        )
+
+    counts = {status: sum(1 for o in outcomes if o['status'] == status)
+              for status in ("accepted", "duplicate", "rejected")}
+    cursor.execute(
+        "INSERT INTO BOOTH_BATCH (boothId, batchId, payloadHash, officerId, accepted, duplicate, "
+        "rejected, outcomes) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+        (booth_id, batch.batch_id, payload_hash, officer_id, counts["accepted"],
+         counts["duplicate"], counts["rejected"], json.dumps(outcomes))
+    )
+    return outcomes, rows, vote_ids, counts
+
+
+def ingest_batch(booth_id: int, officer_id: int, batch: models.BoothBatch,
+                 ip_address: str) -> dict:
+    """Validate and store a signed batch; returns per-ballot outcomes"""
+    ballots_json = [b.model_dump() for b in batch.ballots]
+    payload = signed_payload(booth_id, batch.batch_id, ballots_json)
+    payload_hash = hashlib.sha256(payload).digest()
+
+    with db.get_db_cursor() as (cursor, conn):
+        cursor.execute("SELECT boothId, constituencyId, officerId, publicKeyPem FROM BOOTH WHERE boothId = %s",
+                       (booth_id,))
+        booth = cursor.fetchone()
+        if not booth:
+            raise BatchRejected(404, "Booth not found")
+        if booth['officerId'] != officer_id:
+            raise BatchRejected(403, "Officer is not assigned to this booth")
+        if not booth['publicKeyPem']:
+            raise BatchRejected(409, "Booth has no registered terminal key")
+        if not verify_signature(booth['publicKeyPem'], payload, batch.signature):
+            raise BatchRejected(401, "Invalid batch signature")
+
+        cursor.execute(
+            "SELECT payloadHash, accepted, duplicate, rejected, outcomes FROM BOOTH_BATCH "
+            "WHERE boothId = %s AND batchId = %s", (booth_id, batch.batch_id)
+        )
+        previous = cursor.fetchone()
+        if previous:
+            if bytes(previous['payloadHash']) != payload_hash:
+                raise BatchRejected(409, "batch_id was already used for a different batch")
+            return {"batch_id": batch.batch_id, "replayed": True,
+                    "accepted": previous['accepted'], "duplicate": previous['duplicate'],
+                    "rejected": previous['rejected'], "outcomes": json.loads(previous['outcomes'])}
+
+        # Pooled connections reset their session when returned. The grace
+        # period tells before_vote_insert to check the ballot's own timestamp
+        cursor.execute("SET time_zone = '+00:00'")
+        cursor.execute("SET @booth_upload_grace_hours = %s", (BOOTH_UPLOAD_GRACE_HOURS,))
+        for attempt in range(1, BOOTH_DEADLOCK_RETRIES + 1):
+            try:
+                outcomes, rows, vote_ids, counts = _store_batch(
+                    cursor, booth, officer_id, batch, payload_hash, ip_address
+                )
+                conn.commit()
+                break
+            except mysql.connector.IntegrityError as e:
+                conn.rollback()
+                # A concurrent upload of the same batch or ballots won; the client retries
+                raise BatchRejected(409, f"Batch conflicts with a concurrent upload: {e.msg}")
+            except mysql.connector.Error as e:
+                conn.rollback()
+                if e.errno != errorcode.ER_LOCK_DEADLOCK or attempt == BOOTH_DEADLOCK_RETRIES:
+                    raise
+                logger.info(f"Booth {booth_id} batch {batch.batch_id}: deadlock, retrying "
+                            f"(attempt {attempt + 1} of {BOOTH_DEADLOCK_RETRIES})")
+            except Exception:
+                conn.rollback()
+                raise
+
+    vote_hashes = {i: parsed["vote_hash"] for i, _, parsed in rows}
+    for i, vote_id in vote_ids.items():
+        voter_roll.mark_voted(batch.ballots[i].election_id, batch.ballots[i].voter_id)
+        try:
+            bulletin_board.append(batch.ballots[i].election_id, vote_id, vote_hashes[i])
+        except Exception as e:
+            # The periodic sync picks the ballot up from VOTE
+            logger.error(f"Bulletin board append failed: {str(e)}")
+
+    return {"batch_id": batch.batch_id, "replayed": False, **counts, "outcomes": outcomes}
@@ -0,0 +1,414 @@
+"""Append-only Merkle bulletin board of ballot hashes.
+
+Each election has its own RFC 6962 style Merkle tree over VOTE.voteHash,
+kept on disk so inclusion proofs never touch the VOTE table:
+
+    bulletin_board/election_<id>/entries.bin   voteId (8 bytes) + voteHash (32 bytes) per leaf
+    bulletin_board/election_<id>/level_<k>.bin complete tree nodes at height k (32 bytes each)
+    bulletin_board/election_<id>/roots.jsonl   signed tree heads, newest last
+
+Nodes are written as soon as both children exist, so any root or audit path
+is assembled from O(log n) stored subtree hashes. The tree size is taken
+from entries.bin, so an append writes its nodes first and its entry last,
+each at a fixed offset: an append cut short by a crash leaves only bytes the
+next append overwrites. Tree heads are signed with
+an Ed25519 key so receipts can be checked offline against a published root.
+
+Every uvicorn worker appends to the same files, so writes hold an exclusive
+lock on the election's tree.lock file. Each worker keeps its voteId index in
+memory and reads in entries that other workers appended before using it.
+sync() re-reads BULLETIN_SYNC_REREAD_IDS ids below the newest leaf, because
+ballots commit out of voteId order. If the tree still has fewer leaves than
+VOTE, sync() falls back to a full comparison of voteIds.
+"""
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+from cryptography.hazmat.primitives import serialization
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import os
+import threading
+
+import database as db
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+BULLETIN_DIR = os.getenv("BULLETIN_BOARD_DIR", "bulletin_board")
+ROOT_INTERVAL_SECONDS = int(os.getenv("BULLETIN_ROOT_INTERVAL", "60"))
+SYNC_REREAD_IDS = int(os.getenv("BULLETIN_SYNC_REREAD_IDS", "10000"))
+
+HASH_SIZE = 32
+ENTRY_SIZE = 8 + HASH_SIZE
+
+
+def leaf_hash(vote_hash: bytes) -> bytes:
+    return hashlib.sha256(b"\x00" + vote_hash).digest()
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+def _largest_power_of_two_below(n: int) -> int:
+    k = 1
+    while k * 2 < n:
+        k *= 2
+    return k
+
+
+def verify_inclusion(vote_hash: bytes, leaf_index: int, tree_size: int,
+                     proof: List[bytes], root: bytes) -> bool:
+    """Check an audit path against a tree head (RFC 9162, section 2.1.3.2)"""
+    if leaf_index >= tree_size:
+        return False
+
+    fn, sn = leaf_index, tree_size - 1
+    r = leaf_hash(vote_hash)
+    for p in proof:
+        if sn == 0:
+            return False
+        if fn & 1 or fn == sn:
+            r = node_hash(p, r)
+            if not fn & 1:
+                while True:
+                    fn >>= 1
+                    sn >>= 1
+                    if fn & 1 or fn == 0:
+                        break
+        else:
+            r = node_hash(r, p)
+        fn >>= 1
+        sn >>= 1
+
+    return sn == 0 and r == root
+
+
+def verify_signed_root(record: dict, public_key_pem: str) -> bool:
+    """Check the signature on a published tree head"""
+    public_key = serialization.load_pem_public_key(public_key_pem.encode('utf-8'))
+    if not isinstance(public_key, Ed25519PublicKey):
+        return False
+    try:
+        public_key.verify(bytes.fromhex(record["signature"]), _signed_payload(record))
+        return True
+    except Exception:
+        return False
+
+
+@contextmanager
+def _file_lock(path: str):
+    """Exclusive lock shared by every process that opens path"""
+    with open(path, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    # LK_LOCK gives up after ten one-second retries
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _write_at(path: str, offset: int, data: bytes):
+    with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+        f.seek(offset)
+        f.write(data)
+
+
+def _signed_payload(record: dict) -> bytes:
+    fields = {k: record[k] for k in ("election_id", "tree_size", "root", "published_at")}
+    return json.dumps(fields, sort_keys=True, separators=(",", ":")).encode('utf-8')
+
+
+class ElectionTree:
+    """On-disk Merkle tree for a single election"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self._index: Dict[int, int] = {}
+        self._last_vote_id = 0
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _level_path(self, level: int) -> str:
+        return self._path(f"level_{level}.bin")
+
+    @property
+    def size(self) -> int:
+        path = self._path("entries.bin")
+        return os.path.getsize(path) // ENTRY_SIZE if os.path.exists(path) else 0
+
+    def _read_node(self, level: int, index: int) -> bytes:
+        with open(self._level_path(level), 'rb') as f:
+            f.seek(index * HASH_SIZE)
+            return f.read(HASH_SIZE)
+
+    @contextmanager
+    def exclusive(self):
+        """Hold the tree against this and every other process"""
+        with self.lock, _file_lock(self._path("tree.lock")):
+            yield
+
+    def _vote_index(self) -> Dict[int, int]:
+        """voteId -> leaf index, after reading in leaves appended since the last call"""
+        path = self._path("entries.bin")
+        position = len(self._index)
+        if os.path.exists(path) and os.path.getsize(path) // ENTRY_SIZE > position:
+            with open(path, 'rb') as f:
+                f.seek(position * ENTRY_SIZE)
+                while True:
+                    entry = f.read(ENTRY_SIZE)
+                    if len(entry) < ENTRY_SIZE:
+                        break
+                    vote_id = int.from_bytes(entry[:8], 'big')
+                    self._index[vote_id] = position
+                    self._last_vote_id = max(self._last_vote_id, vote_id)
+                    position += 1
+        return self._index
+
+    @property
+    def last_vote_id(self) -> int:
+        """Highest voteId on the board"""
+        with self.lock:
+            self._vote_index()
+            return self._last_vote_id
+
+    def append(self, vote_id: int, vote_hash: bytes) -> Optional[int]:
+        """Append a ballot hash; returns its leaf index (None if already present)"""
+        with self.exclusive():
+            index = self._vote_index()
+            if vote_id in index:
+                return None
+
+            position = self.size
+            node = leaf_hash(vote_hash)
+            level, i = 0, position
+            _write_at(self._level_path(level), i * HASH_SIZE, node)
+            # Each odd index completes a pair, producing a parent one level up
+            while i & 1:
+                node = node_hash(self._read_node(level, i - 1), node)
+                level, i = level + 1, i >> 1
+                _write_at(self._level_path(level), i * HASH_SIZE, node)
+
+            # Written last: the leaf only counts once its nodes are on disk
+            _write_at(self._path("entries.bin"), position * ENTRY_SIZE,
+                      vote_id.to_bytes(8, 'big') + vote_hash)
+
+            index[vote_id] = position
+            self._last_vote_id = max(self._last_vote_id, vote_id)
+            return position
+
+    def subtree_hash(self, start: int, size: int) -> bytes:
+        """Merkle tree hash of leaves [start, start + size)"""
+        if size & (size - 1) == 0:
+            # Complete, aligned subtree: stored directly
+            return self._read_node(size.bit_length() - 1, start // size)
+        k = _largest_power_of_two_below(size)
+        return node_hash(self.subtree_hash(start, k), self.subtree_hash(start + k, size - k))
+
+    def root(self, tree_size: int) -> bytes:
+        if tree_size == 0:
+            return hashlib.sha256(b"").digest()
+        return self.subtree_hash(0, tree_size)
+
+    def audit_path(self, leaf_index: int, tree_size: int) -> List[bytes]:
+        """Inclusion proof for a leaf in the first tree_size leaves (RFC 6962 PATH)"""
+        path = []
+        start, size, m = 0, tree_size, leaf_index
+        while size > 1:
+            k = _largest_power_of_two_below(size)
+            if m < k:
+                path.append(self.subtree_hash(start + k, size - k))
+                size = k
+            else:
+                path.append(self.subtree_hash(start, k))
+                start, size, m = start + k, size - k, m - k
+        return list(reversed(path))
+
+    def leaf_index(self, vote_id: int) -> Optional[int]:
+        with self.lock:
+            return self._vote_index().get(vote_id)
+
+    def missing(self, vote_ids) -> List[int]:
+        """The given voteIds that have no leaf"""
+        with self.lock:
+            index = self._vote_index()
+            return [vote_id for vote_id in vote_ids if vote_id not in index]
+
+    def entry(self, leaf_index: int) -> Tuple[int, bytes]:
+        with open(self._path("entries.bin"), 'rb') as f:
+            f.seek(leaf_index * ENTRY_SIZE)
+            entry = f.read(ENTRY_SIZE)
+        return int.from_bytes(entry[:8], 'big'), entry[8:]
+
+    def append_root(self, record: dict):
+        with open(self._path("roots.jsonl"), 'a') as f:
+            f.write(json.dumps(record) + "\n")
+
+    def latest_root(self) -> Optional[dict]:
+        path = self._path("roots.jsonl")
+        if not os.path.exists(path):
+            return None
+        last = None
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    last = line
+        return json.loads(last) if last else None
+
+
+class BulletinBoard:
+    def __init__(self, directory: str = BULLETIN_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._trees: Dict[int, ElectionTree] = {}
+        self._trees_lock = threading.Lock()
+        self.signing_key = self._load_signing_key()
+
+    def _load_signing_key(self) -> Ed25519PrivateKey:
+        path = os.path.join(self.directory, "signing_key.pem")
+        # Only one worker generates the key; every worker then signs with the one on disk
+        with _file_lock(os.path.join(self.directory, "signing_key.lock")):
+            if not os.path.exists(path):
+                key = Ed25519PrivateKey.generate()
+                fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(key.private_bytes(
+                        encoding=serialization.Encoding.PEM,
+                        format=serialization.PrivateFormat.PKCS8,
+                        encryption_algorithm=serialization.NoEncryption()
+                    ))
+        with open(path, 'rb') as f:
+            return serialization.load_pem_private_key(f.read(), password=None)
+
+    @property
+    def public_key_pem(self) -> str:
+        return self.signing_key.public_key().public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo
+        ).decode('utf-8')
+
+    def tree(self, election_id: int) -> ElectionTree:
+        with self._trees_lock:
+            if election_id not in self._trees:
+                self._trees[election_id] = ElectionTree(
+                    os.path.join(self.directory, f"election_{election_id}")
+                )
+            return self._trees[election_id]
+
+    def entries_path(self, election_id: int) -> str:
+        return self.tree(election_id)._path("entries.bin")
+
+    def append(self, election_id: int, vote_id: int, vote_hash: bytes) -> Optional[int]:
+        return self.tree(election_id).append(vote_id, bytes(vote_hash))
+
+    def sync(self, election_id: int) -> int:
+        """Append committed ballots the board has not seen yet"""
+        tree = self.tree(election_id)
+        # Ballots commit out of voteId order, so a failed append can sit below the newest leaf
+        rows = db.execute_query(
+            "SELECT voteId, voteHash FROM VOTE WHERE electionId = %s AND voteId > %s ORDER BY voteId",
+            (election_id, max(0, tree.last_vote_id - SYNC_REREAD_IDS)), fetch=True
+        )
+        appended = sum(tree.append(row['voteId'], bytes(row['voteHash'])) is not None for row in rows)
+
+        count = db.execute_query(
+            "SELECT COUNT(*) AS n FROM VOTE WHERE electionId = %s", (election_id,), fetch_one=True
+        )['n']
+        if count > tree.size:
+            # Older than the reread window: compare ids, then fetch only the missing hashes
+            ids = db.execute_query(
+                "SELECT voteId FROM VOTE WHERE electionId = %s", (election_id,), fetch=True
+            )
+            missing = tree.missing(row['voteId'] for row in ids)
+            for start in range(0, len(missing), 1000):
+                chunk = missing[start:start + 1000]
+                rows = db.execute_query(
+                    f"SELECT voteId, voteHash FROM VOTE WHERE electionId = %s "
+                    f"AND voteId IN ({', '.join(['%s'] * len(chunk))}) ORDER BY voteId",
+                    (election_id, *chunk), fetch=True
+                )
+                appended += sum(tree.append(row['voteId'], bytes(row['voteHash'])) is not None
+                                for row in rows)
+            if missing:
+                logger.warning(f"Bulletin board {election_id}: appended {len(missing)} ballots "
+                               f"missed below the reread window")
+        return appended
+
+    def publish_root(self, election_id: int) -> dict:
+        """Sign and record the current tree head"""
+        tree = self.tree(election_id)
+        with tree.exclusive():
+            tree_size = tree.size
+            record = {
+                "election_id": election_id,
+                "tree_size": tree_size,
+                "root": tree.root(tree_size).hex(),
+                "published_at": datetime.now(timezone.utc).isoformat(),
+            }
+            record["signature"] = self.signing_key.sign(_signed_payload(record)).hex()
+            tree.append_root(record)
+        return record
+
+    def latest_root(self, election_id: int) -> Optional[dict]:
+        return self.tree(election_id).latest_root()
+
+    def inclusion_proof(self, election_id: int, vote_id: int) -> Optional[dict]:
+        """Audit path for a ballot against the latest published root"""
+        tree = self.tree(election_id)
+        root = tree.latest_root()
+        leaf_index = tree.leaf_index(vote_id)
+        if root is None or leaf_index is None or leaf_index >= root["tree_size"]:
+            return None
+
+        _, vote_hash = tree.entry(leaf_index)
+        return {
+            "vote_id": vote_id,
+            "vote_hash": vote_hash.hex(),
+            "leaf_index": leaf_index,
+            "proof": [h.hex() for h in tree.audit_path(leaf_index, root["tree_size"])],
+            "signed_root": root,
+        }
+
+    def publish_pending(self):
+        """Sync and publish a new root for every open election that has grown"""
+        elections = db.execute_query(
+            "SELECT electionId FROM ELECTION WHERE completionStatus = 0", fetch=True
+        )
+        for election in elections:
+            election_id = election['electionId']
+            try:
+                self.sync(election_id)
+                latest = self.latest_root(election_id)
+                if latest is None or latest["tree_size"] < self.tree(election_id).size:
+                    self.publish_root(election_id)
+            except Exception as e:
+                logger.error(f"Bulletin board publish failed for election {election_id}: {str(e)}")
+
+
+bulletin_board = BulletinBoard()
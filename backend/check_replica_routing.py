@@ -0,0 +1,106 @@
+"""Check read-replica routing in database.py against a live primary and replica.
+
+Usage:
+    DB_HOST=127.0.0.1 DB_PORT=3306 DB_REPLICA_HOSTS=127.0.0.1:3307 \
+        python check_replica_routing.py
+
+Needs two MySQL servers with distinct server_id, the second replicating
+SecureElectionDB from the first. Every case asks @@server_id which server
+answered:
+
+    replica     a plain read-only query goes to the healthy replica
+    own-write   a read right after a write in the same session goes to the primary
+    lagging     a read goes to the primary when replica lag is above the threshold
+    no-replica  a read goes to the primary when no replica is configured
+
+Only the no-replica case runs when DB_REPLICA_HOSTS is empty. A scratch table,
+ROUTING_CHECK, is created on the primary and dropped at the end. The exit
+status is non-zero if any case fails.
+"""
+import sys
+import time
+import uuid
+
+import database as db
+
+
+def served_by(session=None):
+    row = db.execute_query("SELECT @@server_id AS server_id", fetch_one=True,
+                           read_only=True, session=session)
+    return row['server_id']
+
+
+def primary_id():
+    with db.get_db_cursor() as (cursor, _):
+        cursor.execute("SELECT @@server_id AS server_id")
+        return cursor.fetchone()['server_id']
+
+
+def case_replica(primary):
+    replica = served_by()
+    return replica != primary, f"read served by server {replica}, primary is {primary}"
+
+
+def case_own_write(primary):
+    session = f"routing-check:{uuid.uuid4().hex}"
+    db.execute_query("CREATE TABLE IF NOT EXISTS ROUTING_CHECK (session VARCHAR(64) PRIMARY KEY)")
+    db.execute_query("INSERT INTO ROUTING_CHECK (session) VALUES (%s)", (session,), session=session)
+    # Asked at once, before replication could have applied the insert
+    row = db.execute_query("SELECT session, @@server_id AS server_id FROM ROUTING_CHECK WHERE session = %s",
+                           (session,), fetch_one=True, read_only=True, session=session)
+    ok = row is not None and row['server_id'] == primary
+    return ok, f"read after write served by {row['server_id'] if row else 'nobody (row missing)'}"
+
+
+def case_lagging(primary):
+    saved = db.REPLICA_MAX_LAG_SECONDS
+    # Any measured lag, even 0 seconds, is above a negative threshold
+    db.REPLICA_MAX_LAG_SECONDS = -1
+    try:
+        server = served_by()
+    finally:
+        db.REPLICA_MAX_LAG_SECONDS = saved
+    return server == primary, f"read with lagging replica served by server {server}"
+
+
+def case_no_replica(primary):
+    saved = db.replica_pools, db._replica_cycle
+    db.replica_pools, db._replica_cycle = [], None
+    try:
+        server = served_by()
+    finally:
+        db.replica_pools, db._replica_cycle = saved
+    return server == primary, f"read with no replica served by server {server}"
+
+
+def main():
+    primary = primary_id()
+    cases = [("no-replica", case_no_replica)]
+    if db.replica_pools:
+        # Let the first lag probe succeed before routing anything
+        for replica in db.replica_pools:
+            if replica.lag() is None:
+                print(f"Replica {replica.address} reports no replication status")
+                sys.exit(1)
+        cases = [("replica", case_replica), ("own-write", case_own_write),
+                 ("lagging", case_lagging)] + cases
+    else:
+        print("DB_REPLICA_HOSTS is empty; only the no-replica case runs")
+
+    failures = 0
+    try:
+        for name, case in cases:
+            start = time.perf_counter()
+            ok, detail = case(primary)
+            failures += not ok
+            print(f"  {'ok  ' if ok else 'FAIL'} {name:<12} {detail} ({time.perf_counter() - start:.3f}s)")
+    finally:
+        db.execute_query("DROP TABLE IF EXISTS ROUTING_CHECK")
+
+    if failures:
+        sys.exit(1)
+    print("OK: replica routing behaves as configured")
+
+
+if __name__ == "__main__":
+    main()
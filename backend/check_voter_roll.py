@@ -0,0 +1,108 @@
+"""Check the in-memory voter roll against IsVoterEligible around election windows.
+
+Usage:
+    python check_voter_roll.py
+
+Creates a scratch constituency, an adult voter and three elections:
+
+    not-open    opens in 30 seconds; refresh() already builds its roll
+    open        opened an hour ago
+    closing     closes a few seconds after the roll is built
+
+and asserts that VoterRoll.check() never says True where IsVoterEligible
+says False: before the election opens, right after it closes (inside the
+clock margin, where the roll defers to the database) and once it has
+clearly closed. The clock margin is shortened to two seconds so the run
+takes about ten seconds. Everything created is deleted afterwards; run it
+against a development database. The exit status is non-zero on failure.
+"""
+import sys
+import time
+import uuid
+
+import database as db
+import voter_roll as roll_module
+from voter_roll import VoterRoll, VOTER_ROLL_RECONCILE_SECONDS
+
+MARGIN = 2
+CLOSES_IN = 4
+
+
+def create_election(cursor, title, start_offset, end_offset):
+    cursor.execute("""
+        INSERT INTO ELECTION (title, startTime, endTime)
+        VALUES (%s, NOW() + INTERVAL %s SECOND, NOW() + INTERVAL %s SECOND)
+    """, (title, start_offset, end_offset))
+    return cursor.lastrowid
+
+
+def database_says(voter_id, election_id):
+    row = db.execute_query("SELECT IsVoterEligible(%s, %s) AS eligible",
+                           (voter_id, election_id), fetch_one=True)
+    return bool(row['eligible'])
+
+
+def main():
+    if VOTER_ROLL_RECONCILE_SECONDS <= 30:
+        raise SystemExit("VOTER_ROLL_RECONCILE_SECONDS must exceed 30 for the not-open case")
+    roll_module.ROLL_CLOCK_MARGIN_SECONDS = MARGIN
+
+    tag = f"roll-check-{uuid.uuid4().hex[:8]}"
+    created = {}
+    failures = []
+
+    def expect(name, election, allowed):
+        got = roll.check(created["voter"], created[election])
+        truth = database_says(created["voter"], created[election])
+        ok = got in allowed and (got is None or got == truth)
+        print(f"  {'ok  ' if ok else 'FAIL'} {name:<24} roll={got} IsVoterEligible={truth}")
+        if not ok:
+            failures.append(name)
+
+    with db.get_db_cursor(dictionary=False) as (cursor, conn):
+        try:
+            cursor.execute("INSERT INTO CONSTITUENCY (name, district, state) VALUES (%s, 'Check', 'Check')",
+                           (tag,))
+            created["constituency"] = cursor.lastrowid
+            cursor.execute("""
+                INSERT INTO VOTER (name, dateOfBirth, gender, address, constituencyId, voterIdNumber, passwordHash)
+                VALUES ('Roll Check', '1980-01-01', 'O', 'Check', %s, %s, '')
+            """, (created["constituency"], tag))
+            created["voter"] = cursor.lastrowid
+            created["not-open"] = create_election(cursor, f"{tag}-not-open", 30, 3600)
+            created["open"] = create_election(cursor, f"{tag}-open", -3600, 3600)
+            created["closing"] = create_election(cursor, f"{tag}-closing", -3600, CLOSES_IN)
+            conn.commit()
+
+            roll = VoterRoll()
+            roll.refresh()
+            missing = [e for e in ("not-open", "open", "closing") if created[e] not in roll.rolls]
+            if missing:
+                raise SystemExit(f"refresh() built no roll for: {', '.join(missing)}")
+
+            expect("not yet open", "not-open", {False})
+            expect("open", "open", {True})
+            expect("closing, still open", "closing", {True})
+
+            time.sleep(CLOSES_IN + 0.5)
+            expect("just closed", "closing", {None, False})
+            time.sleep(MARGIN + 1)
+            expect("clearly closed", "closing", {False})
+        finally:
+            conn.rollback()
+            for key in ("not-open", "open", "closing"):
+                if key in created:
+                    cursor.execute("DELETE FROM ELECTION WHERE electionId = %s", (created[key],))
+            if "voter" in created:
+                cursor.execute("DELETE FROM VOTER WHERE voterId = %s", (created["voter"],))
+            if "constituency" in created:
+                cursor.execute("DELETE FROM CONSTITUENCY WHERE constituencyId = %s", (created["constituency"],))
+            conn.commit()
+
+    if failures:
+        sys.exit(1)
+    print("OK: the roll never admits a voter the database would refuse")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,53 +1,246 @@
 import mysql.connector
 from mysql.connector import pooling
 from contextlib import contextmanager
+from typing import Optional
+import itertools
+import logging
 import os
+import threading
+import time
 from dotenv import load_dotenv
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 DB_CONFIG = {
-    "host": "localhost",
-    "user": "root",
+    "host": os.getenv("DB_HOST", "localhost"),
+    "port": int(os.getenv("DB_PORT", "3306")),
+    "user": os.getenv("DB_USER", "root"),
     "password": os.getenv("DB_PASSWORD"),
     "database": "SecureElectionDB",
     "pool_name": "election_pool",
     "pool_size": 5
 }
 
+# Read replicas as "host:port,host:port"; empty means every query hits the primary
+REPLICA_HOSTS = [h.strip() for h in os.getenv("DB_REPLICA_HOSTS", "").split(",") if h.strip()]
+REPLICA_POOL_SIZE = int(os.getenv("DB_REPLICA_POOL_SIZE", "5"))
+# Replicas further behind than this are skipped
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG", "2"))
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_LAG_CHECK_INTERVAL", "5"))
+# A session that wrote within this window reads from the primary
+READ_YOUR_WRITES_WINDOW = float(os.getenv(
+    "DB_READ_YOUR_WRITES_WINDOW", str(REPLICA_MAX_LAG_SECONDS + REPLICA_LAG_CHECK_INTERVAL)
+))
+
+# Rows fetched per round trip by stream_query
+STREAM_BATCH_SIZE = int(os.getenv("DB_STREAM_BATCH_SIZE", "1000"))
+STREAM_WRITE_TIMEOUT = int(os.getenv("DB_STREAM_WRITE_TIMEOUT", "600"))
+
 connection_pool = pooling.MySQLConnectionPool(**DB_CONFIG)
 
+
+class ReplicaPool:
+    """Connection pool for one read replica with cached replication lag.
+
+    The pool is created on first use, so a replica that is down at startup
+    is only reported unhealthy; reads fall back to the primary until it
+    answers.
+    """
+
+    def __init__(self, address: str, index: int):
+        host, _, port = address.partition(":")
+        self.config = dict(DB_CONFIG, host=host, port=int(port or 3306),
+                           pool_name=f"election_replica_{index}", pool_size=REPLICA_POOL_SIZE)
+        self.address = address
+        self._pool: Optional[pooling.MySQLConnectionPool] = None
+        self._pool_lock = threading.Lock()
+        self._lag: Optional[float] = None
+        self._checked_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def get_connection(self):
+        """Borrow a connection, creating the pool on first use; raises mysql.connector.Error"""
+        with self._pool_lock:
+            if self._pool is None:
+                # The pool opens all of its connections here
+                self._pool = pooling.MySQLConnectionPool(**self.config)
+        return self._pool.get_connection()
+
+    def mark_unhealthy(self):
+        """Skip this replica until the next lag check"""
+        with self._lock:
+            self._lag = None
+            self._checked_at = time.monotonic()
+
+    def _query_lag(self) -> Optional[float]:
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor(dictionary=True)
+            try:
+                cursor.execute("SHOW REPLICA STATUS")
+            except mysql.connector.Error:
+                # MySQL < 8.0.22
+                cursor.execute("SHOW SLAVE STATUS")
+            status = cursor.fetchone()
+            cursor.close()
+        finally:
+            conn.close()
+
+        if not status:
+            return None
+        lag = status.get("Seconds_Behind_Source", status.get("Seconds_Behind_Master"))
+        return float(lag) if lag is not None else None
+
+    def lag(self) -> Optional[float]:
+        """Seconds behind the primary, or None if replication is broken or unreachable"""
+        with self._lock:
+            # One thread probes; the others use the last value meanwhile
+            if self._probing or time.monotonic() - self._checked_at < REPLICA_LAG_CHECK_INTERVAL:
+                return self._lag
+            self._probing = True
+        lag = None
+        try:
+            lag = self._query_lag()
+        except mysql.connector.Error as e:
+            logger.warning(f"Replica {self.address} lag check failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._lag = lag
+                self._checked_at = time.monotonic()
+                self._probing = False
+        return lag
+
+    def is_usable(self) -> bool:
+        lag = self.lag()
+        return lag is not None and lag <= REPLICA_MAX_LAG_SECONDS
+
+
+replica_pools = [ReplicaPool(address, i) for i, address in enumerate(REPLICA_HOSTS)]
+_replica_cycle = itertools.cycle(replica_pools) if replica_pools else None
+_replica_cycle_lock = threading.Lock()
+
+_last_write = {}
+_last_write_lock = threading.Lock()
+
+
+def mark_write(session: Optional[str]):
+    """Record that a session wrote, pinning its reads to the primary for a while"""
+    if session is None:
+        return
+    now = time.monotonic()
+    with _last_write_lock:
+        _last_write[session] = now
+        # Drop expired entries so the map stays bounded by active writers
+        if len(_last_write) > 10000:
+            for key in [k for k, t in _last_write.items() if now - t > READ_YOUR_WRITES_WINDOW]:
+                del _last_write[key]
+
+
+def _wrote_recently(session: Optional[str]) -> bool:
+    if session is None:
+        return False
+    with _last_write_lock:
+        written_at = _last_write.get(session)
+    return written_at is not None and time.monotonic() - written_at < READ_YOUR_WRITES_WINDOW
+
+
+def _pick_replica() -> Optional[ReplicaPool]:
+    if not replica_pools:
+        return None
+    for _ in range(len(replica_pools)):
+        with _replica_cycle_lock:
+            replica = next(_replica_cycle)
+        if replica.is_usable():
+            return replica
+    return None
+
+
+def connect_standalone(read_only=False):
+    """Open a dedicated, unpooled connection (for worker processes and long scans)"""
+    config = {k: v for k, v in DB_CONFIG.items() if not k.startswith("pool_")}
+    if read_only:
+        replica = _pick_replica()
+        if replica is not None:
+            host, _, port = replica.address.partition(":")
+            config.update(host=host, port=int(port or 3306))
+    return mysql.connector.connect(**config)
+
+
+def stream_query(query, params=None, batch_size=STREAM_BATCH_SIZE, read_only=True):
+    """Yield (cursor.description, rows) batches from an unbuffered cursor.
+
+    Rows are pulled from the server as the consumer asks for them, so memory
+    is bounded by batch_size. A dedicated connection is used because a slow
+    client can hold it for the whole export, which would starve the pool.
+    The first batch is always yielded, empty for an empty result, so
+    consumers see the column description. Close the generator to release
+    the connection early.
+    """
+    conn = connect_standalone(read_only=read_only)
+    try:
+        cursor = conn.cursor(buffered=False)
+        # The server blocks on a slow reader; give it longer than the default 60s
+        cursor.execute(f"SET SESSION net_write_timeout = {STREAM_WRITE_TIMEOUT}")
+        cursor.execute(query, params or ())
+        description = cursor.description
+        rows = cursor.fetchmany(batch_size)
+        yield description, rows
+        while rows:
+            rows = cursor.fetchmany(batch_size)
+            if rows:
+                yield description, rows
+    finally:
+        # Closing the connection discards any rows the consumer did not read
+        conn.close()
+
 @contextmanager
-def get_db_connection():
-    conn = connection_pool.get_connection()
+def get_db_connection(read_only=False, session=None):
+    """Borrow a connection; read-only work may be routed to a healthy replica"""
+    conn = None
+    if read_only and not _wrote_recently(session):
+        replica = _pick_replica()
+        if replica is not None:
+            try:
+                conn = replica.get_connection()
+            except mysql.connector.Error as e:
+                logger.warning(f"Replica {replica.address} unavailable, using primary: {str(e)}")
+                replica.mark_unhealthy()
+    if conn is None:
+        conn = connection_pool.get_connection()
     try:
         yield conn
     finally:
         conn.close()
 
 @contextmanager
-def get_db_cursor(dictionary=True):
-    with get_db_connection() as conn:
+def get_db_cursor(dictionary=True, read_only=False, session=None):
+    with get_db_connection(read_only=read_only, session=session) as conn:
         cursor = conn.cursor(dictionary=dictionary)
         try:
             yield cursor, conn
         finally:
             cursor.close()
 
-def execute_query(query, params=None, fetch=False, fetch_one=False):
-    with get_db_cursor() as (cursor, conn):
+def execute_query(query, params=None, fetch=False, fetch_one=False, read_only=False, session=None):
+    with get_db_cursor(read_only=read_only, session=session) as (cursor, conn):
         cursor.execute(query, params or ())
         if fetch_one:
             return cursor.fetchone()
         if fetch:
             return cursor.fetchall()
         conn.commit()
+        mark_write(session)
         return cursor.lastrowid
 
-def call_procedure(proc_name, params):
-    with get_db_cursor() as (cursor, conn):
+def call_procedure(proc_name, params, session=None, read_only=False):
+    with get_db_cursor(read_only=read_only, session=session) as (cursor, conn):
         cursor.callproc(proc_name, params)
-        conn.commit()
+        if not read_only:
+            conn.commit()
+            mark_write(session)
         results = []
         for result in cursor.stored_results():
             results.append(result.fetchall())
-        return results
\ No newline at end of file
+        return results
@@ -1,6 +1,8 @@
 from cryptography.hazmat.primitives.asymmetric import rsa, padding
 from cryptography.hazmat.primitives import serialization, hashes
 from cryptography.hazmat.backends import default_backend
+from functools import lru_cache
+from typing import Union
 import base64
 import hashlib
 
@@ -30,8 +32,17 @@ class VoteEncryption:
         return public_pem, private_pem
     
     @staticmethod
-    def encrypt_vote(candidate_id: int, public_key_pem: str) -> tuple[str, str]:
-        """Encrypt vote using RSA public key"""
+    @lru_cache(maxsize=64)
+    def key_fingerprint(public_key_pem: str) -> bytes:
+        """SHA-256 of the public key PEM, used to reference ELECTION_KEY rows"""
+        return hashlib.sha256(public_key_pem.encode('utf-8')).digest()
+    
+    @staticmethod
+    def encrypt_vote(candidate_id: int, public_key_pem: str) -> tuple[bytes, str]:
+        """Encrypt vote using RSA public key.
+
+        Returns the raw ciphertext and the hex SHA-256 receipt hash.
+        """
         vote_data = str(candidate_id).encode('utf-8')
         
         public_key = serialization.load_pem_public_key(
@@ -48,15 +59,15 @@ class VoteEncryption:
             )
         )
         
-        encrypted_b64 = base64.b64encode(encrypted).decode('utf-8')
         vote_hash = hashlib.sha256(encrypted).hexdigest()
         
-        return encrypted_b64, vote_hash
+        return encrypted, vote_hash
     
     @staticmethod
-    def decrypt_vote(encrypted_vote_b64: str, private_key_pem: str) -> int:
-        """Decrypt vote using RSA private key"""
-        encrypted_vote = base64.b64decode(encrypted_vote_b64)
+    def decrypt_vote(encrypted_vote: Union[bytes, str], private_key_pem: str) -> int:
+        """Decrypt vote using RSA private key (raw bytes or legacy base64)"""
+        if isinstance(encrypted_vote, str):
+            encrypted_vote = base64.b64decode(encrypted_vote)
         
         private_key = serialization.load_pem_private_key(
             private_key_pem.encode('utf-8'),
@@ -65,7 +76,7 @@ class VoteEncryption:
         )
         
         decrypted = private_key.decrypt(
-            encrypted_vote,
+            bytes(encrypted_vote),
             padding.OAEP(
                 mgf=padding.MGF1(algorithm=hashes.SHA256()),
                 algorithm=hashes.SHA256(),
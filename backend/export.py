@@ -0,0 +1,178 @@
+"""Streaming exports of results, turnout, ballots and audit data.
+
+Rows come from database.stream_query (an unbuffered cursor) in batches and
+are encoded batch by batch, so an export of any size is served in constant
+memory. Supported formats:
+
+    ndjson   one JSON object per line
+    csv      header row, then one line per row
+    arrow    Apache Arrow IPC stream, one record batch per fetched batch
+             (needs pyarrow; readable with pyarrow.ipc.open_stream or polars)
+
+An empty result still carries its CSV header or Arrow schema.
+"""
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Iterator, Optional
+import csv
+import io
+import json
+
+from mysql.connector import FieldType
+
+import database as db
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+# name -> (query, needs election_id); per-election queries prune to one partition
+EXPORTS = {
+    "results": ("""
+        SELECT
+            r.electionId, co.constituencyId, co.name AS constituency,
+            c.candidateId, c.name AS candidate_name, p.partyName,
+            r.totalVotes, r.votePercentage, r.publishedAt
+        FROM RESULT r
+        JOIN CANDIDATE c ON r.candidateId = c.candidateId
+        JOIN PARTY p ON c.partyId = p.partyId
+        JOIN CONSTITUENCY co ON r.constituencyId = co.constituencyId
+        WHERE r.electionId = %s
+        ORDER BY co.constituencyId, r.totalVotes DESC
+    """, True),
+    "turnout": ("""
+        SELECT
+            co.constituencyId, co.name AS constituency, co.district, co.state,
+            COUNT(v.voterId) AS registered_voters,
+            COUNT(s.voterId) AS votes_cast,
+            ROUND(COUNT(s.voterId) * 100.0 / NULLIF(COUNT(v.voterId), 0), 2) AS turnout_percentage
+        FROM CONSTITUENCY co
+        LEFT JOIN VOTER v ON v.constituencyId = co.constituencyId
+        LEFT JOIN VOTER_ELECTION_STATUS s
+            ON s.voterId = v.voterId AND s.electionId = %s AND s.hasVoted = TRUE
+        GROUP BY co.constituencyId, co.name, co.district, co.state
+        ORDER BY co.constituencyId
+    """, True),
+    "ballots": ("""
+        SELECT voteId, electionId, HEX(voteHash) AS voteHash, HEX(keyFingerprint) AS keyFingerprint,
+               LENGTH(encryptedVote) AS encryptedSize, timestamp
+        FROM VOTE
+        WHERE electionId = %s
+        ORDER BY voteId
+    """, True),
+    "audit-logs": ("""
+        SELECT logId, userId, userType, actionType, actionStatus, actionDetails, ipAddress, timestamp
+        FROM AUDIT_LOG
+        WHERE timestamp >= COALESCE(%s, '1970-01-01')
+        ORDER BY logId
+    """, False),
+}
+
+
+_INTEGER_TYPES = {FieldType.TINY, FieldType.SHORT, FieldType.LONG, FieldType.LONGLONG,
+                  FieldType.INT24, FieldType.YEAR}
+_FLOAT_TYPES = {FieldType.FLOAT, FieldType.DOUBLE, FieldType.DECIMAL, FieldType.NEWDECIMAL}
+
+
+def _plain(value):
+    """Convert MySQL values to JSON/CSV friendly scalars"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value).hex()
+    return value
+
+
+def ndjson_lines(batches) -> Iterator[bytes]:
+    for description, rows in batches:
+        columns = [d[0] for d in description]
+        yield "".join(
+            json.dumps(dict(zip(columns, map(_plain, row)))) + "\n" for row in rows
+        ).encode('utf-8')
+
+
+def csv_lines(batches) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    header_written = False
+    for description, rows in batches:
+        if not header_written:
+            writer.writerow([d[0] for d in description])
+            header_written = True
+        writer.writerows([_plain(v) for v in row] for row in rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _arrow_schema(description):
+    """Schema from column types, so every batch matches even when a batch is all NULL"""
+    fields = []
+    for name, type_code, *_ in description:
+        if type_code in _INTEGER_TYPES:
+            fields.append(pa.field(name, pa.int64()))
+        elif type_code in _FLOAT_TYPES:
+            fields.append(pa.field(name, pa.float64()))
+        else:
+            fields.append(pa.field(name, pa.string()))
+    return pa.schema(fields)
+
+
+def arrow_stream(batches) -> Iterator[bytes]:
+    sink = io.BytesIO()
+    writer = None
+    for description, rows in batches:
+        if writer is None:
+            writer = pa.ipc.new_stream(sink, _arrow_schema(description))
+        if rows:
+            writer.write_batch(pa.RecordBatch.from_pydict({
+                field.name: [_plain(row[i]) for row in rows] for i, field in enumerate(writer.schema)
+            }, schema=writer.schema))
+        yield sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+    if writer is not None:
+        writer.close()
+        yield sink.getvalue()
+
+
+ENCODERS = {
+    "ndjson": ndjson_lines,
+    "csv": csv_lines,
+    "arrow": arrow_stream,
+}
+
+
+def export_stream(dataset: str, fmt: str, election_id: Optional[int] = None,
+                  since: Optional[datetime] = None) -> Iterator[bytes]:
+    """Encoded chunks of a dataset; validate with check_export() first"""
+    query, needs_election = EXPORTS[dataset]
+    params = (election_id,) if needs_election else (since,)
+    batches = db.stream_query(query, params)
+    try:
+        yield from ENCODERS[fmt](batches)
+    finally:
+        # A client that disconnects mid-export stops iteration here; give the connection back now
+        batches.close()
+
+
+def check_export(dataset: str, fmt: str, election_id: Optional[int]) -> Optional[str]:
+    """Return an error message if the export request is invalid"""
+    if dataset not in EXPORTS:
+        return f"Unknown dataset; choose from {', '.join(EXPORTS)}"
+    if fmt not in ENCODERS:
+        return f"Unknown format; choose from {', '.join(ENCODERS)}"
+    if fmt == "arrow" and pa is None:
+        return "Arrow export needs pyarrow installed on the server"
+    if EXPORTS[dataset][1] and election_id is None:
+        return "election_id is required for this dataset"
+    return None
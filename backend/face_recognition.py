@@ -11,18 +11,52 @@ from io import BytesIO
 import logging
 import sys
 import os
+import threading
 import tensorflow as tf
 
 # Suppress TensorFlow logs
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'   # 0 = all, 1 = INFO, 2 = WARNING, 3 = ERROR
 tf.get_logger().setLevel(logging.ERROR)
 
+logger = logging.getLogger(__name__)
+
+# Detection modes for verification:
+#   "mtcnn"   - always run the full three-stage MTCNN
+#   "cascade" - Haar cascade on a downscaled frame, MTCNN only as a fallback
+# Haar boxes are framed differently from the MTCNN boxes enrolled encodings
+# were made from, so enable "cascade" only after benchmark_face_detection.py
+# shows its decisions agree with MTCNN on your images at the chosen weight.
+# Registration always uses MTCNN.
+DETECTION_MODE = os.getenv("FACE_DETECTION_MODE", "mtcnn").lower()
+FAST_DETECTION_WIDTH = int(os.getenv("FACE_FAST_DETECTION_WIDTH", "320"))
+# Minimum Haar stage weight for a fast detection to be trusted; tune with the benchmark
+FAST_DETECTION_MIN_WEIGHT = float(os.getenv("FACE_FAST_DETECTION_MIN_WEIGHT", "4.0"))
+# Cosine similarity at which a probe matches the enrolled encoding
+VERIFY_THRESHOLD = 0.6
+
 class FaceRecognitionSystem:
-    def __init__(self):
+    def __init__(self, detection_mode: str = DETECTION_MODE):
         self.detector = MTCNN()
+        self.fast_detector = cv2.CascadeClassifier(
+            os.path.join(cv2.data.haarcascades, "haarcascade_frontalface_default.xml")
+        )
+        self.detection_mode = detection_mode
         self.embedder = FaceNet()
         self.encoding_dir = "face_encodings"
         os.makedirs(self.encoding_dir, exist_ok=True)
+        self._request_state = threading.local()
+        self._stats_lock = threading.Lock()
+        self.detection_stats = {"fast": 0, "mtcnn": 0, "mtcnn_fallback": 0, "none": 0}
+
+    @property
+    def last_detection_path(self) -> Optional[str]:
+        """Detector path used by the last detect_face call on this thread"""
+        return getattr(self._request_state, "path", None)
+
+    def _record_path(self, path: str):
+        self._request_state.path = path
+        with self._stats_lock:
+            self.detection_stats[path] += 1
     
     def decode_base64_image(self, base64_string: str) -> np.ndarray:
         """Decode base64 image string to numpy array"""
@@ -30,9 +64,53 @@ class FaceRecognitionSystem:
         img = Image.open(BytesIO(img_data))
         return cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
     
-    def detect_face(self, image: np.ndarray) -> Optional[np.ndarray]:
-        """Detect face in image and return cropped face"""
-        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    def _crop_face(self, rgb_image: np.ndarray, box) -> np.ndarray:
+        """Crop a padded face box and resize it for FaceNet"""
+        x, y, w, h = box
+        # Add padding
+        padding = 20
+        x = max(0, x - padding)
+        y = max(0, y - padding)
+        w = w + 2 * padding
+        h = h + 2 * padding
+        
+        face_img = rgb_image[y:y+h, x:x+w]
+        return cv2.resize(face_img, (160, 160))
+    
+    def detect_face_fast(self, image: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+        """Detect a single frontal face with a Haar cascade on a downscaled frame.
+
+        Returns the face box in full-resolution coordinates, or None when the
+        result is not trustworthy (no face, several faces or a weak match).
+        """
+        detection = self.detect_face_haar(image)
+        if detection is None or detection[1] < FAST_DETECTION_MIN_WEIGHT:
+            return None
+        return detection[0]
+    
+    def detect_face_haar(self, image: np.ndarray) -> Optional[Tuple[Tuple[int, int, int, int], float]]:
+        """(box, stage weight) of the only face the Haar cascade finds, or None"""
+        height, width = image.shape[:2]
+        scale = min(1.0, FAST_DETECTION_WIDTH / float(width))
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        if scale < 1.0:
+            gray = cv2.resize(gray, (int(width * scale), int(height * scale)),
+                              interpolation=cv2.INTER_AREA)
+        gray = cv2.equalizeHist(gray)
+        
+        min_side = max(24, int(min(gray.shape[:2]) * 0.2))
+        boxes, _, weights = self.fast_detector.detectMultiScale3(
+            gray, scaleFactor=1.1, minNeighbors=5,
+            minSize=(min_side, min_side), outputRejectLevels=True
+        )
+        
+        if len(boxes) != 1:
+            return None
+        
+        return tuple(int(round(v / scale)) for v in boxes[0]), float(np.ravel(weights)[0])
+    
+    def detect_face_mtcnn(self, rgb_image: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+        """Detect the most confident face with MTCNN"""
         faces = self.detector.detect_faces(rgb_image)
         
         if not faces:
@@ -43,16 +121,27 @@ class FaceRecognitionSystem:
         if face['confidence'] < 0.9:
             return None
         
-        x, y, w, h = face['box']
-        # Add padding
-        padding = 20
-        x = max(0, x - padding)
-        y = max(0, y - padding)
-        w = w + 2 * padding
-        h = h + 2 * padding
+        return face['box']
+    
+    def detect_face(self, image: np.ndarray, mode: Optional[str] = None) -> Optional[np.ndarray]:
+        """Detect face in image and return cropped face (mode defaults to detection_mode)"""
+        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
         
-        face_img = rgb_image[y:y+h, x:x+w]
-        return cv2.resize(face_img, (160, 160))
+        path = "mtcnn"
+        if (mode or self.detection_mode) == "cascade":
+            box = self.detect_face_fast(image)
+            if box is not None:
+                self._record_path("fast")
+                return self._crop_face(rgb_image, box)
+            path = "mtcnn_fallback"
+        
+        box = self.detect_face_mtcnn(rgb_image)
+        if box is None:
+            self._record_path("none")
+            return None
+        
+        self._record_path(path)
+        return self._crop_face(rgb_image, box)
     
     def get_face_encoding(self, face_img: np.ndarray) -> np.ndarray:
         """Get face encoding using FaceNet"""
@@ -62,9 +151,11 @@ class FaceRecognitionSystem:
     
     def register_face(self, voter_id: int, base64_image: str) -> Tuple[bool, str, Optional[bytes]]:
         """Register a new face encoding"""
+        self._request_state.path = None
         try:
             image = self.decode_base64_image(base64_image)
-            face = self.detect_face(image)
+            # Enrolled encodings always come from MTCNN crops
+            face = self.detect_face(image, mode="mtcnn")
             
             if face is None:
                 return False, "No face detected or low confidence", None
@@ -84,6 +175,7 @@ class FaceRecognitionSystem:
     
     def verify_face(self, voter_id: int, base64_image: str, stored_encoding: bytes) -> Tuple[bool, str, float]:
         """Verify face against stored encoding"""
+        self._request_state.path = None
         try:
             image = self.decode_base64_image(base64_image)
             face = self.detect_face(image)
@@ -98,8 +190,7 @@ class FaceRecognitionSystem:
             similarity = np.dot(current_encoding, stored_encoding_array)
             similarity = similarity / (np.linalg.norm(current_encoding) * np.linalg.norm(stored_encoding_array))
             
-            threshold = 0.6
-            if similarity >= threshold:
+            if similarity >= VERIFY_THRESHOLD:
                 return True, "Face verified successfully", float(similarity)
             else:
                 return False, "Face does not match", float(similarity)
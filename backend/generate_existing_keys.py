@@ -24,6 +24,12 @@ cursor.execute("""
     WHERE electionId = 1
 """, (public_pem, private_pem))
 
+# Register the public key so ballots can reference it by fingerprint
+cursor.execute("""
+    INSERT IGNORE INTO election_key (keyFingerprint, electionId, publicKeyPem)
+    VALUES (%s, 1, %s)
+""", (vote_encryption.key_fingerprint(public_pem), public_pem))
+
 conn.commit()
 cursor.close()
 conn.close()
@@ -0,0 +1,148 @@
+"""Homomorphic tallying of Paillier elections stored in VOTE.
+
+Ballots are multiplied per constituency in worker processes, each streaming a
+voteId range over its own connection, and only the per-candidate aggregates
+are decrypted. The ballot format and key handling are in paillier.py.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+import multiprocessing
+import os
+
+import database as db
+from paillier import PaillierBallot, PaillierPrivateKey, combine_ciphertexts, load_public_key
+
+STREAM_BATCH_SIZE = 1000
+# Each worker process opens its own database pools
+MAX_TALLY_WORKERS = os.cpu_count() or 1
+
+
+def _accumulate_range(election_id: int, public_key_pem: str,
+                      low: int, high: int) -> Dict[int, Tuple[int, List[int]]]:
+    """Multiply the ballots with voteId in [low, high] per constituency.
+
+    Runs in a worker process with its own connection, streaming rows so memory
+    stays bounded by the number of constituencies rather than ballots.
+    """
+    public_key = load_public_key(public_key_pem)
+    n_squared = public_key.n_squared
+    partial: Dict[int, Tuple[int, List[int]]] = {}
+
+    conn = db.connect_standalone()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT vr.constituencyId, v.encryptedVote
+            FROM VOTE v
+            JOIN VOTER vr ON vr.voterId = v.voterId
+            WHERE v.electionId = %s AND v.voteId BETWEEN %s AND %s
+        """, (election_id, low, high))
+
+        while True:
+            rows = cursor.fetchmany(STREAM_BATCH_SIZE)
+            if not rows:
+                break
+            for constituency_id, encrypted in rows:
+                ballot = PaillierBallot.split_ballot(bytes(encrypted), public_key)
+                count, acc = partial.get(constituency_id, (0, None))
+                acc = ballot if acc is None else combine_ciphertexts(acc, ballot, n_squared)
+                partial[constituency_id] = (count + 1, acc)
+        cursor.close()
+    finally:
+        conn.close()
+
+    return partial
+
+
+def _vote_id_ranges(low: int, high: int, parts: int) -> List[Tuple[int, int]]:
+    step = max(1, (high - low + parts) // parts)
+    return [(start, min(high, start + step - 1)) for start in range(low, high + 1, step)]
+
+
+def tally_election(election_id: int, workers: int = 4) -> Dict[int, Dict[int, int]]:
+    """Homomorphically tally a Paillier election.
+
+    Returns {constituencyId: {candidateId: votes}}. Each candidate total costs
+    one decryption regardless of how many ballots were cast.
+    """
+    election = db.execute_query(
+        "SELECT publicKeyPem, privateKeyPem FROM ELECTION WHERE electionId = %s AND ballotScheme = 'PAILLIER'",
+        (election_id,), fetch_one=True
+    )
+    if not election:
+        raise ValueError(f"Election {election_id} is not a Paillier election")
+
+    bounds = db.execute_query(
+        "SELECT MIN(voteId) AS low, MAX(voteId) AS high FROM VOTE WHERE electionId = %s",
+        (election_id,), fetch_one=True
+    )
+    if bounds['low'] is None:
+        return {}
+
+    workers = min(max(1, workers), MAX_TALLY_WORKERS)
+    public_key = load_public_key(election['publicKeyPem'])
+    ranges = _vote_id_ranges(bounds['low'], bounds['high'], workers)
+
+    totals: Dict[int, Tuple[int, List[int]]] = {}
+    # Spawn rather than fork: the API process has TensorFlow and its threads loaded
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [
+            pool.submit(_accumulate_range, election_id, election['publicKeyPem'], low, high)
+            for low, high in ranges
+        ]
+        for future in futures:
+            for constituency_id, (count, acc) in future.result().items():
+                if constituency_id not in totals:
+                    totals[constituency_id] = (count, acc)
+                    continue
+                total_count, total_acc = totals[constituency_id]
+                totals[constituency_id] = (
+                    total_count + count,
+                    combine_ciphertexts(total_acc, acc, public_key.n_squared)
+                )
+
+    candidates = db.execute_query(
+        "SELECT candidateId, constituencyId FROM CANDIDATE WHERE electionId = %s ORDER BY candidateId",
+        (election_id,), fetch=True
+    )
+    by_constituency: Dict[int, List[int]] = {}
+    for candidate in candidates:
+        by_constituency.setdefault(candidate['constituencyId'], []).append(candidate['candidateId'])
+
+    private_key = PaillierPrivateKey.from_pem(election['privateKeyPem'])
+    results: Dict[int, Dict[int, int]] = {}
+    for constituency_id, (ballot_count, acc) in totals.items():
+        candidate_ids = by_constituency.get(constituency_id, [])
+        if len(candidate_ids) != len(acc):
+            raise ValueError(f"Candidate list changed for constituency {constituency_id}")
+
+        counts = {cid: private_key.decrypt(c) for cid, c in zip(candidate_ids, acc)}
+        # One-hot ballots must sum to exactly one vote each
+        if sum(counts.values()) != ballot_count:
+            raise ValueError(f"Malformed ballots detected in constituency {constituency_id}")
+        results[constituency_id] = counts
+
+    return results
+
+
+def publish_results(election_id: int, results: Dict[int, Dict[int, int]]):
+    """Write decrypted tallies to RESULT, mirroring CalculateResults"""
+    with db.get_db_cursor() as (cursor, conn):
+        for constituency_id, counts in results.items():
+            cursor.execute(
+                "DELETE FROM RESULT WHERE electionId = %s AND constituencyId = %s",
+                (election_id, constituency_id)
+            )
+            total = sum(counts.values())
+            rows = [
+                (election_id, constituency_id, candidate_id, votes,
+                 round(votes * 100.0 / total, 2) if total else 0)
+                for candidate_id, votes in counts.items() if votes
+            ]
+            if rows:
+                cursor.executemany("""
+                    INSERT INTO RESULT (electionId, constituencyId, candidateId, totalVotes, votePercentage)
+                    VALUES (%s, %s, %s, %s, %s)
+                """, rows)
+        conn.commit()
+
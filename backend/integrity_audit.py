@@ -0,0 +1,221 @@
+"""Parallel ballot-integrity audit for an election.
+
+Usage:
+    python integrity_audit.py <election_id> [--workers 4] [--chunk-size 20000] [--restart]
+
+VOTE is streamed in voteId ranges across worker processes. For every ballot:
+
+  hash     SHA-256 of encryptedVote matches the stored voteHash
+  key      keyFingerprint matches the fingerprint of ELECTION.publicKeyPem
+  status   VOTER_ELECTION_STATUS records the voter as having voted
+
+Election-wide checks then look for voters with more than one ballot and for
+status rows claiming a vote that does not exist. Progress is checkpointed
+after every range, so an interrupted audit resumes where it stopped; the
+final report (with throughput figures) is written as JSON.
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from multiprocessing import Pool
+
+import database as db
+from encryption import vote_encryption
+
+CHUNK_SIZE = 20000
+FETCH_SIZE = 2000
+# Anomalous voteIds kept per check and range; counts are always exact
+MAX_SAMPLES = 100
+
+
+def _empty_findings():
+    return {"hash_mismatch": [], "key_mismatch": [], "missing_status": []}
+
+
+def audit_range(args):
+    """Audit ballots with voteId in [low, high]; runs in a worker process"""
+    election_id, expected_fingerprint, low, high = args
+    counts = {"ballots": 0, "hash_mismatch": 0, "key_mismatch": 0, "missing_status": 0}
+    samples = _empty_findings()
+
+    def flag(check, vote_id):
+        counts[check] += 1
+        if len(samples[check]) < MAX_SAMPLES:
+            samples[check].append(vote_id)
+
+    start = time.perf_counter()
+    conn = db.connect_standalone()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT v.voteId, v.encryptedVote, v.voteHash, v.keyFingerprint, s.hasVoted
+            FROM VOTE v
+            LEFT JOIN VOTER_ELECTION_STATUS s
+                ON s.voterId = v.voterId AND s.electionId = v.electionId
+            WHERE v.electionId = %s AND v.voteId BETWEEN %s AND %s
+        """, (election_id, low, high))
+
+        while True:
+            rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            for vote_id, encrypted, vote_hash, fingerprint, has_voted in rows:
+                counts["ballots"] += 1
+                if hashlib.sha256(encrypted).digest() != bytes(vote_hash):
+                    flag("hash_mismatch", vote_id)
+                if bytes(fingerprint) != expected_fingerprint:
+                    flag("key_mismatch", vote_id)
+                if not has_voted:
+                    flag("missing_status", vote_id)
+        cursor.close()
+    finally:
+        conn.close()
+
+    return low, high, counts, samples, time.perf_counter() - start
+
+
+def election_wide_checks(election_id):
+    duplicates = db.execute_query("""
+        SELECT voterId, COUNT(*) AS ballots
+        FROM VOTE
+        WHERE electionId = %s
+        GROUP BY voterId
+        HAVING COUNT(*) > 1
+    """, (election_id,), fetch=True)
+
+    phantom_status = db.execute_query("""
+        SELECT s.voterId
+        FROM VOTER_ELECTION_STATUS s
+        LEFT JOIN VOTE v ON v.voterId = s.voterId AND v.electionId = s.electionId
+        WHERE s.electionId = %s AND s.hasVoted = TRUE AND v.voteId IS NULL
+    """, (election_id,), fetch=True)
+
+    return {
+        "duplicate_voters": [d['voterId'] for d in duplicates],
+        "status_without_ballot": [p['voterId'] for p in phantom_status],
+    }
+
+
+def _write_json(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def run_audit(election_id, workers, chunk_size, checkpoint_path, report_path, restart=False):
+    election = db.execute_query(
+        "SELECT publicKeyPem FROM ELECTION WHERE electionId = %s", (election_id,), fetch_one=True
+    )
+    if not election or not election['publicKeyPem']:
+        raise SystemExit(f"Election {election_id} not found or has no key")
+    expected_fingerprint = vote_encryption.key_fingerprint(election['publicKeyPem'])
+
+    checkpoint = None
+    if not restart and os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as f:
+            checkpoint = json.load(f)
+        if checkpoint["election_id"] != election_id or checkpoint["chunk_size"] != chunk_size:
+            raise SystemExit("Checkpoint belongs to a different audit; use --restart")
+        print(f"Resuming: {len(checkpoint['completed'])} ranges already audited")
+
+    if checkpoint is None:
+        bounds = db.execute_query(
+            "SELECT MIN(voteId) AS low, MAX(voteId) AS high FROM VOTE WHERE electionId = %s",
+            (election_id,), fetch_one=True
+        )
+        checkpoint = {
+            "election_id": election_id,
+            "chunk_size": chunk_size,
+            # Ballots cast after the audit starts are left for the next run
+            "low": bounds['low'] or 0,
+            "high": bounds['high'] or -1,
+            "completed": {},
+        }
+        _write_json(checkpoint_path, checkpoint)
+
+    pending = [
+        (election_id, expected_fingerprint, low, min(low + chunk_size - 1, checkpoint["high"]))
+        for low in range(checkpoint["low"], checkpoint["high"] + 1, chunk_size)
+        if f"{low}-{min(low + chunk_size - 1, checkpoint['high'])}" not in checkpoint["completed"]
+    ]
+
+    start = time.perf_counter()
+    audited = 0
+    if pending:
+        with Pool(processes=workers) as pool:
+            for low, high, counts, samples, elapsed in pool.imap_unordered(audit_range, pending):
+                checkpoint["completed"][f"{low}-{high}"] = {
+                    "counts": counts, "samples": samples, "seconds": round(elapsed, 3)
+                }
+                _write_json(checkpoint_path, checkpoint)
+                audited += counts["ballots"]
+                rate = audited / (time.perf_counter() - start)
+                print(f"  voteId {low}-{high}: {counts['ballots']} ballots "
+                      f"({len(checkpoint['completed'])} ranges done, {rate:.0f} ballots/s)")
+    wall = time.perf_counter() - start
+
+    totals = {"ballots": 0, "hash_mismatch": 0, "key_mismatch": 0, "missing_status": 0}
+    findings = _empty_findings()
+    worker_seconds = 0.0
+    for result in checkpoint["completed"].values():
+        for key, value in result["counts"].items():
+            totals[key] += value
+        for key, ids in result["samples"].items():
+            findings[key].extend(ids[:max(0, MAX_SAMPLES - len(findings[key]))])
+        worker_seconds += result["seconds"]
+
+    findings.update(election_wide_checks(election_id))
+
+    report = {
+        "election_id": election_id,
+        "vote_id_range": [checkpoint["low"], checkpoint["high"]],
+        "totals": totals,
+        "duplicate_voters": len(findings["duplicate_voters"]),
+        "status_without_ballot": len(findings["status_without_ballot"]),
+        "findings": findings,
+        "passed": not any(totals[k] for k in ("hash_mismatch", "key_mismatch", "missing_status"))
+                  and not findings["duplicate_voters"] and not findings["status_without_ballot"],
+        "throughput": {
+            "workers": workers,
+            "ballots_this_run": audited,
+            "wall_seconds": round(wall, 3),
+            "ballots_per_second": round(audited / wall, 1) if wall and audited else None,
+            "ballots_per_worker_second": round(totals["ballots"] / worker_seconds, 1) if worker_seconds else None,
+        },
+    }
+    _write_json(report_path, report)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Audit ballot integrity for an election")
+    parser.add_argument("election_id", type=int)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--checkpoint")
+    parser.add_argument("--report")
+    parser.add_argument("--restart", action="store_true", help="ignore any existing checkpoint")
+    args = parser.parse_args()
+
+    checkpoint_path = args.checkpoint or f"integrity_audit_{args.election_id}.checkpoint.json"
+    report_path = args.report or f"integrity_audit_{args.election_id}.report.json"
+
+    report = run_audit(args.election_id, args.workers, args.chunk_size,
+                       checkpoint_path, report_path, restart=args.restart)
+
+    totals = report["totals"]
+    print(f"\nAudited {totals['ballots']} ballots for election {args.election_id}")
+    print(f"  hash mismatches:        {totals['hash_mismatch']}")
+    print(f"  key mismatches:         {totals['key_mismatch']}")
+    print(f"  missing status rows:    {totals['missing_status']}")
+    print(f"  duplicate voters:       {report['duplicate_voters']}")
+    print(f"  status without ballot:  {report['status_without_ballot']}")
+    print(f"  throughput:             {report['throughput']['ballots_per_second']} ballots/s")
+    print(f"Result: {'PASS' if report['passed'] else 'FAIL'} (report: {report_path})")
+
+
+if __name__ == "__main__":
+    main()
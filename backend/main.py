@@ -1,12 +1,26 @@
-from fastapi import FastAPI, HTTPException, Depends, File, UploadFile, Request
+from fastapi import FastAPI, HTTPException, Depends, File, UploadFile, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse, Response
 from typing import List, Optional
+from collections import OrderedDict
 import models
 import database as db
 import auth
 from face_recognition import face_recognition_system
 from encryption import vote_encryption
-from datetime import timedelta
+from paillier import paillier_ballot
+import homomorphic
+from bulletin_board import bulletin_board, ROOT_INTERVAL_SECONDS
+import export
+from admission import rate_limiter, inference_gate
+import admission
+import booth_ingest
+from voter_roll import voter_roll, VOTER_ROLL_ENABLED, VOTER_ROLL_RECONCILE_SECONDS
+from analytics import analytics_engine, SnapshotNotReady, ANALYTICS_ENABLED, ANALYTICS_REFRESH_SECONDS
+import party_symbols
+from datetime import datetime, timedelta
+import asyncio
 import logging
 import sys
 import os
@@ -24,7 +38,7 @@ print("=" * 60)
 print("Loading libraries (this may take 30-60 seconds)...")
 sys.stdout.flush()
 
-from fastapi import FastAPI, HTTPException, Depends, File, UploadFile, Request
+from fastapi import FastAPI, HTTPException, Depends, File, UploadFile, Request, Query
 print("✓ FastAPI loaded")
 sys.stdout.flush()
 
@@ -33,7 +47,7 @@ print("✓ CORS middleware loaded")
 sys.stdout.flush()
 
 from typing import List, Optional
-from datetime import timedelta
+from datetime import datetime, timedelta
 import logging
 
 print("✓ Standard libraries loaded")
@@ -60,9 +74,40 @@ print("✓ Face recognition loaded")
 sys.stdout.flush()
 
 from encryption import vote_encryption
+from paillier import paillier_ballot
+import homomorphic
 print("✓ Encryption loaded")
 sys.stdout.flush()
 
+from bulletin_board import bulletin_board, ROOT_INTERVAL_SECONDS
+print("✓ Bulletin board loaded")
+sys.stdout.flush()
+
+import export
+print("✓ Export module loaded")
+sys.stdout.flush()
+
+from admission import rate_limiter, inference_gate
+import admission
+print("✓ Admission control loaded")
+sys.stdout.flush()
+
+import booth_ingest
+print("✓ Booth ingestion loaded")
+sys.stdout.flush()
+
+from voter_roll import voter_roll, VOTER_ROLL_ENABLED, VOTER_ROLL_RECONCILE_SECONDS
+print("✓ Voter roll loaded")
+sys.stdout.flush()
+
+from analytics import analytics_engine, SnapshotNotReady, ANALYTICS_ENABLED, ANALYTICS_REFRESH_SECONDS
+print("✓ Analytics snapshot loaded")
+sys.stdout.flush()
+
+import party_symbols
+print("✓ Party symbols loaded")
+sys.stdout.flush()
+
 print("\n" + "=" * 60)
 print("🎉 All modules loaded successfully!")
 print("=" * 60)
@@ -82,6 +127,41 @@ app.add_middleware(
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+async def publish_bulletin_roots():
+    """Periodically sign and publish Merkle roots for open elections"""
+    while True:
+        await asyncio.sleep(ROOT_INTERVAL_SECONDS)
+        try:
+            await asyncio.to_thread(bulletin_board.publish_pending)
+        except Exception as e:
+            logger.error(f"Bulletin root publishing failed: {str(e)}")
+
+async def reconcile_voter_rolls():
+    """Build rolls for elections as they open and reconcile them with VOTER_ELECTION_STATUS"""
+    while True:
+        try:
+            await asyncio.to_thread(voter_roll.refresh)
+        except Exception as e:
+            logger.error(f"Voter roll reconcile failed: {str(e)}")
+        await asyncio.sleep(VOTER_ROLL_RECONCILE_SECONDS)
+
+async def refresh_analytics_snapshot():
+    """Keep the columnar analytics snapshot within ANALYTICS_REFRESH_SECONDS of the replicas"""
+    while True:
+        try:
+            await asyncio.to_thread(analytics_engine.refresh)
+        except Exception as e:
+            logger.error(f"Analytics snapshot refresh failed: {str(e)}")
+        await asyncio.sleep(ANALYTICS_REFRESH_SECONDS)
+
+@app.on_event("startup")
+async def start_background_tasks():
+    asyncio.create_task(publish_bulletin_roots())
+    if VOTER_ROLL_ENABLED:
+        asyncio.create_task(reconcile_voter_rolls())
+    if ANALYTICS_ENABLED:
+        asyncio.create_task(refresh_analytics_snapshot())
+
 # Helper function to log audit
 def log_audit(user_id: Optional[int], user_type: str, action_type: str, 
               action_status: str, details: str, ip_address: str):
@@ -91,6 +171,13 @@ def log_audit(user_id: Optional[int], user_type: str, action_type: str,
     """
     db.execute_query(query, (user_id, user_type, action_type, action_status, details, ip_address))
 
+def _verify_face_inference(voter_id: int, face_image: str, stored_encoding: bytes):
+    """Runs on the inference pool; the detector path is thread-local, so read it here"""
+    success, message, similarity = face_recognition_system.verify_face(
+        voter_id, face_image, stored_encoding
+    )
+    return success, message, similarity, face_recognition_system.last_detection_path
+
 # ==================== VOTER ENDPOINTS ====================
 
 @app.post("/api/voter/register")
@@ -98,11 +185,13 @@ async def register_voter(data: models.VoterRegistrationRequest, request: Request
     voter = data.voter
     face_image = data.face_image
     """Register a new voter with face recognition"""
+    rate_limiter.check("register", request.client.host, voter.voter_id_number)
     try:
         # Register face
-        success, message, encoding_data = face_recognition_system.register_face(
-            voter_id=0,  # Temporary, will be updated
-            base64_image=face_image
+        success, message, encoding_data = await inference_gate.run(
+            "register", face_recognition_system.register_face,
+            0,  # Temporary voter_id, will be updated
+            face_image
         )
         
         if not success:
@@ -132,7 +221,8 @@ async def register_voter(data: models.VoterRegistrationRequest, request: Request
             
             if success:
                 # Update encoding file with actual voter_id
-                face_recognition_system.register_face(voter_id, face_image)
+                await inference_gate.run("register", face_recognition_system.register_face,
+                                         voter_id, face_image)
                 
                 log_audit(voter_id, 'VOTER', 'LOGIN', 'SUCCESS', 
                          'Voter registration', request.client.host)
@@ -141,6 +231,9 @@ async def register_voter(data: models.VoterRegistrationRequest, request: Request
             else:
                 raise HTTPException(status_code=500, detail="Registration failed")
     
+    except HTTPException:
+        # Keep 400/429/503 responses as they are
+        raise
     except Exception as e:
         logger.error(f"Registration error: {str(e)}")
         import traceback; traceback.print_exc()
@@ -150,13 +243,38 @@ async def register_voter(data: models.VoterRegistrationRequest, request: Request
 
 @app.get("/api/parties")
 async def get_all_parties():
-    """Get all political parties"""
+    """Get all political parties; symbols are fetched separately by content hash"""
     query = """
-        SELECT partyId, partyName, leader, symbol
+        SELECT partyId, partyName, leader, symbolHash
         FROM PARTY
         ORDER BY partyName
     """
-    return db.execute_query(query, fetch=True)
+    parties = db.execute_query(query, fetch=True, read_only=True)
+    for party in parties:
+        party['symbolUrl'] = party_symbols.symbol_url(party.pop('symbolHash'))
+    return parties
+
+@app.get("/api/parties/symbols/{symbol_hash}")
+def get_party_symbol(symbol_hash: str, request: Request, size: Optional[int] = None,
+                     format: Optional[str] = None):
+    """Party symbol image by content hash, optionally resized and re-encoded"""
+    if not party_symbols.is_symbol_hash(symbol_hash):
+        raise HTTPException(status_code=404, detail="Symbol not found")
+    error = party_symbols.check_variant(size, format)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    
+    # The URL names the content, so a cached copy is always current
+    tag = party_symbols.etag(symbol_hash, size, format)
+    headers = {"Cache-Control": party_symbols.IMMUTABLE, "ETag": tag}
+    if request.headers.get("if-none-match") == tag:
+        return Response(status_code=304, headers=headers)
+    
+    symbol = party_symbols.party_symbols.get(symbol_hash, size, format)
+    if symbol is None:
+        raise HTTPException(status_code=404, detail="Symbol not found")
+    content, media_type = symbol
+    return Response(content=content, media_type=media_type, headers=headers)
 
 @app.get("/api/constituencies")
 async def get_all_constituencies():
@@ -166,7 +284,7 @@ async def get_all_constituencies():
         FROM CONSTITUENCY
         ORDER BY state, district, name
     """
-    return db.execute_query(query, fetch=True)
+    return db.execute_query(query, fetch=True, read_only=True)
 
 @app.get("/api/elections")
 async def get_all_elections():
@@ -176,7 +294,7 @@ async def get_all_elections():
         FROM ELECTION
         ORDER BY startTime DESC
     """
-    return db.execute_query(query, fetch=True)
+    return db.execute_query(query, fetch=True, read_only=True)
 
 @app.post("/api/voter/login")
 async def login_voter(credentials: models.VoterLogin, request: Request):
@@ -210,48 +328,75 @@ async def verify_face(data: models.FaceVerificationRequest, request: Request):
     voter_id = data.voter_id
     face_image = data.face_image
     """Verify voter's face for authentication"""
+    rate_limiter.check("verify-face", request.client.host, str(voter_id))
+    
     query = "SELECT faceEncodingData FROM VOTER WHERE voterId = %s"
     voter = db.execute_query(query, (voter_id,), fetch_one=True)
     
     if not voter or not voter['faceEncodingData']:
         raise HTTPException(status_code=404, detail="Voter not found or no face data")
     
-    success, message, similarity = face_recognition_system.verify_face(
-        voter_id, face_image, voter['faceEncodingData']
+    success, message, similarity, detection_path = await inference_gate.run(
+        "verify-face", _verify_face_inference, voter_id, face_image, voter['faceEncodingData']
     )
     
     status = 'SUCCESS' if success else 'FAILED'
     log_audit(voter_id, 'VOTER', 'FACE_AUTH', status, 
-             f'{message} (similarity: {similarity:.2f})', request.client.host)
+             f'{message} (similarity: {similarity:.2f}, detector: {detection_path})', request.client.host)
     
     if not success:
         raise HTTPException(status_code=401, detail=message)
     
-    return {"verified": True, "similarity": similarity, "message": message}
+    return {"verified": True, "similarity": similarity, "message": message,
+            "detection_path": detection_path}
 
 @app.post("/api/voter/cast-vote")
 async def cast_vote(vote_data: models.VoteCast, request: Request, current_user: dict = Depends(auth.get_current_user)):
     """Cast an encrypted vote"""
+    # Officer and admin tokens carry their own ids, which are not voter ids
+    if current_user['user_type'] != 'VOTER':
+        raise HTTPException(status_code=403, detail="Voter access required")
     voter_id = current_user['user_id']
 
     try:
-        # Check eligibility
-        query = "SELECT IsVoterEligible(%s, %s) as eligible"
-        result = db.execute_query(query, (voter_id, vote_data.election_id), fetch_one=True)
-        print("Eligibility Check:", result)
+        # Check eligibility; the roll settles most attempts without a query
+        eligible = voter_roll.check(voter_id, vote_data.election_id)
+        if eligible is None:
+            query = "SELECT IsVoterEligible(%s, %s) as eligible"
+            result = db.execute_query(query, (voter_id, vote_data.election_id), fetch_one=True)
+            print("Eligibility Check:", result)
+            eligible = bool(result and result.get("eligible"))
 
-        if not result or not result.get("eligible"):
+        if not eligible:
             raise HTTPException(status_code=403, detail="Voter not eligible to vote")
 
         # Get election public key
-        query = "SELECT publicKeyPem FROM ELECTION WHERE electionId = %s"
+        query = "SELECT publicKeyPem, ballotScheme FROM ELECTION WHERE electionId = %s"
         election = db.execute_query(query, (vote_data.election_id,), fetch_one=True)
 
         if not election or not election['publicKeyPem']:
             raise HTTPException(status_code=404, detail="Election not found or keys not generated")
 
         # Encrypt vote
-        encrypted_vote, vote_hash = vote_encryption.encrypt_vote(vote_data.candidate_id, election['publicKeyPem'])
+        if election['ballotScheme'] == models.BallotScheme.PAILLIER.value:
+            query = """
+                SELECT c.candidateId
+                FROM CANDIDATE c
+                JOIN VOTER v ON v.constituencyId = c.constituencyId
+                WHERE c.electionId = %s AND v.voterId = %s
+                ORDER BY c.candidateId
+            """
+            candidates = db.execute_query(query, (vote_data.election_id, voter_id), fetch=True)
+            try:
+                # One modexp per candidate; keep it off the event loop
+                encrypted_vote, vote_hash = await run_in_threadpool(
+                    paillier_ballot.encrypt_ballot,
+                    [c['candidateId'] for c in candidates], vote_data.candidate_id, election['publicKeyPem']
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        else:
+            encrypted_vote, vote_hash = vote_encryption.encrypt_vote(vote_data.candidate_id, election['publicKeyPem'])
 
         with db.get_db_cursor() as (cursor, conn):
             # Create MySQL session variable for INOUT
@@ -262,26 +407,46 @@ async def cast_vote(vote_data: models.VoteCast, request: Request, current_user:
                 CALL CastVote(%s, %s, %s, %s, %s, %s, %s, @attempt_count, @vote_id, @success)
             """, (
                 voter_id, vote_data.election_id, vote_data.candidate_id,
-                encrypted_vote, vote_hash, election['publicKeyPem'], request.client.host
+                encrypted_vote, bytes.fromhex(vote_hash),
+                vote_encryption.key_fingerprint(election['publicKeyPem']), request.client.host
             ))
 
             # Fetch OUT and INOUT results
             cursor.execute("SELECT @attempt_count AS attempt_count, @vote_id AS vote_id, @success AS success;")
             result = cursor.fetchone()
             conn.commit()
+            db.mark_write(f"voter:{voter_id}")
 
         print("Vote Insert Result:", result)
 
         if result and result['success']:
+            voter_roll.mark_voted(vote_data.election_id, voter_id)
+            try:
+                bulletin_board.append(vote_data.election_id, result['vote_id'], bytes.fromhex(vote_hash))
+            except Exception as e:
+                # The periodic sync picks the ballot up from VOTE
+                logger.error(f"Bulletin board append failed: {str(e)}")
+
             return {
                 "message": "Vote cast successfully",
                 "vote_id": result['vote_id'],
+                "election_id": vote_data.election_id,
                 "vote_hash": vote_hash,
                 "attempt_count": result['attempt_count']
             }
         else:
+            # A vote recorded through another worker or a booth is not in this roll yet
+            status = db.execute_query(
+                "SELECT hasVoted FROM VOTER_ELECTION_STATUS WHERE voterId = %s AND electionId = %s",
+                (voter_id, vote_data.election_id), fetch_one=True
+            )
+            if status and status['hasVoted']:
+                voter_roll.mark_voted(vote_data.election_id, voter_id)
+                raise HTTPException(status_code=403, detail="Voter has already voted in this election")
             raise HTTPException(status_code=500, detail="Failed to cast vote")
 
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback; traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
@@ -289,13 +454,16 @@ async def cast_vote(vote_data: models.VoteCast, request: Request, current_user:
 @app.get("/api/voter/profile")
 async def get_voter_profile(current_user: dict = Depends(auth.get_current_user)):
     """Get voter profile"""
+    if current_user['user_type'] != 'VOTER':
+        raise HTTPException(status_code=403, detail="Voter access required")
     query = """
         SELECT v.*, c.name as constituency_name, c.district, c.state
         FROM VOTER v
         JOIN CONSTITUENCY c ON v.constituencyId = c.constituencyId
         WHERE v.voterId = %s
     """
-    voter = db.execute_query(query, (current_user['user_id'],), fetch_one=True)
+    voter = db.execute_query(query, (current_user['user_id'],), fetch_one=True,
+                             read_only=True, session=f"voter:{current_user['user_id']}")
     
     if not voter:
         raise HTTPException(status_code=404, detail="Voter not found")
@@ -318,19 +486,96 @@ async def get_active_elections():
           AND completionStatus = 0
         ORDER BY startTime ASC
     """
-    elections = db.execute_query(query, fetch=True)
+    elections = db.execute_query(query, fetch=True, read_only=True)
     return elections
 
 @app.get("/api/elections/{election_id}/candidates")
 async def get_candidates(election_id: int, constituency_id: int):
     """Get candidates for an election and constituency"""
     query = """
-        SELECT c.*, p.partyName, p.leader
+        SELECT c.*, p.partyName, p.leader, p.symbolHash
         FROM CANDIDATE c
         JOIN PARTY p ON c.partyId = p.partyId
         WHERE c.electionId = %s AND c.constituencyId = %s
     """
-    return db.execute_query(query, (election_id, constituency_id), fetch=True)
+    candidates = db.execute_query(query, (election_id, constituency_id), fetch=True, read_only=True)
+    for candidate in candidates:
+        candidate['symbolUrl'] = party_symbols.symbol_url(candidate.pop('symbolHash'))
+    return candidates
+
+# ==================== BOOTH ENDPOINTS ====================
+
+@app.post("/api/booth/login")
+async def officer_login(credentials: models.OfficerLogin, request: Request):
+    """Booth officer login"""
+    query = "SELECT officerId, passwordHash FROM BOOTHOFFICER WHERE email = %s"
+    officer = db.execute_query(query, (credentials.email,), fetch_one=True)
+    
+    if not officer or not auth.verify_password(credentials.password, officer['passwordHash']):
+        log_audit(None, 'OFFICER', 'LOGIN', 'FAILED', 
+                 f'Invalid credentials for {credentials.email}', request.client.host)
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    
+    log_audit(officer['officerId'], 'OFFICER', 'LOGIN', 'SUCCESS', 
+             'Officer login successful', request.client.host)
+    
+    booths = db.execute_query(
+        "SELECT boothId, location, constituencyId FROM BOOTH WHERE officerId = %s",
+        (officer['officerId'],), fetch=True
+    )
+    # Long-lived so a booth can upload its backlog after hours offline
+    token = auth.create_access_token(
+        data={"user_id": officer['officerId'], "user_type": "OFFICER"},
+        expires_delta=timedelta(hours=16)
+    )
+    
+    return {"access_token": token, "token_type": "bearer", "booths": booths}
+
+@app.get("/api/booth/{booth_id}/elections")
+async def get_booth_elections(booth_id: int, current_user: dict = Depends(auth.get_current_user)):
+    """Open elections with public keys and candidates, for offline encryption at a booth"""
+    if current_user['user_type'] != 'OFFICER':
+        raise HTTPException(status_code=403, detail="Officer access required")
+    
+    booth = db.execute_query(
+        "SELECT constituencyId, officerId FROM BOOTH WHERE boothId = %s", (booth_id,), fetch_one=True
+    )
+    if not booth or booth['officerId'] != current_user['user_id']:
+        raise HTTPException(status_code=403, detail="Officer is not assigned to this booth")
+    
+    elections = db.execute_query("""
+        SELECT electionId, title, startTime, endTime, ballotScheme, publicKeyPem
+        FROM ELECTION
+        WHERE endTime > NOW() AND completionStatus = 0
+        ORDER BY startTime ASC
+    """, fetch=True, read_only=True)
+    for election in elections:
+        election['candidates'] = db.execute_query("""
+            SELECT c.candidateId, c.name, p.partyName
+            FROM CANDIDATE c
+            JOIN PARTY p ON c.partyId = p.partyId
+            WHERE c.electionId = %s AND c.constituencyId = %s
+            ORDER BY c.candidateId
+        """, (election['electionId'], booth['constituencyId']), fetch=True, read_only=True)
+    
+    return {"booth_id": booth_id, "constituency_id": booth['constituencyId'], "elections": elections}
+
+@app.post("/api/booth/{booth_id}/batches")
+def upload_booth_batch(booth_id: int, batch: models.BoothBatch, request: Request,
+                       current_user: dict = Depends(auth.get_current_user)):
+    """Ingest a signed batch of encrypted ballots; safe to retry with the same batch_id"""
+    if current_user['user_type'] != 'OFFICER':
+        raise HTTPException(status_code=403, detail="Officer access required")
+    
+    try:
+        result = booth_ingest.ingest_batch(booth_id, current_user['user_id'], batch, request.client.host)
+    except booth_ingest.BatchRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    
+    logger.info(f"Booth {booth_id} batch {batch.batch_id}: {result['accepted']} accepted, "
+                f"{result['duplicate']} duplicate, {result['rejected']} rejected"
+                f"{' (replay)' if result['replayed'] else ''}")
+    return result
 
 # ==================== ADMIN ENDPOINTS ====================
 
@@ -357,10 +602,13 @@ async def admin_login(credentials: models.AdminLogin, request: Request):
 
 @app.get("/api/constituency/{constituency_id}/turnout/{election_id}")
 async def get_turnout(constituency_id: int, election_id: int):
+    turnout = voter_roll.turnout(election_id, constituency_id)
+    if turnout is not None:
+        return {"turnout_percentage": turnout}
     result = db.execute_query(
         "SELECT CalculateTurnout(%s, %s) AS turnout",
         (constituency_id, election_id),
-        fetch_one=True
+        fetch_one=True, read_only=True
     )
     return {"turnout_percentage": float(result['turnout'])}
 
@@ -368,31 +616,89 @@ async def get_turnout(constituency_id: int, election_id: int):
 @app.get("/api/election/{election_id}/total-votes")
 async def get_total_votes(election_id: int):
     """Public: Total votes cast in election"""
-    result = db.execute_query("SELECT GetTotalVotes(%s) as total", (election_id,), fetch_one=True)
+    result = db.execute_query("SELECT GetTotalVotes(%s) as total", (election_id,), fetch_one=True, read_only=True)
     return {"total_votes": int(result['total'])}
 
 @app.get("/api/voter/{voter_id}/auth-success-rate")
 async def get_auth_success_rate(voter_id: int, current_user: dict = Depends(auth.get_current_user)):
     if current_user['user_type'] != 'ADMIN':
         raise HTTPException(403, "Admin only")
-    result = db.execute_query("SELECT GetAuthSuccessRate(%s) as rate", (voter_id,), fetch_one=True)
+    result = db.execute_query("SELECT GetAuthSuccessRate(%s) as rate", (voter_id,), fetch_one=True, read_only=True)
     return {"success_rate": float(result['rate'])}
 
 @app.get("/api/vote/verify/{vote_id}")
-async def verify_vote_hash(vote_id: int, hash: str):
+async def verify_vote_hash(vote_id: int, hash: str, election_id: Optional[int] = None):
     """Public: Voter receipt verification"""
-    result = db.execute_query("SELECT VerifyVoteHash(%s, %s) as valid", (vote_id, hash), fetch_one=True)
-    return {"valid": bool(result['valid'])}
+    if election_id is None:
+        # Legacy receipts without an election: probes every VOTE partition
+        result = db.execute_query("SELECT VerifyVoteHash(%s, %s) as valid", (vote_id, hash), fetch_one=True)
+        return {"valid": bool(result['valid'])}
+
+    result = db.execute_query(
+        "SELECT voteHash = UNHEX(%s) AS valid FROM VOTE WHERE voteId = %s AND electionId = %s",
+        (hash, vote_id, election_id), fetch_one=True
+    )
+    return {"valid": bool(result and result['valid'])}
+
+# ==================== BULLETIN BOARD ENDPOINTS ====================
+
+@app.get("/api/bulletin/public-key", response_class=PlainTextResponse)
+async def get_bulletin_public_key():
+    """Public: Ed25519 key that signs published Merkle roots"""
+    return bulletin_board.public_key_pem
+
+@app.get("/api/bulletin/{election_id}/root")
+async def get_bulletin_root(election_id: int):
+    """Public: Latest signed Merkle root for an election"""
+    root = bulletin_board.latest_root(election_id)
+    if not root:
+        raise HTTPException(status_code=404, detail="No root published yet")
+    return root
+
+@app.get("/api/bulletin/{election_id}/proof/{vote_id}")
+async def get_inclusion_proof(election_id: int, vote_id: int):
+    """Public: Inclusion proof for a ballot against the latest signed root"""
+    proof = bulletin_board.inclusion_proof(election_id, vote_id)
+    if not proof:
+        raise HTTPException(status_code=404, detail="Ballot not in a published root yet")
+    return proof
+
+@app.get("/api/bulletin/{election_id}/entries")
+async def get_bulletin_entries(election_id: int):
+    """Public: All (voteId, voteHash) leaves for bulk offline verification"""
+    path = bulletin_board.entries_path(election_id)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="No ballots on the board")
+    return FileResponse(path, media_type="application/octet-stream",
+                        filename=f"election_{election_id}_entries.bin")
+
+@app.post("/api/admin/bulletin/{election_id}/publish")
+async def publish_bulletin_root(election_id: int, current_user: dict = Depends(auth.get_current_user)):
+    """Sync the board from VOTE and publish a signed root now"""
+    if current_user['user_type'] != 'ADMIN':
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    appended = bulletin_board.sync(election_id)
+    root = bulletin_board.publish_root(election_id)
+    return {"appended": appended, "root": root}
 
 @app.post("/api/admin/vote/decrypt/{vote_id}")
-async def decrypt_vote_admin(vote_id: int, current_user: dict = Depends(auth.get_current_user)):
+async def decrypt_vote_admin(vote_id: int, election_id: Optional[int] = None,
+                             current_user: dict = Depends(auth.get_current_user)):
     if current_user['user_type'] != 'ADMIN':
         raise HTTPException(403, "Admin only")
 
-    # Get private key and encrypted vote
-    vote = db.execute_query("SELECT encryptedVote, e.privateKeyPem FROM VOTE v JOIN ELECTION e ON v.electionId = e.electionId WHERE v.voteId = %s", (vote_id,), fetch_one=True)
+    # Get private key and encrypted vote; the election id prunes to one partition
+    query = "SELECT encryptedVote, e.privateKeyPem, e.ballotScheme FROM VOTE v JOIN ELECTION e ON v.electionId = e.electionId WHERE v.voteId = %s"
+    params = (vote_id,)
+    if election_id is not None:
+        query += " AND v.electionId = %s"
+        params = (vote_id, election_id)
+    vote = db.execute_query(query, params, fetch_one=True)
     if not vote:
         raise HTTPException(404, "Vote not found")
+    if vote['ballotScheme'] == models.BallotScheme.PAILLIER.value:
+        raise HTTPException(400, "Paillier ballots are only decrypted in aggregate")
 
     try:
         candidate_id = vote_encryption.decrypt_vote(vote['encryptedVote'], vote['privateKeyPem'])
@@ -411,22 +717,53 @@ async def create_election(election: models.ElectionCreate, request: Request,
         raise HTTPException(status_code=403, detail="Admin access required")
     
     # Generate keypair
-    public_key, private_key = vote_encryption.generate_keypair()
+    if election.ballot_scheme == models.BallotScheme.PAILLIER:
+        public_key, private_key = paillier_ballot.generate_keypair()
+    else:
+        public_key, private_key = vote_encryption.generate_keypair()
     
     query = """
-        INSERT INTO ELECTION (title, startTime, endTime, publicKeyPem, privateKeyPem)
-        VALUES (%s, %s, %s, %s, %s)
+        INSERT INTO ELECTION (title, startTime, endTime, ballotScheme, publicKeyPem, privateKeyPem)
+        VALUES (%s, %s, %s, %s, %s, %s)
     """
     election_id = db.execute_query(
         query, 
-        (election.title, election.start_time, election.end_time, public_key, private_key)
+        (election.title, election.start_time, election.end_time, election.ballot_scheme.value,
+         public_key, private_key)
     )
     
+    # Register the public key so ballots can reference it by fingerprint
+    db.execute_query(
+        "INSERT INTO ELECTION_KEY (keyFingerprint, electionId, publicKeyPem) VALUES (%s, %s, %s)",
+        (vote_encryption.key_fingerprint(public_key), election_id, public_key)
+    )
+    
+    # VOTE and VOTER_ELECTION_STATUS are list-partitioned by election
+    db.call_procedure('AddElectionPartitions', (election_id,))
+    
     log_audit(current_user['user_id'], 'ADMIN', 'ELECTION_CREATE', 'SUCCESS',
              f'Election {election_id} created', request.client.host)
     
     return {"election_id": election_id, "message": "Election created successfully"}
 
+@app.put("/api/admin/booths/{booth_id}/key")
+async def register_booth_key(booth_id: int, key: models.BoothKeyRegistration, request: Request,
+                             current_user: dict = Depends(auth.get_current_user)):
+    """Register the Ed25519 public key a booth terminal signs its batches with"""
+    if current_user['user_type'] != 'ADMIN':
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    if not booth_ingest.validate_public_key(key.public_key_pem):
+        raise HTTPException(status_code=400, detail="Expected an Ed25519 public key in PEM format")
+    
+    booth = db.execute_query("SELECT boothId FROM BOOTH WHERE boothId = %s", (booth_id,), fetch_one=True)
+    if not booth:
+        raise HTTPException(status_code=404, detail="Booth not found")
+    
+    db.execute_query("UPDATE BOOTH SET publicKeyPem = %s WHERE boothId = %s",
+                     (key.public_key_pem, booth_id))
+    return {"booth_id": booth_id, "message": "Booth key registered"}
+
 @app.post("/api/admin/candidates")
 async def add_candidate(candidate: models.CandidateCreate, request: Request,
                        current_user: dict = Depends(auth.get_current_user)):
@@ -491,6 +828,35 @@ async def calculate_all_results(election_id: int, request: Request,
         "details": results_summary
     }
 
+@app.post("/api/admin/results/homomorphic-tally/{election_id}")
+def homomorphic_tally(election_id: int, request: Request,
+                      workers: int = Query(4, ge=1, le=homomorphic.MAX_TALLY_WORKERS),
+                      current_user: dict = Depends(auth.get_current_user)):
+    """Tally a Paillier election with one decryption per candidate"""
+    if current_user['user_type'] != 'ADMIN':
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    try:
+        results = homomorphic.tally_election(election_id, workers=workers)
+    except ValueError as e:
+        log_audit(current_user['user_id'], 'ADMIN', 'RESULT_PUBLISH', 'FAILED',
+                 f'Homomorphic tally for election {election_id}: {str(e)}', request.client.host)
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    homomorphic.publish_results(election_id, results)
+    
+    log_audit(current_user['user_id'], 'ADMIN', 'RESULT_PUBLISH', 'SUCCESS',
+             f'Homomorphic tally for election {election_id}', request.client.host)
+    
+    return {
+        "message": f"Results tallied for {len(results)} constituencies",
+        "results": [
+            {"constituency_id": constituency_id, "candidate_id": candidate_id, "votes": votes}
+            for constituency_id, counts in results.items()
+            for candidate_id, votes in counts.items()
+        ]
+    }
+
 @app.post("/api/admin/results/calculate/{election_id}/{constituency_id}")
 async def calculate_results(election_id: int, constituency_id: int, request: Request,
                            current_user: dict = Depends(auth.get_current_user)):
@@ -528,7 +894,45 @@ async def get_results(election_id: int, current_user: dict = Depends(auth.get_cu
         WHERE e.electionId = %s
         ORDER BY co.constituencyId, r.totalVotes DESC
     """
-    return db.execute_query(query, (election_id,), fetch=True)
+    return db.execute_query(query, (election_id,), fetch=True, read_only=True)
+
+# Reports of completed elections are computed once per ballot count: booth
+# uploads can still add ballots after completion. Bounded, least recently used first out
+REPORT_CACHE_SIZE = 256
+election_report_cache = OrderedDict()
+
+@app.get("/api/admin/reports/{election_id}")
+async def get_election_report(election_id: int, current_user: dict = Depends(auth.get_current_user)):
+    """Election summary report (cached once the election is completed)"""
+    if current_user['user_type'] != 'ADMIN':
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    # Pruned to the election's partition and answered from the end of its primary key
+    last_vote = db.execute_query(
+        "SELECT MAX(voteId) AS lastVote FROM VOTE WHERE electionId = %s",
+        (election_id,), fetch_one=True, read_only=True
+    )['lastVote']
+    cached = election_report_cache.get(election_id)
+    if cached is not None and cached[0] == last_vote:
+        election_report_cache.move_to_end(election_id)
+        return cached[1]
+    
+    results = db.call_procedure('GenerateElectionReport', (election_id,), read_only=True)
+    if not results or not results[0]:
+        raise HTTPException(status_code=404, detail="Election not found")
+    
+    report = dict(zip(
+        ('election_title', 'start_time', 'end_time', 'completion_status', 'total_votes_cast',
+         'constituencies_participated', 'total_candidates', 'avg_vote_percentage',
+         'highest_votes_received', 'leading_candidate'),
+        results[0][0]
+    ))
+    if report['completion_status']:
+        election_report_cache[election_id] = (last_vote, report)
+        election_report_cache.move_to_end(election_id)
+        while len(election_report_cache) > REPORT_CACHE_SIZE:
+            election_report_cache.popitem(last=False)
+    return report
 
 @app.get("/api/admin/analytics/voting-patterns")
 async def get_voting_patterns(election_id: int, current_user: dict = Depends(auth.get_current_user)):
@@ -548,7 +952,7 @@ async def get_voting_patterns(election_id: int, current_user: dict = Depends(aut
         GROUP BY DATE(v.timestamp), HOUR(v.timestamp)
         ORDER BY voting_date, voting_hour
     """
-    return db.execute_query(query, (election_id,), fetch=True)
+    return db.execute_query(query, (election_id,), fetch=True, read_only=True)
 
 @app.get("/api/admin/analytics/demographics/{election_id}/{constituency_id}")
 async def get_demographic_stats(election_id: int, constituency_id: int,
@@ -574,6 +978,51 @@ async def get_demographic_stats(election_id: int, constituency_id: int,
     """
     return db.execute_query(query, (election_id, constituency_id), fetch=True)
 
+def _snapshot_report(report, election_id: int, *args):
+    try:
+        return report(election_id, *args)
+    except SnapshotNotReady:
+        raise HTTPException(status_code=503, detail="Analytics snapshot is still loading",
+                            headers={"Retry-After": str(ANALYTICS_REFRESH_SECONDS)})
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/api/admin/analytics/party-performance/{election_id}")
+def get_party_performance(election_id: int, current_user: dict = Depends(auth.get_current_user)):
+    """Party performance across constituencies, from the analytics snapshot"""
+    if current_user['user_type'] != 'ADMIN':
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    # Query 5 from complex_queries.sql
+    return _snapshot_report(analytics_engine.party_performance, election_id)
+
+@app.get("/api/admin/analytics/top-candidates/{election_id}")
+def get_top_candidates(election_id: int, limit: Optional[int] = None,
+                       current_user: dict = Depends(auth.get_current_user)):
+    """Constituency winners with the demographics of their voters, from the analytics snapshot"""
+    if current_user['user_type'] != 'ADMIN':
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    # Query 7 from complex_queries.sql
+    return _snapshot_report(analytics_engine.top_candidates, election_id, limit)
+
+@app.get("/api/admin/analytics/booths/{election_id}")
+def get_booth_metrics(election_id: int, current_user: dict = Depends(auth.get_current_user)):
+    """Booth-wise turnout, from the analytics snapshot"""
+    if current_user['user_type'] != 'ADMIN':
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    # Query 9 from complex_queries.sql
+    return _snapshot_report(analytics_engine.booth_metrics, election_id)
+
+@app.get("/api/admin/analytics/snapshot")
+async def get_analytics_snapshot_status(current_user: dict = Depends(auth.get_current_user)):
+    """Age, refresh time and row counts of the analytics snapshot"""
+    if current_user['user_type'] != 'ADMIN':
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return analytics_engine.status()
+
 @app.get("/api/admin/security/suspicious-activities")
 async def get_suspicious_activities(current_user: dict = Depends(auth.get_current_user)):
     """Get suspicious login activities"""
@@ -601,7 +1050,7 @@ async def get_suspicious_activities(current_user: dict = Depends(auth.get_curren
         HAVING failed_attempts >= 3 OR different_ips > 2
         ORDER BY failed_attempts DESC, different_ips DESC
     """
-    return db.execute_query(query, fetch=True)
+    return db.execute_query(query, fetch=True, read_only=True)
 
 @app.get("/api/admin/audit-logs")
 async def get_audit_logs(limit: int = 100, current_user: dict = Depends(auth.get_current_user)):
@@ -627,7 +1076,61 @@ async def get_audit_logs(limit: int = 100, current_user: dict = Depends(auth.get
         ORDER BY failed_logins DESC
         LIMIT %s
     """
-    return db.execute_query(query, (limit,), fetch=True)
+    return db.execute_query(query, (limit,), fetch=True, read_only=True)
+
+@app.get("/api/admin/metrics/admission")
+async def get_admission_metrics(current_user: dict = Depends(auth.get_current_user)):
+    """Rate-limit and inference-queue counters, including shed requests"""
+    if current_user['user_type'] != 'ADMIN':
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return admission.metrics_snapshot()
+
+@app.get("/api/admin/metrics/symbol-cache")
+async def get_symbol_cache_metrics(current_user: dict = Depends(auth.get_current_user)):
+    """Size and hit rate of the party symbol variant cache"""
+    if current_user['user_type'] != 'ADMIN':
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return party_symbols.party_symbols.cache.snapshot()
+
+@app.get("/api/admin/metrics/voter-roll")
+async def get_voter_roll_metrics(current_user: dict = Depends(auth.get_current_user)):
+    """Voter roll sizes, short-circuit counters and the last reconcile's drift"""
+    if current_user['user_type'] != 'ADMIN':
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return voter_roll.snapshot()
+
+@app.post("/api/admin/voter-roll/reconcile")
+def reconcile_voter_roll(current_user: dict = Depends(auth.get_current_user)):
+    """Rebuild the rolls now, e.g. right after creating an election that is already open"""
+    if current_user['user_type'] != 'ADMIN':
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    voter_roll.refresh()
+    return voter_roll.snapshot()
+
+@app.get("/api/admin/export/{dataset}")
+def export_data(dataset: str, format: str = "ndjson", election_id: Optional[int] = None,
+                since: Optional[datetime] = None, current_user: dict = Depends(auth.get_current_user)):
+    """Stream results, turnout, ballots or audit-logs as NDJSON, CSV or Arrow"""
+    if current_user['user_type'] != 'ADMIN':
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    error = export.check_export(dataset, format, election_id)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    
+    # Sync generator: Starlette pulls each chunk in the threadpool, so the
+    # unbuffered cursor only advances as fast as the client reads
+    suffix = f"_{election_id}" if election_id is not None else ""
+    extension = "arrows" if format == "arrow" else format
+    return StreamingResponse(
+        export.export_stream(dataset, format, election_id=election_id, since=since),
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{dataset}{suffix}.{extension}"'}
+    )
 
 if __name__ == "__main__":
     import uvicorn
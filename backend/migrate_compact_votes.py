@@ -0,0 +1,328 @@
+"""Online migration of VOTE to the compact ballot representation.
+
+Legacy layout:   encryptedVote TEXT (base64), voteHash VARCHAR(64) (hex),
+                 publicKeyUsed TEXT (full PEM on every row)
+Compact layout:  encryptedVote BLOB (raw bytes), voteHash BINARY(32),
+                 keyFingerprint BINARY(32) -> ELECTION_KEY
+
+Steps (run in order; voting can continue during prepare and backfill):
+
+    python migrate_compact_votes.py prepare    # add shadow columns + sync trigger
+    python migrate_compact_votes.py backfill   # convert existing rows in batches
+    python migrate_compact_votes.py cutover    # swap columns (maintenance window)
+    python migrate_compact_votes.py add-fk     # VOTE.keyFingerprint -> ELECTION_KEY
+
+cutover is not online. The old backend writes the legacy columns, so stop it
+first. cutover then holds LOCK TABLES VOTE WRITE while it converts rows that
+arrived since the backfill, drops the sync trigger and swaps the columns.
+Making the columns NOT NULL rebuilds VOTE, and writes wait for that rebuild.
+Afterwards, reload database/procedures.sql and database/functions.sql so
+CastVote and VerifyVoteHash use the new column types. Then deploy the
+backend that writes raw ciphertext and key fingerprints.
+
+add-fk first checks that every fingerprint has an ELECTION_KEY row. It then
+adds the foreign key with foreign_key_checks=0, so MySQL builds it in place
+instead of copying the table. Skip it if partition_votes.py migrate comes
+next: partitioned tables cannot have foreign keys.
+
+Connection settings come from DB_HOST, DB_PORT, DB_USER and DB_PASSWORD, as
+in database.py.
+
+    python migrate_compact_votes.py report [--rows N]
+
+prints table sizes for VOTE and a before/after insert-throughput comparison
+measured on scratch tables with both layouts.
+"""
+import argparse
+import base64
+import hashlib
+import os
+import time
+
+import mysql.connector
+from dotenv import load_dotenv
+
+from encryption import vote_encryption
+
+load_dotenv()
+
+BATCH_SIZE = 5000
+
+
+def connect():
+    return mysql.connector.connect(
+        host=os.getenv("DB_HOST", "localhost"),
+        port=int(os.getenv("DB_PORT", "3306")),
+        user=os.getenv("DB_USER", "root"),
+        password=os.getenv("DB_PASSWORD"),
+        database="SecureElectionDB"
+    )
+
+
+def column_exists(cursor, table, column):
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+    """, (table, column))
+    return cursor.fetchone()[0] > 0
+
+
+def prepare(conn):
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ELECTION_KEY (
+            keyFingerprint BINARY(32) PRIMARY KEY,
+            electionId BIGINT NOT NULL,
+            publicKeyPem TEXT NOT NULL,
+            createdAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (electionId) REFERENCES ELECTION(electionId)
+                ON DELETE CASCADE ON UPDATE CASCADE,
+            INDEX idx_key_election (electionId)
+        )
+    """)
+
+    # Fingerprint is SHA-256 of the PEM text, same as VoteEncryption.key_fingerprint
+    cursor.execute("""
+        INSERT IGNORE INTO ELECTION_KEY (keyFingerprint, electionId, publicKeyPem)
+        SELECT UNHEX(SHA2(publicKeyPem, 256)), electionId, publicKeyPem
+        FROM ELECTION
+        WHERE publicKeyPem IS NOT NULL
+    """)
+
+    if not column_exists(cursor, "VOTE", "encryptedVoteBin"):
+        cursor.execute("""
+            ALTER TABLE VOTE
+                ADD COLUMN encryptedVoteBin BLOB NULL,
+                ADD COLUMN voteHashBin BINARY(32) NULL,
+                ADD COLUMN keyFingerprint BINARY(32) NULL,
+                ALGORITHM=INPLACE, LOCK=NONE
+        """)
+
+    # Keep rows written during the backfill in sync
+    cursor.execute("DROP TRIGGER IF EXISTS vote_compact_sync")
+    cursor.execute("""
+        CREATE TRIGGER vote_compact_sync
+        BEFORE INSERT ON VOTE
+        FOR EACH ROW
+        BEGIN
+            INSERT IGNORE INTO ELECTION_KEY (keyFingerprint, electionId, publicKeyPem)
+            VALUES (UNHEX(SHA2(NEW.publicKeyUsed, 256)), NEW.electionId, NEW.publicKeyUsed);
+
+            SET NEW.encryptedVoteBin = FROM_BASE64(NEW.encryptedVote);
+            SET NEW.voteHashBin = UNHEX(NEW.voteHash);
+            SET NEW.keyFingerprint = UNHEX(SHA2(NEW.publicKeyUsed, 256));
+        END
+    """)
+
+    conn.commit()
+    cursor.close()
+    print("Prepared: shadow columns and sync trigger installed")
+
+
+def convert_rows(cursor, where, params=()):
+    """Fill the shadow columns of unconverted rows matching where; returns rows converted"""
+    cursor.execute(f"""
+        INSERT IGNORE INTO ELECTION_KEY (keyFingerprint, electionId, publicKeyPem)
+        SELECT DISTINCT UNHEX(SHA2(publicKeyUsed, 256)), electionId, publicKeyUsed
+        FROM VOTE
+        WHERE {where} AND keyFingerprint IS NULL
+    """, params)
+    cursor.execute(f"""
+        UPDATE VOTE
+        SET encryptedVoteBin = FROM_BASE64(encryptedVote),
+            voteHashBin = UNHEX(voteHash),
+            keyFingerprint = UNHEX(SHA2(publicKeyUsed, 256))
+        WHERE {where} AND encryptedVoteBin IS NULL
+    """, params)
+    return cursor.rowcount
+
+
+def backfill(conn, batch_size=BATCH_SIZE):
+    cursor = conn.cursor()
+    cursor.execute("SELECT COALESCE(MIN(voteId), 0), COALESCE(MAX(voteId), 0) FROM VOTE")
+    low, high = cursor.fetchone()
+
+    migrated = 0
+    start = time.perf_counter()
+    for batch_start in range(low, high + 1, batch_size):
+        batch_end = batch_start + batch_size - 1
+
+        migrated += convert_rows(cursor, "voteId BETWEEN %s AND %s", (batch_start, batch_end))
+        conn.commit()
+
+        print(f"  voteId {batch_start}-{batch_end}: {migrated} rows migrated")
+
+    elapsed = time.perf_counter() - start
+    rate = migrated / elapsed if elapsed else 0
+    print(f"Backfill complete: {migrated} rows in {elapsed:.1f}s ({rate:.0f} rows/s)")
+    cursor.close()
+
+
+def cutover(conn):
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT COUNT(*) FROM VOTE WHERE encryptedVoteBin IS NULL")
+    remaining = cursor.fetchone()[0]
+    if remaining > BATCH_SIZE:
+        raise SystemExit(f"{remaining} rows not backfilled yet; run backfill first")
+
+    # No insert can land between the final conversion and the swap, so the
+    # NOT NULL change cannot fail on a row the trigger no longer fills
+    cursor.execute("LOCK TABLES VOTE WRITE, ELECTION_KEY WRITE")
+    try:
+        caught_up = convert_rows(cursor, "TRUE")
+        conn.commit()
+        cursor.execute("DROP TRIGGER IF EXISTS vote_compact_sync")
+        # MODIFY would name the legacy columns being dropped; CHANGE renames
+        # and retypes the shadow columns in one clause
+        cursor.execute("""
+            ALTER TABLE VOTE
+                DROP COLUMN encryptedVote,
+                DROP COLUMN voteHash,
+                DROP COLUMN publicKeyUsed,
+                CHANGE COLUMN encryptedVoteBin encryptedVote BLOB NOT NULL,
+                CHANGE COLUMN voteHashBin voteHash BINARY(32) NOT NULL,
+                MODIFY COLUMN keyFingerprint BINARY(32) NOT NULL,
+                ALGORITHM=INPLACE
+        """)
+    finally:
+        cursor.execute("UNLOCK TABLES")
+    cursor.close()
+    print(f"Cutover complete ({caught_up} late rows converted). "
+          f"Reload procedures.sql and functions.sql now.")
+
+
+def add_foreign_key(conn):
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT COUNT(*) FROM VOTE v
+        LEFT JOIN ELECTION_KEY k ON k.keyFingerprint = v.keyFingerprint
+        WHERE k.keyFingerprint IS NULL
+    """)
+    orphans = cursor.fetchone()[0]
+    if orphans:
+        raise SystemExit(f"{orphans} ballots reference no ELECTION_KEY row; not adding the foreign key")
+
+    # With checks off MySQL adds the constraint in place instead of copying VOTE;
+    # the query above has already validated the existing rows
+    cursor.execute("SET SESSION foreign_key_checks = 0")
+    try:
+        cursor.execute("""
+            ALTER TABLE VOTE
+                ADD FOREIGN KEY (keyFingerprint) REFERENCES ELECTION_KEY(keyFingerprint)
+                    ON DELETE RESTRICT ON UPDATE CASCADE,
+                ALGORITHM=INPLACE, LOCK=NONE
+        """)
+    finally:
+        cursor.execute("SET SESSION foreign_key_checks = 1")
+    cursor.close()
+    print("Foreign key VOTE.keyFingerprint -> ELECTION_KEY added")
+
+
+def table_size(cursor, table):
+    cursor.execute(f"ANALYZE TABLE {table}")
+    cursor.fetchall()
+    cursor.execute("""
+        SELECT TABLE_ROWS, DATA_LENGTH, INDEX_LENGTH
+        FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (table,))
+    return cursor.fetchone()
+
+
+def measure_layout(conn, table, ddl, make_row, rows):
+    cursor = conn.cursor()
+    cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    cursor.execute(ddl.format(table=table))
+
+    placeholders = ", ".join(["%s"] * len(make_row(0)))
+    insert = f"INSERT INTO {table} VALUES (NULL, {placeholders})"
+
+    start = time.perf_counter()
+    for batch_start in range(0, rows, 1000):
+        batch = [make_row(i) for i in range(batch_start, min(rows, batch_start + 1000))]
+        cursor.executemany(insert, batch)
+        conn.commit()
+    elapsed = time.perf_counter() - start
+
+    size = table_size(cursor, table)
+    cursor.execute(f"DROP TABLE {table}")
+    cursor.close()
+    return rows / elapsed, size
+
+
+def report(conn, rows):
+    cursor = conn.cursor()
+    current = table_size(cursor, "VOTE")
+    cursor.close()
+    print(f"VOTE now: ~{current[0]} rows, data {current[1] / 1024:.0f} KiB, "
+          f"indexes {current[2] / 1024:.0f} KiB")
+
+    public_pem, _ = vote_encryption.generate_keypair()
+    fingerprint = vote_encryption.key_fingerprint(public_pem)
+
+    def legacy_row(i):
+        ciphertext = os.urandom(256)
+        return (i, 1, 1, base64.b64encode(ciphertext).decode(),
+                hashlib.sha256(ciphertext).hexdigest(), public_pem)
+
+    def compact_row(i):
+        ciphertext = os.urandom(256)
+        return (i, 1, 1, ciphertext, hashlib.sha256(ciphertext).digest(), fingerprint)
+
+    legacy_ddl = """
+        CREATE TABLE {table} (
+            voteId BIGINT PRIMARY KEY AUTO_INCREMENT,
+            voterId BIGINT NOT NULL, electionId BIGINT NOT NULL, candidateId BIGINT NOT NULL,
+            encryptedVote TEXT NOT NULL, voteHash VARCHAR(64) NOT NULL, publicKeyUsed TEXT NOT NULL,
+            UNIQUE KEY (voterId, electionId), INDEX (electionId), INDEX (candidateId)
+        )
+    """
+    compact_ddl = """
+        CREATE TABLE {table} (
+            voteId BIGINT PRIMARY KEY AUTO_INCREMENT,
+            voterId BIGINT NOT NULL, electionId BIGINT NOT NULL, candidateId BIGINT NOT NULL,
+            encryptedVote BLOB NOT NULL, voteHash BINARY(32) NOT NULL,
+            keyFingerprint BINARY(32) NOT NULL,
+            UNIQUE KEY (voterId, electionId), INDEX (electionId), INDEX (candidateId)
+        )
+    """
+
+    print(f"\nInserting {rows} synthetic ballots into each layout...")
+    results = {
+        "legacy": measure_layout(conn, "VOTE_BENCH_LEGACY", legacy_ddl, legacy_row, rows),
+        "compact": measure_layout(conn, "VOTE_BENCH_COMPACT", compact_ddl, compact_row, rows),
+    }
+
+    print(f"\n{'layout':<10}{'rows/s':>12}{'data KiB':>12}{'index KiB':>12}{'bytes/row':>12}")
+    for name, (throughput, (_, data_length, index_length)) in results.items():
+        print(f"{name:<10}{throughput:>12.0f}{data_length / 1024:>12.0f}"
+              f"{index_length / 1024:>12.0f}{(data_length + index_length) / rows:>12.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate VOTE to compact ballot storage")
+    parser.add_argument("step", choices=["prepare", "backfill", "cutover", "add-fk", "report"])
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--rows", type=int, default=20000, help="rows per layout for report")
+    args = parser.parse_args()
+
+    conn = connect()
+    try:
+        if args.step == "prepare":
+            prepare(conn)
+        elif args.step == "backfill":
+            backfill(conn, args.batch_size)
+        elif args.step == "cutover":
+            cutover(conn)
+        elif args.step == "add-fk":
+            add_foreign_key(conn)
+        else:
+            report(conn, args.rows)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
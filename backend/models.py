@@ -8,6 +8,10 @@ class Gender(str, Enum):
     F = "F"
     O = "O"
 
+class BallotScheme(str, Enum):
+    RSA = "RSA"
+    PAILLIER = "PAILLIER"
+
 class VoterRegistration(BaseModel):
     name: str = Field(..., min_length=2, max_length=255)
     date_of_birth: date
@@ -33,6 +37,28 @@ class AdminLogin(BaseModel):
     email: EmailStr
     password: str
 
+class OfficerLogin(BaseModel):
+    email: EmailStr
+    password: str
+
+class BoothKeyRegistration(BaseModel):
+    public_key_pem: str
+
+class BoothBallot(BaseModel):
+    idempotency_key: str = Field(..., min_length=8, max_length=64)
+    election_id: int
+    voter_id: int
+    candidate_id: int
+    encrypted_vote: str  # base64 ciphertext
+    vote_hash: str = Field(..., min_length=64, max_length=64)
+    key_fingerprint: str = Field(..., min_length=64, max_length=64)
+    cast_at: str  # ISO 8601 UTC, as recorded by the booth
+
+class BoothBatch(BaseModel):
+    batch_id: str = Field(..., min_length=8, max_length=64)
+    ballots: List[BoothBallot] = Field(..., min_length=1, max_length=1000)
+    signature: str  # hex Ed25519 signature by the booth key
+
 class CandidateCreate(BaseModel):
     name: str
     age: int = Field(..., ge=25)
@@ -45,6 +71,7 @@ class ElectionCreate(BaseModel):
     title: str
     start_time: datetime
     end_time: datetime
+    ballot_scheme: BallotScheme = BallotScheme.RSA
 
 class TokenData(BaseModel):
     user_id: int
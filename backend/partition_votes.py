@@ -0,0 +1,134 @@
+"""Partition maintenance for VOTE and VOTER_ELECTION_STATUS.
+
+Both tables are LIST-partitioned by electionId, one partition (p<id>) per
+election, so per-election queries only touch that election's rows.
+
+    python partition_votes.py migrate            # convert an existing database
+    python partition_votes.py add <election_id>  # create partitions for a new election
+    python partition_votes.py archive <election_id>
+    python partition_votes.py list
+    python partition_votes.py explain <election_id>
+
+migrate drops the foreign keys on both tables (partitioned InnoDB tables
+cannot have them), widens the primary keys to include electionId and
+repartitions using every existing election. It rebuilds both tables, so run
+it in a maintenance window, then reload database/triggers.sql (reference
+checks moved into before_vote_insert) and database/procedures.sql.
+
+archive moves a completed election's partitions into VOTE_ARCHIVE_<id> and
+VOTER_ELECTION_STATUS_ARCHIVE_<id> with EXCHANGE PARTITION, which does not
+copy rows. The archive tables can then be dumped and dropped.
+"""
+import argparse
+import sys
+
+import database as db
+from query_plans import check_partition_pruning
+
+PARTITIONED_TABLES = ("VOTE", "VOTER_ELECTION_STATUS")
+PRIMARY_KEYS = {
+    "VOTE": "voteId, electionId",
+    "VOTER_ELECTION_STATUS": "voterId, electionId",
+}
+
+
+def is_partitioned(cursor, table):
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+    """, (table,))
+    return cursor.fetchone()[0] > 0
+
+
+def foreign_keys(cursor, table):
+    cursor.execute("""
+        SELECT CONSTRAINT_NAME FROM information_schema.REFERENTIAL_CONSTRAINTS
+        WHERE CONSTRAINT_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (table,))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def migrate(conn):
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT electionId FROM ELECTION
+        UNION SELECT DISTINCT electionId FROM VOTE
+        UNION SELECT DISTINCT electionId FROM VOTER_ELECTION_STATUS
+    """)
+    election_ids = sorted({row[0] for row in cursor.fetchall()} | {0})
+    partitions = ", ".join(f"PARTITION p{i} VALUES IN ({i})" for i in election_ids)
+
+    for table in PARTITIONED_TABLES:
+        if is_partitioned(cursor, table):
+            print(f"{table} is already partitioned")
+            continue
+
+        drops = [f"DROP FOREIGN KEY {name}" for name in foreign_keys(cursor, table)]
+        cursor.execute(f"ALTER TABLE {table} " + ", ".join(
+            drops + ["DROP PRIMARY KEY", f"ADD PRIMARY KEY ({PRIMARY_KEYS[table]})"]
+        ))
+        print(f"{table}: dropped {len(drops)} foreign keys, primary key is now ({PRIMARY_KEYS[table]})")
+
+        cursor.execute(f"ALTER TABLE {table} PARTITION BY LIST (electionId) ({partitions})")
+        print(f"{table}: partitioned into {len(election_ids)} partitions")
+
+    cursor.close()
+    print("Migration complete. Reload triggers.sql and procedures.sql now.")
+
+
+def add(election_id):
+    db.call_procedure('AddElectionPartitions', (election_id,))
+    print(f"Partitions p{election_id} ready")
+
+
+def archive(election_id):
+    db.call_procedure('ArchiveElectionPartition', (election_id,))
+    print(f"Election {election_id} archived to "
+          + ", ".join(f"{t}_ARCHIVE_{election_id}" for t in PARTITIONED_TABLES))
+
+
+def list_partitions(conn):
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT TABLE_NAME, PARTITION_NAME, TABLE_ROWS, DATA_LENGTH, INDEX_LENGTH
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN (%s, %s)
+          AND PARTITION_NAME IS NOT NULL
+        ORDER BY TABLE_NAME, PARTITION_ORDINAL_POSITION
+    """, PARTITIONED_TABLES)
+    print(f"{'table':<24}{'partition':<12}{'~rows':>10}{'data KiB':>12}{'index KiB':>12}")
+    for table, partition, rows, data_length, index_length in cursor.fetchall():
+        print(f"{table:<24}{partition:<12}{rows:>10}{data_length / 1024:>12.0f}{index_length / 1024:>12.0f}")
+    cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage per-election partitions of VOTE")
+    parser.add_argument("step", choices=["migrate", "add", "archive", "list", "explain"])
+    parser.add_argument("election_id", type=int, nargs="?")
+    args = parser.parse_args()
+
+    if args.step in ("add", "archive", "explain") and args.election_id is None:
+        parser.error(f"{args.step} needs an election_id")
+
+    if args.step == "add":
+        add(args.election_id)
+    elif args.step == "archive":
+        archive(args.election_id)
+    else:
+        conn = db.connect_standalone()
+        try:
+            if args.step == "migrate":
+                migrate(conn)
+            elif args.step == "list":
+                list_partitions(conn)
+            else:
+                failures = check_partition_pruning(conn, args.election_id)
+                if failures:
+                    sys.exit(1)
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
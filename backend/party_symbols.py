@@ -0,0 +1,154 @@
+"""Party symbols served by content hash.
+
+PARTY.symbolHash is a stored SHA-256 of PARTY.symbol, so a symbol URL
+(/api/parties/symbols/<hash>) names exactly one image and can be cached by
+browsers and proxies forever; a new symbol gets a new hash and a new URL.
+The original is served byte for byte. Resized and re-encoded variants are
+produced with Pillow on first request and kept in an in-process LRU bounded
+by SYMBOL_CACHE_BYTES; a symbol Pillow cannot read has no variants.
+"""
+from collections import OrderedDict
+from io import BytesIO
+from typing import Optional, Tuple
+import os
+import re
+import threading
+
+from PIL import Image, UnidentifiedImageError
+
+import database as db
+
+SYMBOL_CACHE_BYTES = int(os.getenv("SYMBOL_CACHE_BYTES", str(32 * 1024 * 1024)))
+
+# Widths the frontend asks for; anything else would let clients fill the cache
+SYMBOL_SIZES = (32, 64, 128, 256)
+FORMATS = {"png": "image/png", "webp": "image/webp", "jpeg": "image/jpeg"}
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+_HASH = re.compile(r"^[0-9a-f]{64}$")
+
+# Leading bytes of the formats the sample data and admin uploads use
+_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+)
+
+
+class SymbolCache:
+    """LRU of encoded symbol variants keyed by (hash, size, format), bounded in bytes"""
+
+    def __init__(self, max_bytes: int = SYMBOL_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[tuple, Tuple[bytes, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[Tuple[bytes, str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: tuple, entry: Tuple[bytes, str]):
+        if len(entry[0]) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = entry
+            self.size += len(entry[0])
+            while self.size > self.max_bytes:
+                _, (content, _) = self._entries.popitem(last=False)
+                self.size -= len(content)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.size,
+                    "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses}
+
+
+def symbol_url(symbol_hash: Optional[str]) -> Optional[str]:
+    return f"/api/parties/symbols/{symbol_hash}" if symbol_hash else None
+
+
+def etag(symbol_hash: str, size: Optional[int], fmt: Optional[str]) -> str:
+    return f'"{symbol_hash}-{size or "orig"}-{fmt or "orig"}"'
+
+
+def is_symbol_hash(value: str) -> bool:
+    return bool(_HASH.match(value))
+
+
+def check_variant(size: Optional[int], fmt: Optional[str]) -> Optional[str]:
+    """Return an error message if the requested variant is not allowed"""
+    if size is not None and size not in SYMBOL_SIZES:
+        return f"size must be one of {', '.join(map(str, SYMBOL_SIZES))}"
+    if fmt is not None and fmt not in FORMATS:
+        return f"format must be one of {', '.join(FORMATS)}"
+    return None
+
+
+def _media_type(content: bytes) -> str:
+    if content[:4] == b"RIFF" and content[8:12] == b"WEBP":
+        return "image/webp"
+    for signature, media_type in _SIGNATURES:
+        if content.startswith(signature):
+            return media_type
+    return "application/octet-stream"
+
+
+def _encode(original: bytes, size: Optional[int], fmt: Optional[str]) -> Optional[Tuple[bytes, str]]:
+    """Encoded variant, or None if Pillow cannot read the original"""
+    if size is None and fmt is None:
+        return original, _media_type(original)
+
+    try:
+        image = Image.open(BytesIO(original))
+        fmt = fmt or ("jpeg" if image.format == "JPEG" else "png")
+        if size is not None:
+            image.thumbnail((size, size), Image.LANCZOS)
+        if fmt == "jpeg" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        buffer = BytesIO()
+        image.save(buffer, format=fmt.upper(), optimize=True)
+    except (UnidentifiedImageError, OSError):
+        # Not an image, or truncated; decoding fails lazily, so save() can raise too
+        return None
+    return buffer.getvalue(), FORMATS[fmt]
+
+
+class PartySymbols:
+    def __init__(self):
+        self.cache = SymbolCache()
+
+    def get(self, symbol_hash: str, size: Optional[int] = None,
+            fmt: Optional[str] = None) -> Optional[Tuple[bytes, str]]:
+        """(content, media type) of a symbol variant, or None if no party has this symbol
+        or the variant cannot be produced from it"""
+        key = (symbol_hash, size, fmt)
+        entry = self.cache.get(key)
+        if entry is not None:
+            return entry
+
+        row = db.execute_query(
+            "SELECT symbol FROM PARTY WHERE symbolHash = %s LIMIT 1",
+            (symbol_hash,), fetch_one=True, read_only=True
+        )
+        if not row or row['symbol'] is None:
+            return None
+        entry = _encode(bytes(row['symbol']), size, fmt)
+        if entry is not None:
+            self.cache.put(key, entry)
+        return entry
+
+
+party_symbols = PartySymbols()
@@ -0,0 +1,484 @@
+"""Seeded query-plan regression check.
+
+Usage:
+    python plan_regression.py [--voters 20000] [--seed 7] [--show]
+                              [--tolerance 0.5] [--update-baseline]
+
+Seeds a synthetic election with a fixed random seed (constituencies, parties,
+candidates, booths, voters, ballots, login history, results and demographic
+stats), refreshes index statistics and runs EXPLAIN ANALYZE (MySQL 8.0.18+)
+on every catalogued query: the query_plans.QUERIES mirrors of main.py,
+functions.sql and procedures.sql, OTHER_QUERIES below, and every query in
+complex_queries.sql. The seeded rows are deleted afterwards. Seeding commits,
+so run this against a development or CI database, not production.
+
+The catalogue covers every SELECT in main.py and the analytics snapshot
+loads behind the /api/admin/analytics reports. It leaves out INSERT and
+UPDATE statements, because EXPLAIN ANALYZE executes them; it also leaves
+out the RegisterVoter and CastVote procedure calls. Reads outside main.py
+that touch VOTE or VOTER_ELECTION_STATUS are in query_plans.QUERIES. Other
+module reads, such as voter_roll and booth_ingest, are not catalogued.
+
+A plan fails when
+  - it reads a table with a full table or index scan that returns more than
+    --scan-rows rows, unless FULL_SCAN_ALLOWED lists that table for the query
+    (reports that read a whole election partition or every voter by design);
+  - FULL_SCAN_ALLOWED lists a table the query did not scan, so the list only
+    holds scans a run has actually observed;
+  - the rows it examines, or the optimizer's estimate of them, grow more than
+    --tolerance over the baseline in query_plan_baseline.json, which
+    --update-baseline writes from the current run. A missing baseline, or a
+    query missing from it, is a failure too: record one with
+    --update-baseline and commit it;
+  - a query over VOTE or VOTER_ELECTION_STATUS is not pruned to the seeded
+    election's partition (query_plans.check_partition_pruning).
+The exit status is non-zero on any failure.
+"""
+from datetime import date, datetime, timedelta
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import uuid
+
+import database as db
+from benchmark_election_report import create_election, drop_election
+from query_plans import QUERIES, check_partition_pruning, complex_queries, sample_parameters
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "query_plan_baseline.json")
+
+CONSTITUENCIES = 20
+PARTIES = 5
+VOTE_SHARE = 0.7
+LOGINS_PER_VOTER = 2
+SCAN_ROWS = 1000
+MIN_ROWS_DELTA = 100
+
+# Queries in main.py, functions.sql and procedures.sql that do not read the
+# partitioned tables, or read them without an election filter
+OTHER_QUERIES = [
+    ("main.get_all_parties", "SELECT partyId, partyName, leader, symbolHash FROM PARTY ORDER BY partyName"),
+    ("main.get_all_constituencies", """
+        SELECT constituencyId, name, district, state FROM CONSTITUENCY ORDER BY state, district, name
+    """),
+    ("main.get_party_symbol", "SELECT symbol FROM PARTY WHERE symbolHash = %(symbol_hash)s LIMIT 1"),
+    ("main.get_all_elections", """
+        SELECT electionId, title, startTime, endTime, completionStatus FROM ELECTION ORDER BY startTime DESC
+    """),
+    ("main.login_voter", """
+        SELECT voterId, passwordHash, hasVoted FROM VOTER WHERE voterIdNumber = %(voter_number)s
+    """),
+    ("main.verify_face", "SELECT faceEncodingData FROM VOTER WHERE voterId = %(voter)s"),
+    ("main.cast_vote.paillier_candidates", """
+        SELECT c.candidateId
+        FROM CANDIDATE c
+        JOIN VOTER v ON v.constituencyId = c.constituencyId
+        WHERE c.electionId = %(election)s AND v.voterId = %(voter)s
+        ORDER BY c.candidateId
+    """),
+    ("main.cast_vote.election", """
+        SELECT publicKeyPem, ballotScheme FROM ELECTION WHERE electionId = %(election)s
+    """),
+    ("main.get_voter_profile", """
+        SELECT v.*, c.name as constituency_name, c.district, c.state
+        FROM VOTER v
+        JOIN CONSTITUENCY c ON v.constituencyId = c.constituencyId
+        WHERE v.voterId = %(voter)s
+    """),
+    ("main.get_active_elections", """
+        SELECT electionId, title, startTime, endTime, completionStatus
+        FROM ELECTION
+        WHERE NOW() BETWEEN startTime AND endTime AND completionStatus = 0
+        ORDER BY startTime ASC
+    """),
+    ("main.get_candidates", """
+        SELECT c.*, p.partyName, p.leader, p.symbolHash
+        FROM CANDIDATE c
+        JOIN PARTY p ON c.partyId = p.partyId
+        WHERE c.electionId = %(election)s AND c.constituencyId = %(constituency)s
+    """),
+    ("main.officer_login", "SELECT officerId, passwordHash FROM BOOTHOFFICER WHERE email = %(email)s"),
+    ("main.officer_login.booths", """
+        SELECT boothId, location, constituencyId FROM BOOTH WHERE officerId = %(officer)s
+    """),
+    ("main.get_booth_elections.booth", """
+        SELECT constituencyId, officerId FROM BOOTH WHERE boothId = %(booth)s
+    """),
+    ("main.get_booth_elections.elections", """
+        SELECT electionId, title, startTime, endTime, ballotScheme, publicKeyPem
+        FROM ELECTION
+        WHERE endTime > NOW() AND completionStatus = 0
+        ORDER BY startTime ASC
+    """),
+    ("main.get_booth_elections.candidates", """
+        SELECT c.candidateId, c.name, p.partyName
+        FROM CANDIDATE c
+        JOIN PARTY p ON c.partyId = p.partyId
+        WHERE c.electionId = %(election)s AND c.constituencyId = %(constituency)s
+        ORDER BY c.candidateId
+    """),
+    ("main.admin_login", "SELECT adminId, passwordHash, role FROM ADMIN WHERE email = %(email)s"),
+    ("main.register_booth_key", "SELECT boothId FROM BOOTH WHERE boothId = %(booth)s"),
+    ("main.calculate_all_results.constituencies", """
+        SELECT DISTINCT constituencyId FROM CANDIDATE WHERE electionId = %(election)s
+    """),
+    ("main.get_results", """
+        SELECT e.title, co.name, c.name, p.partyName, r.totalVotes, r.votePercentage,
+            RANK() OVER (PARTITION BY e.electionId, co.constituencyId ORDER BY r.totalVotes DESC)
+        FROM ELECTION e
+        JOIN RESULT r ON e.electionId = r.electionId
+        JOIN CANDIDATE c ON r.candidateId = c.candidateId
+        JOIN PARTY p ON c.partyId = p.partyId
+        JOIN CONSTITUENCY co ON r.constituencyId = co.constituencyId
+        WHERE e.electionId = %(election)s
+        ORDER BY co.constituencyId, r.totalVotes DESC
+    """),
+    ("main.get_demographic_stats", """
+        SELECT ds.ageGroup, ds.gender, ds.totalVoters, ds.votedCount, ds.turnoutPercentage
+        FROM DEMOGRAPHIC_STATS ds
+        WHERE ds.electionId = %(election)s AND ds.constituencyId = %(constituency)s
+        ORDER BY ds.ageGroup, ds.gender
+    """),
+    ("main.get_suspicious_activities", """
+        SELECT al.userId, al.userType, v.voterIdNumber, v.name, COUNT(*),
+            COUNT(CASE WHEN al.actionStatus = 'FAILED' THEN 1 END) as failed_attempts,
+            COUNT(DISTINCT al.ipAddress) as different_ips,
+            GROUP_CONCAT(DISTINCT al.ipAddress), MIN(al.timestamp), MAX(al.timestamp)
+        FROM AUDIT_LOG al
+        LEFT JOIN VOTER v ON al.userId = v.voterId AND al.userType = 'VOTER'
+        WHERE al.actionType IN ('LOGIN', 'FACE_AUTH')
+        AND al.timestamp >= DATE_SUB(NOW(), INTERVAL 24 HOUR)
+        GROUP BY al.userId, al.userType, v.voterIdNumber, v.name
+        HAVING failed_attempts >= 3 OR different_ips > 2
+        ORDER BY failed_attempts DESC, different_ips DESC
+    """),
+    ("main.get_audit_logs", """
+        SELECT v.voterIdNumber, v.name,
+            COUNT(CASE WHEN al.actionType = 'LOGIN' AND al.actionStatus = 'FAILED' THEN 1 END) as failed_logins,
+            MIN(al.timestamp), MAX(al.timestamp)
+        FROM VOTER v
+        LEFT JOIN AUDIT_LOG al ON v.voterId = al.userId AND al.userType = 'VOTER'
+        GROUP BY v.voterId, v.voterIdNumber, v.name
+        HAVING COUNT(al.logId) > 0
+        ORDER BY failed_logins DESC
+        LIMIT %(limit)s
+    """),
+    ("analytics.Snapshot._load_elections", """
+        SELECT electionId, title FROM ELECTION
+        WHERE completionStatus = 0 OR endTime >= NOW() - INTERVAL %(days)s DAY
+    """),
+    # As on the first refresh, which reads every voter
+    ("analytics.Snapshot._load_voters", """
+        SELECT voterId, constituencyId, FIELD(gender, 'M', 'F', 'O') AS gender, dateOfBirth
+        FROM VOTER WHERE voterId > 0
+    """),
+    ("analytics.Snapshot._load_dimensions.candidates", """
+        SELECT candidateId, name, electionId, constituencyId, partyId FROM CANDIDATE
+        WHERE electionId IN (%(election)s) ORDER BY candidateId
+    """),
+    ("analytics.Snapshot._load_dimensions.parties", "SELECT partyId, partyName FROM PARTY"),
+    ("analytics.Snapshot._load_dimensions.constituencies", "SELECT constituencyId, name FROM CONSTITUENCY"),
+    ("analytics.Snapshot._load_dimensions.booths", """
+        SELECT b.boothId, b.location, b.constituencyId, bo.name AS officer_name
+        FROM BOOTH b
+        LEFT JOIN BOOTHOFFICER bo ON b.officerId = bo.officerId
+        ORDER BY b.boothId
+    """),
+    ("analytics.Snapshot._load_dimensions.results", """
+        SELECT electionId, candidateId, totalVotes FROM RESULT WHERE electionId IN (%(election)s)
+    """),
+    # Receipts issued before partitioning carry no election id
+    ("main.decrypt_vote_admin.legacy", """
+        SELECT encryptedVote, e.privateKeyPem, e.ballotScheme
+        FROM VOTE v JOIN ELECTION e ON v.electionId = e.electionId
+        WHERE v.voteId = %(vote)s
+    """),
+    ("functions.CalculateTurnout.registered", """
+        SELECT COUNT(DISTINCT v.voterId) FROM VOTER v WHERE v.constituencyId = %(constituency)s
+    """),
+    ("functions.GetAuthSuccessRate", """
+        SELECT COUNT(*), SUM(actionStatus = 'SUCCESS')
+        FROM AUDIT_LOG
+        WHERE userId = %(voter)s AND userType = 'VOTER' AND actionType IN ('LOGIN', 'FACE_AUTH')
+    """),
+    ("functions.VerifyVoteHash", "SELECT voteHash FROM VOTE WHERE voteId = %(vote)s"),
+    ("procedures.GetVoterAuthHistory", """
+        SELECT logId, actionType, actionStatus, actionDetails, ipAddress, userAgent, timestamp
+        FROM AUDIT_LOG
+        WHERE userId = %(voter)s AND userType = 'VOTER'
+        ORDER BY timestamp DESC
+        LIMIT %(limit)s
+    """),
+]
+
+# Full scans that are the point of the query: whole-election reports read the
+# election's partition, and the all-voter or all-result reports read everything
+FULL_SCAN_ALLOWED = {
+    "main.get_voting_patterns": {"VOTE"},
+    "bulletin_board.sync.count": {"VOTE"},
+    "bulletin_board.sync.ids": {"VOTE"},
+    "export.ballots": {"VOTE"},
+    "integrity_audit.status_without_ballot": {"VOTER_ELECTION_STATUS"},
+    "main.get_audit_logs": {"VOTER"},
+    "analytics.Snapshot._load_voters": {"VOTER"},
+    "complex_queries.Q1": {"RESULT"},
+    "complex_queries.Q2": {"VOTER"},
+    "complex_queries.Q3": {"VOTE"},
+    "complex_queries.Q4": {"DEMOGRAPHIC_STATS"},
+    "complex_queries.Q6": {"VOTE"},
+    "complex_queries.Q7": {"RESULT"},
+    "complex_queries.Q10": {"VOTE"},
+}
+
+_KEYWORDS = {"ON", "WHERE", "GROUP", "ORDER", "LIMIT", "LEFT", "RIGHT", "INNER", "OUTER", "JOIN",
+             "CROSS", "USING", "HAVING", "UNION", "SET", "AND", "OR"}
+_TABLE_REF = re.compile(r"\b(?:FROM|JOIN)\s+([A-Za-z_]\w*)(?:\s+(?:AS\s+)?([A-Za-z_]\w*))?", re.IGNORECASE)
+_ACCESS = re.compile(r"^(?P<kind>[A-Za-z -]+?(?:scan|lookup)(?: \([^)]*\))?) on (?P<alias>\S+)")
+_ESTIMATE = re.compile(r"\(cost=[\d.e+]+(?:\.\.[\d.e+]+)? rows=([\d.e+]+)\)")
+_ACTUAL = re.compile(r"\(actual time=[\d.e+]+\.\.[\d.e+]+ rows=([\d.e+]+) loops=(\d+)\)")
+FULL_SCANS = {"Table scan", "Index scan", "Covering index scan"}
+
+
+def table_aliases(statement):
+    """alias -> TABLE for every table reference in a statement"""
+    aliases = {}
+    for table, alias in _TABLE_REF.findall(statement):
+        aliases[table] = table.upper()
+        if alias and alias.upper() not in _KEYWORDS:
+            aliases[alias] = table.upper()
+    return aliases
+
+
+def access_nodes(plan_text):
+    """(kind, alias, estimated rows, examined rows) for each table access in an EXPLAIN ANALYZE tree"""
+    nodes = []
+    for line in plan_text.splitlines():
+        op = line.strip()
+        if not op.startswith("->"):
+            continue
+        match = _ACCESS.match(op[2:].strip())
+        if not match:
+            continue
+        estimate, actual = _ESTIMATE.search(op), _ACTUAL.search(op)
+        loops = int(actual.group(2)) if actual else 0
+        nodes.append((
+            match.group("kind"), match.group("alias"),
+            float(estimate.group(1)) * loops if estimate else 0.0,
+            float(actual.group(1)) * loops if actual else 0.0,
+        ))
+    return nodes
+
+
+def analyze(cursor, name, statement, params, scan_rows):
+    """EXPLAIN ANALYZE one query; returns (metrics, list of problems, plan text)"""
+    cursor.execute("EXPLAIN ANALYZE " + statement, params if "%(" in statement else None)
+    plan = "\n".join(row[0] for row in cursor.fetchall())
+    aliases = table_aliases(statement)
+
+    problems = []
+    scanned = set()
+    examined = estimated = 0.0
+    for kind, alias, est, rows in access_nodes(plan):
+        examined += rows
+        estimated += est
+        table = aliases.get(alias)
+        if kind in FULL_SCANS and table and rows > scan_rows:
+            scanned.add(table)
+            if table not in FULL_SCAN_ALLOWED.get(name, ()):
+                problems.append(f"{kind.lower()} on {table} read {int(rows)} rows")
+    for table in sorted(set(FULL_SCAN_ALLOWED.get(name, ())) - scanned):
+        problems.append(f"FULL_SCAN_ALLOWED lists {table} but no full scan of it was seen; remove it")
+    return {"examined": int(examined), "estimated": int(estimated)}, problems, plan
+
+
+def regressions(name, metrics, baseline, tolerance):
+    problems = []
+    base = baseline.get(name)
+    if base is None:
+        return [f"not in {os.path.basename(BASELINE_PATH)}; re-record with --update-baseline"]
+    for metric in ("examined", "estimated"):
+        now, before = metrics[metric], base[metric]
+        if now > before * (1 + tolerance) and now - before > MIN_ROWS_DELTA:
+            problems.append(f"{metric} rows {before} -> {now}")
+    return problems
+
+
+def seed(conn, cursor, election_id, fingerprint, tag, voters, rng, created):
+    cursor.executemany(
+        "INSERT INTO CONSTITUENCY (name, district, state) VALUES (%s, 'Plans', 'Plans')",
+        [(f"{tag}-c{i}",) for i in range(CONSTITUENCIES)]
+    )
+    cursor.execute("SELECT constituencyId FROM CONSTITUENCY WHERE name LIKE %s ORDER BY constituencyId",
+                   (f"{tag}-c%",))
+    constituencies = created["constituencies"] = [row[0] for row in cursor.fetchall()]
+
+    cursor.executemany(
+        "INSERT INTO PARTY (partyName, symbol, leader) VALUES (%s, %s, 'Plans')",
+        [(f"{tag}-p{i}", rng.randbytes(64)) for i in range(PARTIES)]
+    )
+    cursor.execute("SELECT partyId FROM PARTY WHERE partyName LIKE %s", (f"{tag}-p%",))
+    created["parties"] = [row[0] for row in cursor.fetchall()]
+
+    cursor.executemany(
+        "INSERT INTO CANDIDATE (name, age, partyId, electionId, constituencyId) VALUES (%s, 40, %s, %s, %s)",
+        [(f"cand-{c}-{p}", p, election_id, c) for c in constituencies for p in created["parties"]]
+    )
+    cursor.execute("SELECT candidateId, constituencyId FROM CANDIDATE WHERE electionId = %s", (election_id,))
+    candidates = {}
+    for candidate_id, constituency_id in cursor.fetchall():
+        candidates.setdefault(constituency_id, []).append(candidate_id)
+
+    cursor.executemany("INSERT INTO BOOTH (location, constituencyId) VALUES (%s, %s)",
+                       [(f"{tag}-booth", c) for c in constituencies])
+
+    rows = [(f"voter-{i}", date(1940, 1, 1) + timedelta(days=rng.randrange(25000)),
+             rng.choices("MFO", weights=(48, 48, 4))[0], "Plans address",
+             rng.choice(constituencies), f"{tag}-{i}", "")
+            for i in range(voters)]
+    for start in range(0, len(rows), 1000):
+        cursor.executemany("""
+            INSERT INTO VOTER (name, dateOfBirth, gender, address, constituencyId, voterIdNumber, passwordHash)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, rows[start:start + 1000])
+    cursor.execute("SELECT voterId, constituencyId, dateOfBirth FROM VOTER WHERE voterIdNumber LIKE %s",
+                   (f"{tag}-%",))
+    seeded_voters = cursor.fetchall()
+    created["voters"] = [row[0] for row in seeded_voters]
+    conn.commit()
+
+    adult_born = date.today().replace(year=date.today().year - 18)
+    ballots, logins = [], []
+    now = datetime.now()
+    for voter_id, constituency_id, born in seeded_voters:
+        for _ in range(LOGINS_PER_VOTER):
+            logins.append((voter_id, rng.choice(("LOGIN", "FACE_AUTH")),
+                           "FAILED" if rng.random() < 0.1 else "SUCCESS",
+                           f"10.{rng.randrange(256)}.{rng.randrange(256)}.1",
+                           now - timedelta(seconds=rng.randrange(2 * 86400))))
+        if born <= adult_born and rng.random() < VOTE_SHARE:
+            ciphertext = rng.randbytes(256)
+            ballots.append((voter_id, election_id, rng.choice(candidates[constituency_id]), ciphertext,
+                            hashlib.sha256(ciphertext).digest(), fingerprint))
+    for start in range(0, len(logins), 1000):
+        cursor.executemany("""
+            INSERT INTO AUDIT_LOG (userId, userType, actionType, actionStatus, ipAddress, timestamp)
+            VALUES (%s, 'VOTER', %s, %s, %s, %s)
+        """, logins[start:start + 1000])
+    for start in range(0, len(ballots), 1000):
+        chunk = ballots[start:start + 1000]
+        cursor.executemany("""
+            INSERT INTO VOTE (voterId, electionId, candidateId, encryptedVote, voteHash, keyFingerprint)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, chunk)
+        cursor.executemany(
+            "INSERT INTO VOTER_ELECTION_STATUS (voterId, electionId, hasVoted) VALUES (%s, %s, TRUE)",
+            [(row[0], election_id) for row in chunk]
+        )
+    conn.commit()
+
+    for constituency_id in constituencies:
+        cursor.callproc('CalculateResults', (election_id, constituency_id))
+        cursor.callproc('UpdateDemographicStats', (election_id, constituency_id))
+    conn.commit()
+
+    cursor.execute("ANALYZE TABLE VOTE, VOTER_ELECTION_STATUS, VOTER, AUDIT_LOG, CANDIDATE, RESULT, "
+                   "DEMOGRAPHIC_STATS, BOOTH, CONSTITUENCY, PARTY")
+    cursor.fetchall()
+    return len(ballots)
+
+
+def cleanup(conn, cursor, election_id, created):
+    conn.rollback()
+    voters = created.get("voters", [])
+    for start in range(0, len(voters), 1000):
+        chunk = voters[start:start + 1000]
+        cursor.execute(f"DELETE FROM AUDIT_LOG WHERE userType = 'VOTER' AND userId IN "
+                       f"({', '.join(['%s'] * len(chunk))})", chunk)
+    # Dropping the election cascades to its candidates, results and demographic stats
+    drop_election(conn, cursor, election_id)
+    for table, column, key in (("BOOTH", "constituencyId", "constituencies"),
+                               ("VOTER", "constituencyId", "constituencies"),
+                               ("PARTY", "partyId", "parties"),
+                               ("CONSTITUENCY", "constituencyId", "constituencies")):
+        ids = created.get(key, [])
+        if ids:
+            cursor.execute(f"DELETE FROM {table} WHERE {column} IN ({', '.join(['%s'] * len(ids))})", ids)
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seeded EXPLAIN ANALYZE regression check")
+    parser.add_argument("--voters", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--scan-rows", type=int, default=SCAN_ROWS,
+                        help="rows a full scan may return before it fails")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="allowed growth of examined/estimated rows over the baseline")
+    parser.add_argument("--show", action="store_true", help="print every plan")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    # None skips the comparison: recording a new baseline, or one taken with other settings
+    baseline = None
+    if not args.update_baseline and not os.path.exists(BASELINE_PATH):
+        raise SystemExit(f"No baseline at {BASELINE_PATH}; run once with --update-baseline and commit it")
+    if os.path.exists(BASELINE_PATH) and not args.update_baseline:
+        with open(BASELINE_PATH) as f:
+            stored = json.load(f)
+        if (stored["voters"], stored["seed"]) == (args.voters, args.seed):
+            baseline = stored["queries"]
+        else:
+            print(f"Baseline was recorded with --voters {stored['voters']} --seed {stored['seed']}; "
+                  f"skipping regression comparison")
+
+    rng = random.Random(args.seed)
+    tag = f"plans-{uuid.uuid4().hex[:8]}"
+    conn = db.connect_standalone()
+    cursor = conn.cursor()
+    election_id, fingerprint = create_election(conn, cursor, tag)
+    created = {}
+    results, failures = {}, []
+    try:
+        ballots = seed(conn, cursor, election_id, fingerprint, tag, args.voters, rng, created)
+        print(f"Seeded election {election_id}: {args.voters} voters, {ballots} ballots")
+
+        pruning = check_partition_pruning(conn, election_id)
+        failures += [(name, f"{row['table']} reads partitions {row['partitions']}")
+                     for name, rows in pruning for row in rows]
+
+        dict_cursor = conn.cursor(dictionary=True)
+        params = sample_parameters(dict_cursor, election_id)
+        dict_cursor.close()
+        cursor.execute("SET @electionId = %s", (election_id,))
+        for name, statement in QUERIES + OTHER_QUERIES + complex_queries(partitioned_only=False):
+            metrics, problems, plan = analyze(cursor, name, statement, params, args.scan_rows)
+            if baseline is not None:
+                problems += regressions(name, metrics, baseline, args.tolerance)
+            results[name] = metrics
+            print(f"  {'FAIL' if problems else 'ok  '} {name:<48} "
+                  f"examined={metrics['examined']:<8} estimated={metrics['estimated']}")
+            if args.show:
+                print("\n".join("      " + line for line in plan.splitlines()))
+            failures += [(name, problem) for problem in problems]
+    finally:
+        cleanup(conn, cursor, election_id, created)
+        cursor.close()
+        conn.close()
+
+    if args.update_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump({"voters": args.voters, "seed": args.seed, "queries": results}, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {BASELINE_PATH}")
+
+    for name, problem in failures:
+        print(f"FAIL: {name}: {problem}")
+    if failures:
+        sys.exit(1)
+    print("OK: no unexpected full scans or row regressions")
+
+
+if __name__ == "__main__":
+    main()
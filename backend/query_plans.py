@@ -0,0 +1,237 @@
+"""EXPLAIN-based check that queries over VOTE prune to one election partition.
+
+Usage:
+    python query_plans.py <election_id> [--show]
+
+VOTE and VOTER_ELECTION_STATUS are LIST-partitioned by electionId. Every
+query in QUERIES below, and every query in database/complex_queries.sql that
+touches either table, is EXPLAINed for the given election; a plan passes when
+each partitioned table in it reads only partition p<election_id>. Statements
+inside stored functions and procedures cannot be EXPLAINed directly, so their
+bodies are mirrored here. The exit status is non-zero if any plan scans more
+than one partition.
+"""
+import argparse
+import os
+import re
+import sys
+
+import database as db
+
+COMPLEX_QUERIES_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "database", "complex_queries.sql"
+)
+
+# (name, statement); parameters are bound by name from sample_parameters()
+QUERIES = [
+    ("main.verify_vote_hash", """
+        SELECT voteHash = UNHEX(%(hash)s) AS valid FROM VOTE
+        WHERE voteId = %(vote)s AND electionId = %(election)s
+    """),
+    ("main.decrypt_vote_admin", """
+        SELECT encryptedVote, e.privateKeyPem, e.ballotScheme
+        FROM VOTE v JOIN ELECTION e ON v.electionId = e.electionId
+        WHERE v.voteId = %(vote)s AND v.electionId = %(election)s
+    """),
+    ("main.cast_vote.already_voted", """
+        SELECT hasVoted FROM VOTER_ELECTION_STATUS
+        WHERE voterId = %(voter)s AND electionId = %(election)s
+    """),
+    ("main.get_election_report.last_vote", """
+        SELECT MAX(voteId) AS lastVote FROM VOTE WHERE electionId = %(election)s
+    """),
+    ("main.get_voting_patterns", """
+        SELECT DATE(v.timestamp), HOUR(v.timestamp), COUNT(*), COUNT(DISTINCT v.voterId)
+        FROM VOTE v
+        WHERE v.electionId = %(election)s
+        GROUP BY DATE(v.timestamp), HOUR(v.timestamp)
+    """),
+    ("functions.CalculateTurnout", """
+        SELECT COUNT(DISTINCT vt.voterId)
+        FROM VOTE vt
+        JOIN CANDIDATE c ON vt.candidateId = c.candidateId
+        WHERE c.constituencyId = %(constituency)s AND vt.electionId = %(election)s
+    """),
+    ("functions.IsVoterEligible", """
+        SELECT COUNT(*) > 0 FROM VOTE
+        WHERE voterId = %(voter)s AND electionId = %(election)s
+    """),
+    ("functions.GetTotalVotes", """
+        SELECT COUNT(*) FROM VOTE WHERE electionId = %(election)s
+    """),
+    ("procedures.CalculateResults", """
+        SELECT v.electionId, c.constituencyId, v.candidateId, COUNT(*),
+            ROUND((COUNT(*) * 100.0 / (
+                SELECT COUNT(*) FROM VOTE v2
+                WHERE v2.electionId = %(election)s
+                AND v2.candidateId IN (
+                    SELECT candidateId FROM CANDIDATE WHERE constituencyId = %(constituency)s
+                )
+            )), 2)
+        FROM VOTE v
+        JOIN CANDIDATE c ON v.candidateId = c.candidateId
+        WHERE v.electionId = %(election)s AND c.constituencyId = %(constituency)s
+        GROUP BY v.electionId, c.constituencyId, v.candidateId
+    """),
+    ("procedures.UpdateDemographicStats", """
+        SELECT
+            CASE
+                WHEN TIMESTAMPDIFF(YEAR, v.dateOfBirth, CURDATE()) < 25 THEN '<25'
+                WHEN TIMESTAMPDIFF(YEAR, v.dateOfBirth, CURDATE()) BETWEEN 25 AND 35 THEN '26-35'
+                WHEN TIMESTAMPDIFF(YEAR, v.dateOfBirth, CURDATE()) BETWEEN 36 AND 50 THEN '36-50'
+                ELSE '>50'
+            END AS ageGroup,
+            v.gender, COUNT(*), SUM(CASE WHEN ve.hasVoted = TRUE THEN 1 ELSE 0 END)
+        FROM VOTER v
+        LEFT JOIN VOTER_ELECTION_STATUS ve
+            ON v.voterId = ve.voterId AND ve.electionId = %(election)s
+        WHERE v.constituencyId = %(constituency)s
+        GROUP BY ageGroup, v.gender
+    """),
+    ("procedures.GenerateElectionReport", """
+        SELECT COUNT(*) FROM VOTE WHERE electionId = %(election)s
+    """),
+    ("bulletin_board.sync", """
+        SELECT voteId, voteHash FROM VOTE
+        WHERE electionId = %(election)s AND voteId > %(vote)s ORDER BY voteId
+    """),
+    ("bulletin_board.sync.count", "SELECT COUNT(*) AS n FROM VOTE WHERE electionId = %(election)s"),
+    ("bulletin_board.sync.ids", "SELECT voteId FROM VOTE WHERE electionId = %(election)s"),
+    ("bulletin_board.sync.missing", """
+        SELECT voteId, voteHash FROM VOTE
+        WHERE electionId = %(election)s AND voteId IN (%(vote)s) ORDER BY voteId
+    """),
+    ("homomorphic._accumulate_range", """
+        SELECT vr.constituencyId, v.encryptedVote
+        FROM VOTE v
+        JOIN VOTER vr ON vr.voterId = v.voterId
+        WHERE v.electionId = %(election)s AND v.voteId BETWEEN %(vote)s AND %(vote)s + 20000
+    """),
+    ("analytics.Snapshot._load_votes", """
+        SELECT voteId, voterId, candidateId FROM VOTE
+        WHERE electionId = %(election)s AND voteId > %(vote)s
+    """),
+    ("export.turnout", """
+        SELECT co.constituencyId, COUNT(v.voterId), COUNT(s.voterId)
+        FROM CONSTITUENCY co
+        LEFT JOIN VOTER v ON v.constituencyId = co.constituencyId
+        LEFT JOIN VOTER_ELECTION_STATUS s
+            ON s.voterId = v.voterId AND s.electionId = %(election)s AND s.hasVoted = TRUE
+        GROUP BY co.constituencyId
+    """),
+    ("export.ballots", """
+        SELECT voteId, HEX(voteHash), LENGTH(encryptedVote), timestamp
+        FROM VOTE WHERE electionId = %(election)s ORDER BY voteId
+    """),
+    ("integrity_audit.audit_range", """
+        SELECT v.voteId, v.encryptedVote, v.voteHash, v.keyFingerprint, s.hasVoted
+        FROM VOTE v
+        LEFT JOIN VOTER_ELECTION_STATUS s
+            ON s.voterId = v.voterId AND s.electionId = v.electionId
+        WHERE v.electionId = %(election)s AND v.voteId BETWEEN %(vote)s AND %(vote)s + 20000
+    """),
+    ("integrity_audit.status_without_ballot", """
+        SELECT s.voterId
+        FROM VOTER_ELECTION_STATUS s
+        LEFT JOIN VOTE v ON v.voterId = s.voterId AND v.electionId = s.electionId
+        WHERE s.electionId = %(election)s AND s.hasVoted = TRUE AND v.voteId IS NULL
+    """),
+]
+
+
+def complex_queries(path=COMPLEX_QUERIES_PATH, partitioned_only=True):
+    """(name, statement) for each query in complex_queries.sql that reads VOTE (or every query)"""
+    with open(path) as f:
+        text = f.read()
+    queries = []
+    for block in re.split(r"^-- (?=Query \d+:)", text, flags=re.MULTILINE)[1:]:
+        title, _, body = block.partition("\n")
+        if partitioned_only and not re.search(r"\b(VOTE|VOTER_ELECTION_STATUS)\b", body):
+            continue
+        statement = body.strip().rstrip(";")
+        number = title.split(":")[0].replace("Query ", "")
+        queries.append((f"complex_queries.Q{number}", statement))
+    return queries
+
+
+def sample_parameters(cursor, election_id):
+    cursor.execute("""
+        SELECT v.voteId, v.voterId, LOWER(HEX(v.voteHash)) AS voteHash, vr.constituencyId,
+               vr.voterIdNumber
+        FROM VOTE v JOIN VOTER vr ON vr.voterId = v.voterId
+        WHERE v.electionId = %s LIMIT 1
+    """, (election_id,))
+    row = cursor.fetchone()
+    if not row:
+        # Plans do not depend on data for pruning; any ids will do
+        row = {"voteId": 1, "voterId": 1, "voteHash": "00" * 32, "constituencyId": 1,
+               "voterIdNumber": ""}
+    return {
+        "election": election_id,
+        "vote": row["voteId"],
+        "voter": row["voterId"],
+        "voter_number": row["voterIdNumber"],
+        "hash": row["voteHash"],
+        "constituency": row["constituencyId"],
+        "limit": 100,
+        # Lookups by key; the plan does not depend on a row existing
+        "email": "plans@example.invalid",
+        "symbol_hash": "0" * 64,
+        "booth": 1,
+        "officer": 1,
+        "days": 30,
+    }
+
+
+def explain(cursor, statement, params):
+    cursor.execute("EXPLAIN " + statement, params)
+    return cursor.fetchall()
+
+
+def check_partition_pruning(conn, election_id, show=False):
+    """EXPLAIN every catalogued query; returns a list of (name, offending plan rows)"""
+    expected = f"p{election_id}"
+    cursor = conn.cursor(dictionary=True)
+    params = sample_parameters(cursor, election_id)
+    cursor.execute("SET @electionId = %s", (election_id,))
+
+    failures = []
+    for name, statement in QUERIES + complex_queries():
+        # complex_queries.sql uses the @electionId session variable, not placeholders
+        plan = explain(cursor, statement, params if "%(" in statement else None)
+        bad = [row for row in plan
+               if row.get("partitions") is not None and row["partitions"] != expected]
+        if show:
+            print(f"{name}:")
+            for row in plan:
+                print(f"    {row['table']:<24} partitions={row.get('partitions')} "
+                      f"type={row['type']} key={row['key']} rows={row['rows']}")
+        print(f"  {'FAIL' if bad else 'ok  '} {name}")
+        if bad:
+            failures.append((name, bad))
+    cursor.close()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify partition pruning of queries over VOTE")
+    parser.add_argument("election_id", type=int)
+    parser.add_argument("--show", action="store_true", help="print every plan row")
+    args = parser.parse_args()
+
+    conn = db.connect_standalone()
+    try:
+        failures = check_partition_pruning(conn, args.election_id, show=args.show)
+    finally:
+        conn.close()
+
+    for name, rows in failures:
+        for row in rows:
+            print(f"FAIL: {name} reads {row['table']} partitions {row['partitions']}")
+    if failures:
+        sys.exit(1)
+    print("OK: every query prunes to a single election partition")
+
+
+if __name__ == "__main__":
+    main()
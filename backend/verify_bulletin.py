@@ -0,0 +1,119 @@
+"""Offline bulk verification of a bulletin board snapshot.
+
+Usage:
+    python verify_bulletin.py <entries.bin> <root.json> <public_key.pem> [--receipts FILE]
+
+Download the three inputs from
+    GET /api/bulletin/{election_id}/entries
+    GET /api/bulletin/{election_id}/root
+    GET /api/bulletin/public-key
+
+The script checks the root signature, rebuilds the Merkle root from the first
+tree_size entries and compares it, then optionally checks that every receipt
+in FILE (one "vote_id,vote_hash_hex" per line) is on the board. It is
+deliberately standalone: no database or server access is needed.
+"""
+import argparse
+import hashlib
+import json
+import sys
+
+from cryptography.hazmat.primitives import serialization
+
+ENTRY_SIZE = 40
+
+
+def leaf_hash(vote_hash: bytes) -> bytes:
+    return hashlib.sha256(b"\x00" + vote_hash).digest()
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+def merkle_root(leaves) -> bytes:
+    """Streaming RFC 6962 root using a stack of complete subtrees"""
+    stack = []  # (height, hash)
+    count = 0
+    for leaf in leaves:
+        node, height = leaf, 0
+        while stack and stack[-1][0] == height:
+            node = node_hash(stack.pop()[1], node)
+            height += 1
+        stack.append((height, node))
+        count += 1
+
+    if count == 0:
+        return hashlib.sha256(b"").digest()
+
+    # Fold incomplete right edge: smaller subtrees are right children
+    node = stack.pop()[1]
+    while stack:
+        node = node_hash(stack.pop()[1], node)
+    return node
+
+
+def read_entries(path, limit):
+    with open(path, 'rb') as f:
+        for _ in range(limit):
+            entry = f.read(ENTRY_SIZE)
+            if len(entry) < ENTRY_SIZE:
+                raise SystemExit("Entries file is shorter than the signed tree size")
+            yield int.from_bytes(entry[:8], 'big'), entry[8:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify a bulletin board snapshot offline")
+    parser.add_argument("entries")
+    parser.add_argument("root")
+    parser.add_argument("public_key")
+    parser.add_argument("--receipts")
+    args = parser.parse_args()
+
+    with open(args.root) as f:
+        record = json.load(f)
+    with open(args.public_key, 'rb') as f:
+        public_key = serialization.load_pem_public_key(f.read())
+
+    payload = json.dumps(
+        {k: record[k] for k in ("election_id", "tree_size", "root", "published_at")},
+        sort_keys=True, separators=(",", ":")
+    ).encode('utf-8')
+    try:
+        public_key.verify(bytes.fromhex(record["signature"]), payload)
+    except Exception:
+        print("FAIL: root signature is invalid")
+        sys.exit(1)
+    print(f"Signature OK for election {record['election_id']}, tree size {record['tree_size']}")
+
+    tree_size = record["tree_size"]
+    board = {}
+    def leaves():
+        for vote_id, vote_hash in read_entries(args.entries, tree_size):
+            board[vote_id] = vote_hash
+            yield leaf_hash(vote_hash)
+
+    if merkle_root(leaves()).hex() != record["root"]:
+        print("FAIL: entries do not reproduce the signed root")
+        sys.exit(1)
+    print("Root OK: entries match the signed tree head")
+
+    if args.receipts:
+        missing = 0
+        checked = 0
+        with open(args.receipts) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                vote_id, vote_hash = line.strip().split(",")
+                checked += 1
+                if board.get(int(vote_id)) != bytes.fromhex(vote_hash):
+                    missing += 1
+                    print(f"  receipt {vote_id} NOT on board")
+        print(f"Receipts: {checked - missing}/{checked} verified")
+        if missing:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""In-memory voter rolls for open elections.
+
+For every election that is open (or opens within one reconcile interval)
+each worker keeps, per constituency:
+
+    eligible   voter ids aged 18 or over
+    voted      voter ids with a recorded ballot
+
+as compressed bitmaps (pyroaring when installed, plain sets otherwise),
+plus the number of registered voters. The registration side is shared by
+all open elections. It is read from a replica once a day, and on every
+other reconcile only VOTER rows above a voterId watermark are read, going
+back VOTER_ROLL_REREAD_IDS ids for rows that committed out of order. Changes
+to voters already on the roll show up at the next daily build. The voted side
+is reconciled from the election's VOTER_ELECTION_STATUS rows on a replica,
+and updated in between by each successful cast in this worker. A ballot is
+never withdrawn, so voters already marked as voted stay marked even when
+the replica has not caught up yet.
+
+The roll only answers for voters it has seen (voterId up to the build
+watermark) and only rejects what it knows for certain: a recorded ballot,
+a registered voter under 18 on the day the roll was built, or a time
+clearly outside the election's window. A roll is built before its election
+opens and kept for up to one reconcile interval after it closes. Within
+ROLL_CLOCK_MARGIN_SECONDS of either edge of the window, and in every other
+case, it falls back to IsVoterEligible. Votes cast through other workers or booth
+uploads are picked up at the next reconcile; until then the VOTE triggers
+remain the authority on duplicates.
+"""
+from array import array
+from datetime import date, datetime
+from typing import Dict, Optional
+import logging
+import os
+import threading
+import time
+
+import database as db
+
+try:
+    from pyroaring import BitMap
+except ImportError:
+    BitMap = None
+
+logger = logging.getLogger(__name__)
+
+VOTER_ROLL_ENABLED = os.getenv("VOTER_ROLL_ENABLED", "true").lower() == "true"
+VOTER_ROLL_RECONCILE_SECONDS = int(os.getenv("VOTER_ROLL_RECONCILE_SECONDS", "300"))
+VOTER_ROLL_REREAD_IDS = int(os.getenv("VOTER_ROLL_REREAD_IDS", "10000"))
+# Near the start or end of an election the database clock decides
+ROLL_CLOCK_MARGIN_SECONDS = 60
+
+
+def _bitmap(values=()):
+    return BitMap(values) if BitMap is not None else set(values)
+
+
+class VoterRegistry:
+    """VOTER as of the last reconcile: constituency and adult status by voter id.
+
+    Extended in place; readers only look at ids up to the watermark, which
+    moves after the new voters are stored.
+    """
+
+    def __init__(self):
+        # Indexed by voterId, 0 = not registered; widened to 'I' if a constituencyId needs it
+        self.constituency_of = array('H')
+        self.eligible: Dict[int, object] = {}  # constituencyId -> bitmap of adults
+        self.registered: Dict[int, int] = {}   # constituencyId -> voter count
+        self.watermark = 0
+        self.built_on: Optional[date] = None
+
+    def _add(self, voter_id: int, constituency_id: int, adult: bool):
+        if voter_id < len(self.constituency_of) and self.constituency_of[voter_id]:
+            return  # re-read below the watermark
+        if constituency_id > 0xFFFF and self.constituency_of.typecode == 'H':
+            self.constituency_of = array('I', self.constituency_of)
+        if voter_id >= len(self.constituency_of):
+            self.constituency_of.extend([0] * (voter_id + 1 - len(self.constituency_of)))
+        self.constituency_of[voter_id] = constituency_id
+        self.registered[constituency_id] = self.registered.get(constituency_id, 0) + 1
+        if adult:
+            self.eligible.setdefault(constituency_id, _bitmap()).add(voter_id)
+
+    def extend(self):
+        """Add voters registered since the last call (and any that committed out of order)"""
+        low = max(0, self.watermark - VOTER_ROLL_REREAD_IDS)
+        query = """
+            SELECT voterId, constituencyId,
+                   dateOfBirth <= DATE_SUB(CURDATE(), INTERVAL 18 YEAR) AS adult
+            FROM VOTER
+            WHERE voterId > %s
+            ORDER BY voterId
+        """
+        for _, rows in db.stream_query(query, (low,)):
+            for voter_id, constituency_id, adult in rows:
+                self._add(voter_id, constituency_id, adult)
+        self.watermark = max(self.watermark, len(self.constituency_of) - 1)
+
+    @classmethod
+    def load(cls) -> "VoterRegistry":
+        registry = cls()
+        registry.built_on = date.today()
+        registry.extend()
+        return registry
+
+    def constituency(self, voter_id: int) -> int:
+        return self.constituency_of[voter_id] if 0 < voter_id <= self.watermark else 0
+
+
+class ElectionRoll:
+    def __init__(self, election_id: int, registry: VoterRegistry,
+                 starts_at: float, ends_at: float):
+        self.election_id = election_id
+        self.registry = registry
+        self.starts_at = starts_at          # epoch seconds of ELECTION.startTime
+        self.ends_at = ends_at
+        self.voted: Dict[int, object] = {}  # constituencyId -> bitmap
+        self.voted_unplaced = _bitmap()     # voters above the watermark, placed at the next reconcile
+
+    def add_voted(self, voter_id: int):
+        constituency_id = self.registry.constituency(voter_id)
+        if constituency_id:
+            self.voted.setdefault(constituency_id, _bitmap()).add(voter_id)
+        else:
+            self.voted_unplaced.add(voter_id)
+
+    def window(self, now: float) -> Optional[bool]:
+        """True inside the voting window, False clearly outside it, None near an edge"""
+        if self.starts_at + ROLL_CLOCK_MARGIN_SECONDS <= now <= self.ends_at - ROLL_CLOCK_MARGIN_SECONDS:
+            return True
+        if now < self.starts_at - ROLL_CLOCK_MARGIN_SECONDS or now > self.ends_at + ROLL_CLOCK_MARGIN_SECONDS:
+            return False
+        return None
+
+    def has_voted(self, voter_id: int) -> bool:
+        constituency_id = self.registry.constituency(voter_id)
+        if constituency_id and voter_id in self.voted.get(constituency_id, ()):
+            return True
+        return voter_id in self.voted_unplaced
+
+    def all_voted(self):
+        result = _bitmap(self.voted_unplaced)
+        for bitmap in self.voted.values():
+            result |= bitmap
+        return result
+
+    @classmethod
+    def load(cls, election_id: int, registry: VoterRegistry,
+             starts_at: float, ends_at: float) -> "ElectionRoll":
+        roll = cls(election_id, registry, starts_at, ends_at)
+        for _, rows in db.stream_query(
+            "SELECT voterId FROM VOTER_ELECTION_STATUS WHERE electionId = %s AND hasVoted = TRUE",
+            (election_id,)
+        ):
+            for (voter_id,) in rows:
+                roll.add_voted(voter_id)
+        return roll
+
+
+class VoterRoll:
+    """Rolls of all open elections, swapped in whole on each reconcile"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rolls: Dict[int, ElectionRoll] = {}
+        self.registry: Optional[VoterRegistry] = None
+        # Votes marked while a rebuild is reading VOTER_ELECTION_STATUS, merged into the new roll
+        self._journal: Dict[int, set] = {}
+        self.counters: Dict[str, int] = {}
+        self.last_reconcile: Optional[dict] = None
+
+    def _incr(self, name: str):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + 1
+
+    def check(self, voter_id: int, election_id: int) -> Optional[bool]:
+        """True/False if the roll can decide eligibility, None to ask the database"""
+        roll = self.rolls.get(election_id)
+        if roll is None:
+            self._incr("miss_no_roll")
+            return None
+        # Rolls exist before an election opens and linger after it closes
+        window = roll.window(time.time())
+        if window is False:
+            self._incr("rejected_outside_window")
+            return False
+        if window is None:
+            self._incr("miss_window_edge")
+            return None
+        if roll.has_voted(voter_id):
+            self._incr("rejected_already_voted")
+            return False
+
+        registry = roll.registry
+        constituency_id = registry.constituency(voter_id)
+        if not constituency_id or registry.built_on != date.today():
+            # Registered after the build, or someone may have turned 18 since
+            self._incr("miss_unknown_voter")
+            return None
+        if voter_id not in registry.eligible.get(constituency_id, ()):
+            self._incr("rejected_underage")
+            return False
+        self._incr("eligible")
+        return True
+
+    def mark_voted(self, election_id: int, voter_id: int):
+        with self._lock:
+            roll = self.rolls.get(election_id)
+            if roll is not None:
+                roll.add_voted(voter_id)
+            if election_id in self._journal:
+                self._journal[election_id].add(voter_id)
+
+    def turnout(self, election_id: int, constituency_id: int) -> Optional[float]:
+        """Same figure as CalculateTurnout, or None when the election has no roll"""
+        roll = self.rolls.get(election_id)
+        if roll is None:
+            return None
+        registered = roll.registry.registered.get(constituency_id, 0)
+        if not registered:
+            return 0.0
+        return round(len(roll.voted.get(constituency_id, ())) * 100.0 / registered, 2)
+
+    def refresh(self):
+        """Rebuild the rolls of open elections from the database and report drift"""
+        start = time.monotonic()
+        elections = db.execute_query("""
+            SELECT electionId, UNIX_TIMESTAMP(startTime) AS startsAt, UNIX_TIMESTAMP(endTime) AS endsAt
+            FROM ELECTION
+            WHERE startTime <= NOW() + INTERVAL %s SECOND AND endTime >= NOW()
+              AND completionStatus = 0
+        """, (VOTER_ROLL_RECONCILE_SECONDS,), fetch=True)
+        election_ids = [e['electionId'] for e in elections]
+        windows = {e['electionId']: (float(e['startsAt']), float(e['endsAt'])) for e in elections}
+
+        with self._lock:
+            for election_id in election_ids:
+                self._journal[election_id] = set()
+        try:
+            registry = self.registry
+            if not election_ids:
+                registry = None
+            elif registry is None or registry.built_on != date.today():
+                # Someone may have turned 18 overnight
+                registry = VoterRegistry.load()
+            else:
+                registry.extend()
+            rebuilt = {election_id: ElectionRoll.load(election_id, registry, *windows[election_id])
+                       for election_id in election_ids}
+        except Exception:
+            with self._lock:
+                self._journal.clear()
+            raise
+
+        drift = {}
+        with self._lock:
+            for election_id, roll in rebuilt.items():
+                old = self.rolls.get(election_id)
+                journal = self._journal.pop(election_id)
+                if old is not None:
+                    before, after = old.all_voted(), roll.all_voted()
+                    # Only other workers and booth uploads should add votes between reconciles
+                    drift[election_id] = {"added": len(after - before),
+                                          "missing": len(before - after - _bitmap(journal))}
+                    # Not yet applied on the replica, or cast here without a status row
+                    for voter_id in before - after:
+                        roll.add_voted(voter_id)
+                for voter_id in journal:
+                    roll.add_voted(voter_id)
+            self.rolls = rebuilt
+            self.registry = registry
+            self._journal.clear()
+
+        for election_id, d in drift.items():
+            if d["missing"]:
+                logger.warning(f"Voter roll {election_id}: {d['missing']} voters marked voted "
+                               f"here have no VOTER_ELECTION_STATUS row on the replica yet")
+        self.last_reconcile = {
+            "at": datetime.now().isoformat(),
+            "seconds": round(time.monotonic() - start, 3),
+            "elections": election_ids,
+            "drift": drift,
+        }
+
+    def snapshot(self) -> dict:
+        rolls = {}
+        with self._lock:
+            for election_id, roll in self.rolls.items():
+                registry = roll.registry
+                rolls[election_id] = {
+                    "watermark": registry.watermark,
+                    "built_on": registry.built_on.isoformat(),
+                    "registered": sum(registry.registered.values()),
+                    "eligible": sum(len(b) for b in registry.eligible.values()),
+                    "voted": len(roll.all_voted()),
+                }
+            counters = dict(self.counters)
+        return {"enabled": VOTER_ROLL_ENABLED, "backend": "roaring" if BitMap is not None else "set",
+                "rolls": rolls, "counters": counters, "last_reconcile": self.last_reconcile}
+
+
+voter_roll = VoterRoll()
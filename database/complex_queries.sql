@@ -1,3 +1,6 @@
+-- Queries over VOTE are scoped to one election so MySQL prunes to its
+-- partition. Set the election first, e.g.: SET @electionId = 1;
+
 -- Query 1: Comprehensive election results with demographics
 SELECT 
     e.title as election_name,
@@ -7,7 +10,7 @@ SELECT
     r.totalVotes,
     r.votePercentage,
     CalculateVictoryMargin(e.electionId, co.constituencyId) as victory_margin,
-    CalculateTurnout(co.constituencyId) as turnout_percentage,
+    CalculateTurnout(co.constituencyId, e.electionId) as turnout_percentage,
     RANK() OVER (PARTITION BY e.electionId, co.constituencyId ORDER BY r.totalVotes DESC) as rank_position
 FROM ELECTION e
 JOIN RESULT r ON e.electionId = r.electionId
@@ -51,6 +54,7 @@ SELECT
 FROM VOTE v
 JOIN ELECTION e ON v.electionId = e.electionId
 JOIN CANDIDATE c ON v.candidateId = c.candidateId
+WHERE v.electionId = @electionId
 GROUP BY e.electionId, e.title, DATE(v.timestamp), HOUR(v.timestamp)
 ORDER BY voting_date, voting_hour;
 
@@ -97,6 +101,7 @@ GROUP BY p.partyId, p.partyName
 ORDER BY seats_won DESC, total_votes_received DESC;
 
 -- Query 6: Encryption and security audit
+-- Hash verification is done by backend/integrity_audit.py
 SELECT 
     v.voteId,
     v.voterId,
@@ -104,16 +109,16 @@ SELECT
     v.electionId,
     v.candidateId,
     LENGTH(v.encryptedVote) as encrypted_data_length,
-    v.voteHash,
+    HEX(v.voteHash) as voteHash,
     v.timestamp,
     v.ipAddress,
-    VerifyVoteHash(v.voteId, v.voteHash) as hash_verified,
     (SELECT COUNT(*) FROM AUDIT_LOG 
      WHERE userId = v.voterId 
      AND actionType = 'VOTE_CAST' 
      AND timestamp = v.timestamp) as audit_log_exists
 FROM VOTE v
 JOIN VOTER vr ON v.voterId = vr.voterId
+WHERE v.electionId = @electionId
 ORDER BY v.timestamp DESC;
 
 -- Query 7: Top performing candidates with voter demographics
@@ -176,16 +181,17 @@ SELECT
     COUNT(DISTINCT v.voterId) as voters_from_booth,
     COUNT(DISTINCT vt.voteId) as votes_cast,
     ROUND((COUNT(DISTINCT vt.voteId) * 100.0) / COUNT(DISTINCT v.voterId), 2) as booth_turnout,
-    CalculateTurnout(co.constituencyId) as constituency_turnout
+    CalculateTurnout(co.constituencyId, @electionId) as constituency_turnout
 FROM BOOTH b
 JOIN CONSTITUENCY co ON b.constituencyId = co.constituencyId
 LEFT JOIN BOOTHOFFICER bo ON b.officerId = bo.officerId
 LEFT JOIN VOTER v ON v.constituencyId = co.constituencyId
-LEFT JOIN VOTE vt ON v.voterId = vt.voterId
+LEFT JOIN VOTE vt ON v.voterId = vt.voterId AND vt.electionId = @electionId
 GROUP BY b.boothId, b.location, co.name, bo.name, co.constituencyId
 ORDER BY votes_cast DESC;
 
 -- Query 10: Time-series vote encryption analysis
+-- Hash and key integrity is checked outside MySQL by backend/integrity_audit.py
 SELECT 
     DATE(v.timestamp) as vote_date,
     HOUR(v.timestamp) as vote_hour,
@@ -193,8 +199,8 @@ SELECT
     AVG(LENGTH(v.encryptedVote)) as avg_encrypted_size,
     MIN(LENGTH(v.encryptedVote)) as min_encrypted_size,
     MAX(LENGTH(v.encryptedVote)) as max_encrypted_size,
-    COUNT(DISTINCT v.publicKeyUsed) as unique_keys_used,
-    SUM(CASE WHEN VerifyVoteHash(v.voteId, v.voteHash) THEN 1 ELSE 0 END) as verified_votes
+    COUNT(DISTINCT v.keyFingerprint) as unique_keys_used
 FROM VOTE v
+WHERE v.electionId = @electionId
 GROUP BY DATE(v.timestamp), HOUR(v.timestamp)
 ORDER BY vote_date, vote_hour;
\ No newline at end of file
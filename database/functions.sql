@@ -1,4 +1,5 @@
 -- Function 1: Calculate voter turnout percentage
+DROP FUNCTION IF EXISTS CalculateTurnout;
 DELIMITER //
 CREATE FUNCTION CalculateTurnout(p_constituencyId BIGINT, p_electionId BIGINT)
 RETURNS DECIMAL(5,2)
@@ -30,6 +31,7 @@ END//
 DELIMITER ;
 
 -- Function 2: Get winner for constituency
+DROP FUNCTION IF EXISTS GetWinner;
 DELIMITER //
 CREATE FUNCTION GetWinner(p_electionId BIGINT, p_constituencyId BIGINT)
 RETURNS VARCHAR(255)
@@ -50,6 +52,7 @@ END//
 DELIMITER ;
 
 -- Function 3: Check if voter is eligible
+DROP FUNCTION IF EXISTS IsVoterEligible;
 DELIMITER //
 
 CREATE FUNCTION IsVoterEligible(p_voterId BIGINT, p_electionId BIGINT)
@@ -97,6 +100,7 @@ END//
 DELIMITER ;
 
 -- Function 4: Get total votes in election
+DROP FUNCTION IF EXISTS GetTotalVotes;
 DELIMITER //
 CREATE FUNCTION GetTotalVotes(p_electionId BIGINT)
 RETURNS BIGINT
@@ -113,6 +117,7 @@ END//
 DELIMITER ;
 
 -- Function 5: Calculate victory margin
+DROP FUNCTION IF EXISTS CalculateVictoryMargin;
 DELIMITER //
 CREATE FUNCTION CalculateVictoryMargin(p_electionId BIGINT, p_constituencyId BIGINT)
 RETURNS BIGINT
@@ -138,6 +143,7 @@ END//
 DELIMITER ;
 
 -- Function 6: Get authentication success rate
+DROP FUNCTION IF EXISTS GetAuthSuccessRate;
 DELIMITER //
 CREATE FUNCTION GetAuthSuccessRate(p_voterId BIGINT)
 RETURNS DECIMAL(5,2)
@@ -168,17 +174,19 @@ END//
 DELIMITER ;
 
 -- Function 7: Verify vote hash
+DROP FUNCTION IF EXISTS VerifyVoteHash;
 DELIMITER //
 CREATE FUNCTION VerifyVoteHash(p_voteId BIGINT, p_providedHash VARCHAR(64))
 RETURNS BOOLEAN
 DETERMINISTIC
 BEGIN
-    DECLARE stored_hash VARCHAR(64);
+    DECLARE stored_hash BINARY(32);
     
     SELECT voteHash INTO stored_hash
     FROM VOTE
     WHERE voteId = p_voteId;
     
-    RETURN stored_hash = p_providedHash;
+    -- Receipts carry the hash as hex; VOTE stores the raw 32 bytes
+    RETURN stored_hash = UNHEX(p_providedHash);
 END//
 DELIMITER ;
\ No newline at end of file
@@ -0,0 +1,12 @@
+-- Migration 001: Paillier ballot scheme for homomorphic tallying
+-- Apply to databases created before ELECTION.ballotScheme existed, then
+-- reload procedures.sql so CastVote accepts BLOB ciphertexts.
+USE SecureElectionDB;
+
+ALTER TABLE ELECTION
+    ADD COLUMN ballotScheme ENUM('RSA', 'PAILLIER') NOT NULL DEFAULT 'RSA' AFTER completionStatus;
+
+-- A Paillier ballot holds one 512-byte ciphertext per candidate; RSA ballots
+-- (256 bytes) are still stored inline in the row.
+ALTER TABLE VOTE
+    MODIFY COLUMN encryptedVote BLOB NOT NULL;
@@ -0,0 +1,33 @@
+-- Migration 002: Batched ballot ingestion from offline booth terminals
+-- Apply, then reload triggers.sql so before_vote_insert checks the ballot's
+-- own timestamp for booth uploads (booths upload ballots after they were cast).
+USE SecureElectionDB;
+
+ALTER TABLE BOOTH
+    ADD COLUMN publicKeyPem TEXT NULL AFTER capacity;
+
+CREATE TABLE BOOTH_BATCH (
+    boothId BIGINT NOT NULL,
+    batchId VARCHAR(64) NOT NULL,
+    payloadHash BINARY(32) NOT NULL,
+    officerId BIGINT NOT NULL,
+    accepted INT NOT NULL DEFAULT 0,
+    duplicate INT NOT NULL DEFAULT 0,
+    rejected INT NOT NULL DEFAULT 0,
+    outcomes JSON NOT NULL,
+    receivedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (boothId, batchId),
+    FOREIGN KEY (boothId) REFERENCES BOOTH(boothId) ON DELETE CASCADE,
+    FOREIGN KEY (officerId) REFERENCES BOOTHOFFICER(officerId)
+);
+
+CREATE TABLE BOOTH_BALLOT (
+    boothId BIGINT NOT NULL,
+    idempotencyKey VARCHAR(64) NOT NULL,
+    electionId BIGINT NOT NULL,
+    voteId BIGINT NOT NULL,
+    batchId VARCHAR(64) NOT NULL,
+    PRIMARY KEY (boothId, idempotencyKey),
+    FOREIGN KEY (boothId) REFERENCES BOOTH(boothId) ON DELETE CASCADE,
+    INDEX idx_booth_ballot_vote (electionId, voteId)
+);
@@ -0,0 +1,8 @@
+-- Migration 003: Content hash of party symbols
+-- Symbols are served by hash from /api/parties/symbols/{hash}, so the blob
+-- no longer travels with every party listing.
+USE SecureElectionDB;
+
+ALTER TABLE PARTY
+    ADD COLUMN symbolHash CHAR(64) AS (SHA2(symbol, 256)) STORED AFTER symbol,
+    ADD INDEX idx_party_symbol_hash (symbolHash);
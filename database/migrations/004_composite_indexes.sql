@@ -0,0 +1,25 @@
+-- Migration 004: Composite indexes for the hot queries
+-- Each new index starts with the column of the single-column index it
+-- replaces, so nothing that used the old one loses its access path.
+-- Check the result with: cd backend && python plan_regression.py
+USE SecureElectionDB;
+
+-- Tallies, turnout and CalculateResults: filter on election, join on candidate
+ALTER TABLE VOTE
+    ADD INDEX idx_vote_election_candidate (electionId, candidateId),
+    DROP INDEX idx_vote_election;
+
+-- Suspicious-activity query: actionType IN (...) AND timestamp >= ...
+ALTER TABLE AUDIT_LOG
+    ADD INDEX idx_log_action_time (actionType, timestamp),
+    DROP INDEX idx_log_action;
+
+-- UpdateDemographicStats groups a constituency's voters by age and gender
+ALTER TABLE VOTER
+    ADD INDEX idx_voter_demographics (constituencyId, dateOfBirth, gender),
+    DROP INDEX idx_voter_constituency;
+
+-- CANDIDATE (electionId, constituencyId) for get_candidates is already the
+-- prefix of unique_candidate_election, so it needs no new index.
+
+ANALYZE TABLE VOTE, AUDIT_LOG, VOTER;
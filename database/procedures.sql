@@ -1,4 +1,5 @@
 -- Procedure 1: Register new voter with face data
+DROP PROCEDURE IF EXISTS RegisterVoter;
 DELIMITER //
 CREATE PROCEDURE RegisterVoter(
     IN p_name VARCHAR(255),
@@ -45,9 +46,9 @@ CREATE PROCEDURE CastVote(
     IN p_voterId BIGINT,
     IN p_electionId BIGINT,
     IN p_candidateId BIGINT,
-    IN p_encryptedVote TEXT,
-    IN p_voteHash VARCHAR(64),
-    IN p_publicKey TEXT,
+    IN p_encryptedVote BLOB,
+    IN p_voteHash BINARY(32),
+    IN p_keyFingerprint BINARY(32),
     IN p_ipAddress VARCHAR(45),
     OUT p_voteId BIGINT,
     OUT p_success BOOLEAN
@@ -63,9 +64,9 @@ BEGIN
 
     -- 1️⃣ Record the encrypted vote
     INSERT INTO VOTE (voterId, electionId, candidateId, encryptedVote, 
-                      voteHash, publicKeyUsed, ipAddress)
+                      voteHash, keyFingerprint, ipAddress)
     VALUES (p_voterId, p_electionId, p_candidateId, p_encryptedVote, 
-            p_voteHash, p_publicKey, p_ipAddress);
+            p_voteHash, p_keyFingerprint, p_ipAddress);
 
     SET p_voteId = LAST_INSERT_ID();
 
@@ -157,6 +158,7 @@ END//
 DELIMITER ;
 
 -- Procedure 5: Get voter authentication history
+DROP PROCEDURE IF EXISTS GetVoterAuthHistory;
 DELIMITER //
 CREATE PROCEDURE GetVoterAuthHistory(
     IN p_voterId BIGINT,
@@ -179,6 +181,9 @@ END//
 DELIMITER ;
 
 -- Procedure 6: Generate election report
+-- Each figure comes from its own aggregate filtered by electionId, so the
+-- cost is linear in ballots rather than votes x candidates x results.
+DROP PROCEDURE IF EXISTS GenerateElectionReport;
 DELIMITER //
 CREATE PROCEDURE GenerateElectionReport(
     IN p_electionId BIGINT
@@ -188,22 +193,121 @@ BEGIN
         e.title as election_title,
         e.startTime,
         e.endTime,
-        COUNT(DISTINCT v.voterId) as total_votes_cast,
-        COUNT(DISTINCT c.constituencyId) as constituencies_participated,
-        COUNT(DISTINCT cand.candidateId) as total_candidates,
-        ROUND(AVG(r.votePercentage), 2) as avg_vote_percentage,
-        MAX(r.totalVotes) as highest_votes_received,
-        (SELECT name FROM CANDIDATE WHERE candidateId = (
-            SELECT candidateId FROM RESULT 
-            WHERE electionId = p_electionId 
-            ORDER BY totalVotes DESC LIMIT 1
-        )) as leading_candidate
+        e.completionStatus,
+        vs.total_votes_cast,
+        cs.constituencies_participated,
+        cs.total_candidates,
+        rs.avg_vote_percentage,
+        rs.highest_votes_received,
+        (SELECT c.name
+         FROM RESULT r
+         JOIN CANDIDATE c ON r.candidateId = c.candidateId
+         WHERE r.electionId = p_electionId
+         ORDER BY r.totalVotes DESC LIMIT 1) as leading_candidate
     FROM ELECTION e
-    LEFT JOIN VOTE v ON e.electionId = v.electionId
-    LEFT JOIN CANDIDATE cand ON e.electionId = cand.electionId
-    LEFT JOIN CONSTITUENCY c ON cand.constituencyId = c.constituencyId
-    LEFT JOIN RESULT r ON e.electionId = r.electionId
-    WHERE e.electionId = p_electionId
-    GROUP BY e.electionId, e.title, e.startTime, e.endTime;
+    CROSS JOIN (
+        SELECT COUNT(*) as total_votes_cast
+        FROM VOTE
+        WHERE electionId = p_electionId
+    ) vs
+    CROSS JOIN (
+        SELECT 
+            COUNT(DISTINCT constituencyId) as constituencies_participated,
+            COUNT(*) as total_candidates
+        FROM CANDIDATE
+        WHERE electionId = p_electionId
+    ) cs
+    CROSS JOIN (
+        SELECT 
+            ROUND(AVG(votePercentage), 2) as avg_vote_percentage,
+            MAX(totalVotes) as highest_votes_received
+        FROM RESULT
+        WHERE electionId = p_electionId
+    ) rs
+    WHERE e.electionId = p_electionId;
 END//
-DELIMITER ;
\ No newline at end of file
+DELIMITER ;
+
+-- Procedure 7: Add the per-election partitions of VOTE and VOTER_ELECTION_STATUS
+DROP PROCEDURE IF EXISTS AddListPartition;
+DELIMITER //
+CREATE PROCEDURE AddListPartition(
+    IN p_table VARCHAR(64),
+    IN p_electionId BIGINT
+)
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE()
+          AND UPPER(TABLE_NAME) = UPPER(p_table)
+          AND PARTITION_NAME = CONCAT('p', p_electionId)
+    ) THEN
+        SET @ddl = CONCAT('ALTER TABLE ', p_table, ' ADD PARTITION (PARTITION p', p_electionId,
+                          ' VALUES IN (', p_electionId, '))');
+        PREPARE stmt FROM @ddl;
+        EXECUTE stmt;
+        DEALLOCATE PREPARE stmt;
+    END IF;
+END//
+DELIMITER ;
+
+DROP PROCEDURE IF EXISTS AddElectionPartitions;
+DELIMITER //
+CREATE PROCEDURE AddElectionPartitions(
+    IN p_electionId BIGINT
+)
+BEGIN
+    CALL AddListPartition('VOTE', p_electionId);
+    CALL AddListPartition('VOTER_ELECTION_STATUS', p_electionId);
+END//
+DELIMITER ;
+
+-- Procedure 8: Detach a completed election's partitions into archive tables
+-- (VOTE_ARCHIVE_<id>, VOTER_ELECTION_STATUS_ARCHIVE_<id>). EXCHANGE PARTITION
+-- only swaps metadata, so this is cheap regardless of the election's size.
+DROP PROCEDURE IF EXISTS DetachListPartition;
+DELIMITER //
+CREATE PROCEDURE DetachListPartition(
+    IN p_table VARCHAR(64),
+    IN p_electionId BIGINT
+)
+BEGIN
+    SET @archive = CONCAT(p_table, '_ARCHIVE_', p_electionId);
+    SET @partition = CONCAT('p', p_electionId);
+
+    SET @ddl = CONCAT('CREATE TABLE ', @archive, ' LIKE ', p_table);
+    PREPARE stmt FROM @ddl; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+
+    SET @ddl = CONCAT('ALTER TABLE ', @archive, ' REMOVE PARTITIONING');
+    PREPARE stmt FROM @ddl; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+
+    SET @ddl = CONCAT('ALTER TABLE ', p_table, ' EXCHANGE PARTITION ', @partition,
+                      ' WITH TABLE ', @archive);
+    PREPARE stmt FROM @ddl; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+
+    SET @ddl = CONCAT('ALTER TABLE ', p_table, ' DROP PARTITION ', @partition);
+    PREPARE stmt FROM @ddl; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+END//
+DELIMITER ;
+
+DROP PROCEDURE IF EXISTS ArchiveElectionPartition;
+DELIMITER //
+CREATE PROCEDURE ArchiveElectionPartition(
+    IN p_electionId BIGINT
+)
+BEGIN
+    DECLARE is_completed BOOLEAN DEFAULT FALSE;
+
+    SELECT completionStatus INTO is_completed
+    FROM ELECTION
+    WHERE electionId = p_electionId;
+
+    IF NOT is_completed THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Only completed elections can be archived';
+    END IF;
+
+    CALL DetachListPartition('VOTE', p_electionId);
+    CALL DetachListPartition('VOTER_ELECTION_STATUS', p_electionId);
+END//
+DELIMITER ;
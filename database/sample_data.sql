@@ -43,6 +43,9 @@ INSERT INTO VOTER (name, dateOfBirth, gender, address, constituencyId, voterIdNu
 INSERT INTO ELECTION (title, startTime, endTime) VALUES
 ('General Election 2024', '2024-11-01 08:00:00', '2024-11-01 18:00:00');
 
+-- Ballots for each election live in their own partition
+CALL AddElectionPartitions(1);
+
 -- Insert Candidates
 INSERT INTO CANDIDATE (name, age, partyId, electionId, constituencyId) VALUES
 ('Krishna Gundu Bala', 45, 1, 1, 1),
@@ -18,9 +18,11 @@ CREATE TABLE PARTY (
     partyId BIGINT PRIMARY KEY AUTO_INCREMENT,
     partyName VARCHAR(255) NOT NULL UNIQUE,
     symbol BLOB NOT NULL,
+    symbolHash CHAR(64) AS (SHA2(symbol, 256)) STORED,  -- symbols are served by content hash
     leader VARCHAR(255) NOT NULL,
     foundedYear INT,
-    INDEX idx_party_name (partyName)
+    INDEX idx_party_name (partyName),
+    INDEX idx_party_symbol_hash (symbolHash)
 );
 
 -- 3. ELECTION Table
@@ -30,6 +32,7 @@ CREATE TABLE ELECTION (
     startTime TIMESTAMP NOT NULL,
     endTime TIMESTAMP NOT NULL,
     completionStatus BOOLEAN DEFAULT FALSE,
+    ballotScheme ENUM('RSA', 'PAILLIER') NOT NULL DEFAULT 'RSA',
     publicKeyPem TEXT,
     privateKeyPem TEXT,
     CHECK (endTime > startTime),
@@ -37,6 +40,17 @@ CREATE TABLE ELECTION (
     INDEX idx_election_dates (startTime, endTime)
 );
 
+-- 3a. ELECTION_KEY Table (public keys referenced by ballots via fingerprint)
+CREATE TABLE ELECTION_KEY (
+    keyFingerprint BINARY(32) PRIMARY KEY,
+    electionId BIGINT NOT NULL,
+    publicKeyPem TEXT NOT NULL,
+    createdAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (electionId) REFERENCES ELECTION(electionId) 
+        ON DELETE CASCADE ON UPDATE CASCADE,
+    INDEX idx_key_election (electionId)
+);
+
 -- 4. ADMIN Table
 CREATE TABLE ADMIN (
     adminId BIGINT PRIMARY KEY AUTO_INCREMENT,
@@ -66,7 +80,8 @@ CREATE TABLE VOTER (
     lastLoginAt TIMESTAMP NULL,
     FOREIGN KEY (constituencyId) REFERENCES CONSTITUENCY(constituencyId) 
         ON DELETE RESTRICT ON UPDATE CASCADE,
-    INDEX idx_voter_constituency (constituencyId),
+    -- Covers UpdateDemographicStats: constituency filter, age and gender grouping
+    INDEX idx_voter_demographics (constituencyId, dateOfBirth, gender),
     INDEX idx_voter_voted_status (hasVoted),
     INDEX idx_voter_id (voterIdNumber)
 );
@@ -85,7 +100,7 @@ CREATE TABLE AUDIT_LOG (
     userAgent VARCHAR(500),
     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     INDEX idx_log_user (userId, userType),
-    INDEX idx_log_action (actionType),
+    INDEX idx_log_action_time (actionType, timestamp),
     INDEX idx_log_timestamp (timestamp),
     INDEX idx_log_status (actionStatus)
 );
@@ -130,6 +145,7 @@ CREATE TABLE BOOTH (
     constituencyId BIGINT NOT NULL,
     officerId BIGINT,
     capacity INT DEFAULT 1000 CHECK (capacity > 0),
+    publicKeyPem TEXT NULL,  -- Ed25519 key of the booth terminal, signs ballot batches
     FOREIGN KEY (constituencyId) REFERENCES CONSTITUENCY(constituencyId) 
         ON DELETE RESTRICT ON UPDATE CASCADE,
     FOREIGN KEY (officerId) REFERENCES BOOTHOFFICER(officerId) 
@@ -139,26 +155,27 @@ CREATE TABLE BOOTH (
 );
 
 -- 10. VOTE Table (with End-to-End Encryption)
+-- Partitioned by election (one LIST partition per electionId, added by
+-- AddElectionPartitions). Partitioned InnoDB tables cannot have foreign keys,
+-- so references are checked by the before_vote_insert trigger instead.
 CREATE TABLE VOTE (
-    voteId BIGINT PRIMARY KEY AUTO_INCREMENT,
+    voteId BIGINT NOT NULL AUTO_INCREMENT,
     voterId BIGINT NOT NULL,
     electionId BIGINT NOT NULL,
     candidateId BIGINT NOT NULL,
-    encryptedVote TEXT NOT NULL,
-    voteHash VARCHAR(64) NOT NULL,
-    publicKeyUsed TEXT NOT NULL,
+    encryptedVote BLOB NOT NULL,
+    voteHash BINARY(32) NOT NULL,
+    keyFingerprint BINARY(32) NOT NULL,
     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     ipAddress VARCHAR(45),
-    FOREIGN KEY (voterId) REFERENCES VOTER(voterId) 
-        ON DELETE CASCADE ON UPDATE CASCADE,
-    FOREIGN KEY (electionId) REFERENCES ELECTION(electionId) 
-        ON DELETE CASCADE ON UPDATE CASCADE,
-    FOREIGN KEY (candidateId) REFERENCES CANDIDATE(candidateId) 
-        ON DELETE CASCADE ON UPDATE CASCADE,
+    PRIMARY KEY (voteId, electionId),
     UNIQUE KEY unique_voter_election (voterId, electionId),
-    INDEX idx_vote_election (electionId),
+    INDEX idx_vote_election_candidate (electionId, candidateId),
     INDEX idx_vote_candidate (candidateId),
     INDEX idx_vote_timestamp (timestamp)
+)
+PARTITION BY LIST (electionId) (
+    PARTITION p0 VALUES IN (0)
 );
 
 -- 11. RESULT Table
@@ -198,11 +215,41 @@ CREATE TABLE DEMOGRAPHIC_STATS (
 );
 
 -- 13. VOTER_ELECTION_STATUS Table (to track voting status per election)
+-- Partitioned like VOTE so completed elections can be archived together.
 CREATE TABLE VOTER_ELECTION_STATUS (
     voterId BIGINT NOT NULL,
     electionId BIGINT NOT NULL,
     hasVoted BOOLEAN DEFAULT FALSE,
-    PRIMARY KEY (voterId, electionId),
-    FOREIGN KEY (voterId) REFERENCES VOTER(voterId),
-    FOREIGN KEY (electionId) REFERENCES ELECTION(electionId)
+    PRIMARY KEY (voterId, electionId)
+)
+PARTITION BY LIST (electionId) (
+    PARTITION p0 VALUES IN (0)
+);
+
+-- 14. BOOTH_BATCH Table (idempotency record of uploaded ballot batches)
+CREATE TABLE BOOTH_BATCH (
+    boothId BIGINT NOT NULL,
+    batchId VARCHAR(64) NOT NULL,
+    payloadHash BINARY(32) NOT NULL,
+    officerId BIGINT NOT NULL,
+    accepted INT NOT NULL DEFAULT 0,
+    duplicate INT NOT NULL DEFAULT 0,
+    rejected INT NOT NULL DEFAULT 0,
+    outcomes JSON NOT NULL,
+    receivedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (boothId, batchId),
+    FOREIGN KEY (boothId) REFERENCES BOOTH(boothId) ON DELETE CASCADE,
+    FOREIGN KEY (officerId) REFERENCES BOOTHOFFICER(officerId)
+);
+
+-- 15. BOOTH_BALLOT Table (idempotency key of every ballot ingested from a booth)
+CREATE TABLE BOOTH_BALLOT (
+    boothId BIGINT NOT NULL,
+    idempotencyKey VARCHAR(64) NOT NULL,
+    electionId BIGINT NOT NULL,
+    voteId BIGINT NOT NULL,
+    batchId VARCHAR(64) NOT NULL,
+    PRIMARY KEY (boothId, idempotencyKey),
+    FOREIGN KEY (boothId) REFERENCES BOOTH(boothId) ON DELETE CASCADE,
+    INDEX idx_booth_ballot_vote (electionId, voteId)
 );
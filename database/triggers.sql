@@ -1,4 +1,5 @@
 -- Trigger 1: Auto-update hasVoted when vote is cast
+DROP TRIGGER IF EXISTS after_vote_insert;
 DELIMITER //
 CREATE TRIGGER after_vote_insert
 AFTER INSERT ON VOTE
@@ -16,6 +17,7 @@ END//
 DELIMITER ;
 
 -- Trigger 2: Prevent voting after election ends
+DROP TRIGGER IF EXISTS before_vote_insert;
 DELIMITER //
 CREATE TRIGGER before_vote_insert
 BEFORE INSERT ON VOTE
@@ -23,24 +25,66 @@ FOR EACH ROW
 BEGIN
     DECLARE election_end TIMESTAMP;
     DECLARE election_start TIMESTAMP;
+    DECLARE election_completed BOOLEAN;
+    DECLARE cast_at TIMESTAMP;
     
-    SELECT startTime, endTime INTO election_start, election_end
+    SELECT startTime, endTime, completionStatus INTO election_start, election_end, election_completed
     FROM ELECTION
     WHERE electionId = NEW.electionId;
     
-    IF CURRENT_TIMESTAMP < election_start THEN
+    -- Ballots are cast now, except booth uploads: booth_ingest sets
+    -- @booth_upload_grace_hours for its session, and their ballots carry the
+    -- time they were cast offline, never later than now and at most the
+    -- grace period before it
+    SET cast_at = CURRENT_TIMESTAMP;
+    IF @booth_upload_grace_hours IS NOT NULL THEN
+        IF NEW.timestamp > CURRENT_TIMESTAMP THEN
+            SIGNAL SQLSTATE '45000'
+            SET MESSAGE_TEXT = 'Ballot timestamp is in the future';
+        END IF;
+        IF CURRENT_TIMESTAMP > election_end + INTERVAL @booth_upload_grace_hours * 3600 SECOND THEN
+            SIGNAL SQLSTATE '45000'
+            SET MESSAGE_TEXT = 'Upload window for this election has closed';
+        END IF;
+        IF election_completed THEN
+            SIGNAL SQLSTATE '45000'
+            SET MESSAGE_TEXT = 'Election results already published';
+        END IF;
+        SET cast_at = NEW.timestamp;
+    END IF;
+    
+    IF cast_at < election_start THEN
         SIGNAL SQLSTATE '45000'
         SET MESSAGE_TEXT = 'Election has not started yet';
     END IF;
     
-    IF CURRENT_TIMESTAMP > election_end THEN
+    IF cast_at > election_end THEN
         SIGNAL SQLSTATE '45000'
         SET MESSAGE_TEXT = 'Election has already ended';
     END IF;
+    
+    -- VOTE is partitioned and cannot declare foreign keys
+    IF NOT EXISTS (SELECT 1 FROM VOTER WHERE voterId = NEW.voterId) THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Unknown voter';
+    END IF;
+    
+    IF NOT EXISTS (SELECT 1 FROM CANDIDATE 
+                   WHERE candidateId = NEW.candidateId AND electionId = NEW.electionId) THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Candidate is not standing in this election';
+    END IF;
+    
+    IF NOT EXISTS (SELECT 1 FROM ELECTION_KEY 
+                   WHERE keyFingerprint = NEW.keyFingerprint AND electionId = NEW.electionId) THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Ballot encrypted with an unknown election key';
+    END IF;
 END//
 DELIMITER ;
 
 -- Trigger 3: Validate voter eligibility
+DROP TRIGGER IF EXISTS before_voter_vote;
 DELIMITER //
 
 CREATE TRIGGER before_voter_vote
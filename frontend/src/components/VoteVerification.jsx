@@ -6,13 +6,14 @@ export default function VoteVerification() {
   const [searchParams] = useSearchParams();
   const voteId = searchParams.get('vote');
   const hash = searchParams.get('hash');
+  const electionId = searchParams.get('election');
   const [result, setResult] = useState(null);
 
   useEffect(() => {
     if (voteId && hash) {
-      publicAPI.verifyVoteHash(voteId, hash).then(r => setResult(r.data));
+      publicAPI.verifyVoteHash(voteId, hash, electionId).then(r => setResult(r.data));
     }
-  }, [voteId, hash]);
+  }, [voteId, hash, electionId]);
 
   if (!voteId || !hash) return <p>Invalid link</p>;
 
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import FaceCapture from './FaceCapture';
-import { voterAPI, electionAPI } from '../services/api';
+import { voterAPI, electionAPI, symbolSrc } from '../services/api';
 
 const VotingPage = () => {
   const [step, setStep] = useState(1);
@@ -103,7 +103,8 @@ const VotingPage = () => {
 
       setVoteVerificationData({
         vote_id: response.data.vote_id,
-        vote_hash: response.data.vote_hash
+        vote_hash: response.data.vote_hash,
+        election_id: response.data.election_id
       });
     } catch (err) {
       setError(err.response?.data?.detail || 'Failed to cast vote');
@@ -178,6 +179,15 @@ const VotingPage = () => {
                   <p><strong>Age:</strong> {candidate.age}</p>
                   <p><strong>Party Leader:</strong> {candidate.leader}</p>
                 </div>
+                {candidate.symbolUrl && (
+                  <img
+                    src={symbolSrc(candidate.symbolUrl, 128)}
+                    alt={`${candidate.partyName} symbol`}
+                    width={64}
+                    height={64}
+                    style={{ objectFit: 'contain' }}
+                  />
+                )}
               </div>
             ))}
           </div>
@@ -195,6 +205,15 @@ const VotingPage = () => {
             marginTop: '20px'
           }}>
             <h4>You are voting for:</h4>
+            {selectedCandidate.symbolUrl && (
+              <img
+                src={symbolSrc(selectedCandidate.symbolUrl, 128)}
+                alt={`${selectedCandidate.partyName} symbol`}
+                width={96}
+                height={96}
+                style={{ objectFit: 'contain' }}
+              />
+            )}
             <h2>{selectedCandidate.name}</h2>
             <p><strong>Party:</strong> {selectedCandidate.partyName}</p>
             <p style={{ color: '#d32f2f', marginTop: '20px' }}>
@@ -253,7 +272,7 @@ const VotingPage = () => {
                 <p><strong>Vote ID:</strong> {voteVerificationData.vote_id}</p>
                 <p><strong>Vote Hash:</strong> {voteVerificationData.vote_hash}</p>
                 <a 
-                  href={`/verify?vote=${voteVerificationData.vote_id}&hash=${voteVerificationData.vote_hash}`}
+                  href={`/verify?vote=${voteVerificationData.vote_id}&hash=${voteVerificationData.vote_hash}&election=${voteVerificationData.election_id}`}
                   target="_blank"
                   rel="noopener noreferrer"
                   style={{ color: '#1976d2', textDecoration: 'underline', fontWeight: 'bold' }}
@@ -45,6 +45,10 @@ export const electionAPI = {
     api.get(`/elections/${electionId}/candidates`, { params: { constituency_id: constituencyId } })
 };
 
+// Party symbol URLs are content-addressed; the browser caches each one indefinitely
+export const symbolSrc = (symbolUrl, size) =>
+  symbolUrl ? `${API_BASE_URL.replace(/\/api$/, '')}${symbolUrl}${size ? `?size=${size}` : ''}` : null;
+
 export const generalAPI = {
   getParties: () => 
     api.get('/parties'),
@@ -61,8 +65,8 @@ export const publicAPI = {
     api.get(`/constituency/${constituencyId}/turnout/${electionId}`),
   getTotalVotes: (id) => 
     api.get(`/election/${id}/total-votes`),
-  verifyVoteHash: (voteId, hash) => 
-    api.get(`/vote/verify/${voteId}`, { params: { hash } })
+  verifyVoteHash: (voteId, hash, electionId) => 
+    api.get(`/vote/verify/${voteId}`, { params: { hash, election_id: electionId || undefined } })
 };
 
 export const adminAPI = {